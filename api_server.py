@@ -3,13 +3,65 @@ FastAPI server to handle requests from the React frontend.
 """
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import tempfile
 import asyncio
+import uuid
+from typing import Optional
+from contextlib import asynccontextmanager
 from pathlib import Path
-from runner import runner
+from runner import resume_request, runner
+from memory.clients import check_clients_health, shutdown_clients, startup_clients
+from memory.schema import bootstrap_collections, load_all_agent_configs
+from memory.vectordb import DEFAULT_USER_ID
+from roma_vlm.runtime import (
+    CHECKPOINT_RETENTION_HOURS,
+    RequestMismatchError,
+    configure_tracing,
+    flush_routing_logs,
+    get_checkpoint_store,
+    render_prometheus,
+    shutdown_tracing,
+    span,
+    start_mlflow_export,
+    stop_mlflow_export,
+    validate_request_id,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the Qdrant/OpenAI clients and create/migrate every memory-enabled agent
+    collection once, before serving; close the pooled connections on shutdown.
+    Tracing and the MLflow trace exporter are set up from the environment and flushed
+    on shutdown.
+    """
+    configure_tracing()
+    # Probes the tracking server in the background; never delays startup
+    start_mlflow_export()
+    agent_configs = load_all_agent_configs()
+    app.state.memory_enabled = any(c.MEMORY_CONFIG.get("enabled") for c in agent_configs)
+    if app.state.memory_enabled:
+        # Fails fast on a missing QDRANT_URL / OPENAI_API_KEY or an unreachable Qdrant
+        await startup_clients()
+        collections = await bootstrap_collections(agent_configs)
+        if collections:
+            print(f"✓ Memory collections ready: {', '.join(collections)}")
+    if any(getattr(c, "CHECKPOINT_CONFIG", {}).get("enabled") for c in agent_configs):
+        purged = await get_checkpoint_store().purge(CHECKPOINT_RETENTION_HOURS * 3600)
+        if purged:
+            print(f"✓ Purged {purged} expired request checkpoints")
+    try:
+        yield
+    finally:
+        await shutdown_clients()
+        await flush_routing_logs()
+        shutdown_tracing()
+        stop_mlflow_export()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -25,11 +77,21 @@ async def analyze(
     question: str = Form(...),
     model: str = Form(...),
     agent: str = Form("general_agent"),
+    user_id: int = Form(DEFAULT_USER_ID),
+    request_id: Optional[str] = Form(None),
     images: list[UploadFile] = File(None)
 ):
     """
     Endpoint to analyze images with a question (images are optional).
+
+    Sending the request_id of an interrupted request again resumes it from its checkpoint;
+    reusing an id with another question, agent or user_id is rejected with a 409.
     """
+    try:
+        request_id = validate_request_id(request_id) if request_id else uuid.uuid4().hex
+    except ValueError as e:
+        return JSONResponse({"error": str(e), "success": False}, status_code=400)
+
     try:
         # Handle image upload if provided
         image_input = None
@@ -47,7 +109,10 @@ async def analyze(
             image_input = temp_image_paths if len(temp_image_paths) > 1 else temp_image_paths[0]
         
         # Run the analysis with the selected model and agent
-        result = await runner(question, image_input, model, agent)
+        with span("api.analyze", **{"roma.agent": agent, "roma.model": model, "roma.images": len(temp_image_paths)}):
+            result, trace = await runner(
+                question, image_input, model, agent, user_id, request_id=request_id, return_trace=True
+            )
         
         # Clean up temporary files
         for path in temp_image_paths:
@@ -58,20 +123,69 @@ async def analyze(
         
         return JSONResponse({
             "result": result,
+            "request_id": request_id,
+            "trace": trace.summary(),
             "success": True
         })
     
+    except RequestMismatchError as e:
+        return JSONResponse({
+            "error": str(e),
+            "request_id": request_id,
+            "success": False
+        }, status_code=409)
+    except Exception as e:
+        return JSONResponse({
+            "error": str(e),
+            "request_id": request_id,
+            "success": False
+        }, status_code=500)
+
+@app.post("/api/resume/{request_id}")
+async def resume(request_id: str, user_id: int = Form(DEFAULT_USER_ID)):
+    """
+    Resume a checkpointed request from its stored inputs; completed nodes are not re-run.
+
+    Only the user who started the request can resume it; for anyone else it doesn't exist.
+    """
+    try:
+        validate_request_id(request_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e), "success": False}, status_code=400)
+    stored = await get_checkpoint_store().get_request(request_id)
+    if stored is None or stored["user_id"] != user_id:
+        return JSONResponse({"error": f"No checkpoint for request {request_id}", "success": False}, status_code=404)
+
+    try:
+        result, trace = await resume_request(request_id, user_id, return_trace=True)
+        return JSONResponse({
+            "result": result,
+            "request_id": request_id,
+            "trace": trace.summary(),
+            "success": True
+        })
     except Exception as e:
         return JSONResponse({
             "error": str(e),
+            "request_id": request_id,
             "success": False
         }, status_code=500)
 
 @app.get("/api/health")
 async def health():
     """Health check endpoint."""
+    if app.state.memory_enabled:
+        try:
+            await check_clients_health()
+        except RuntimeError as e:
+            return JSONResponse(status_code=503, content={"status": "unhealthy", "error": str(e)})
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """LM call, token, latency and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -7,5 +7,17 @@ Each config file contains:
 - Tool configurations
 - Strategy configurations
 - Memory configurations
+
+Runtime settings (memory, rate limiting, hedging, routing, caches, retries,
+checkpointing, executor memo) start from configs/defaults.py and are overridden per agent.
 """
 
+
+# Map agent names to config module names
+AGENT_CONFIG_MAP = {
+    "general_agent": "configs.general_config",
+    "crypto_agent": "configs.crypto_agent_config",
+    "travel_agent": "configs.travel_agent_config",
+    "self_care_agent": "configs.self_care_agent_config",
+    "capital_one_agent": "configs.c1_agent_config",
+}
@@ -0,0 +1,172 @@
+"""
+Runtime defaults shared by every agent config.
+
+Agent configs start from these and override keys per agent, e.g.
+
+    MEMORY_CONFIG = {**defaults.MEMORY_CONFIG, "enabled": True, "hybrid": True}
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================================
+# Memory Configuration
+# ============================================================================
+MEMORY_CONFIG = {
+    "enabled": False,  # Retrieve and update memories around each request
+    "score_threshold": 0.3,  # Minimum similarity score
+    "limit": 5,  # Return top 5 most relevant memories
+    "vector_size": 1536,  # text-embedding-3-small dims; smaller values truncate (Matryoshka)
+    "quantization": None,  # Options: None (float32), "scalar" (int8), "binary"
+    "rescore": True,  # Rescore quantized candidates with the original vectors
+    "oversampling": 2.0,  # Candidates fetched per result before rescoring
+    "hnsw_m": 16,  # HNSW graph degree
+    "hnsw_ef_construct": 100,  # HNSW build-time beam width
+    "hybrid": False,  # Add BM25 sparse vectors and fuse with dense results (RRF)
+    "prefetch_limit": 20,  # Candidates per retriever before fusion/reranking
+    "reranker": None,  # Optional fastembed cross-encoder, e.g. "Xenova/ms-marco-MiniLM-L-6-v2"
+    "prefilter": True,  # Skip the LLM memory updater for small talk and duplicates
+    "prefilter_similarity": 0.92,  # Retrieval score above which a turn restates a memory
+    "recency_half_life_days": None,  # e.g. 30 to favour recent memories; None disables decay
+    "recency_weight": 0.2,  # Weight of time decay in the final score
+    "frequency_weight": 0.1,  # Weight of access frequency in the final score
+    "recency_mode": "local",  # "local" rescoring or "server" (Qdrant formula query)
+    "archive_after_days": 180,  # Memories older than this and rarely used are archived
+    "category_routing": False,  # Filter search to the goal's closest categories
+    "routing_top_k": 3,  # Categories searched per goal
+    "routing_min_similarity": 0.35,  # Goal-to-category-centroid similarity needed to route
+    "facet_cache_ttl": 300,  # Seconds cached categories/centroids are reused
+    "context_token_budget": 400,  # Max tokens of the injected memory block
+    "inject_into": ["planner", "executor", "aggregator", "verifier"],  # Roles that see memories
+    "multitenant": True,  # Tenant user_id index + per-tenant HNSW graphs
+    "subtask_retrieval": False,  # Executor retrieves its own memories per subtask goal
+    "subtask_limit": 3,  # Memories per subtask
+    "subtask_token_budget": 200,  # Max tokens of a subtask's memory block
+    "subtask_max_concurrency": 4,  # Parallel subtask lookups against Qdrant
+}
+
+# ============================================================================
+# Rate Limiting
+# ============================================================================
+RATE_LIMIT_CONFIG = {
+    "enabled": True,  # Queue LM calls through a shared limiter per provider+model
+    "requests_per_minute": 60,  # Starting request budget (adapted from response headers)
+    "tokens_per_minute": 200_000,  # Starting token budget (adapted from response headers)
+    "adapt_to_headers": True,  # Follow x-ratelimit-* / anthropic-ratelimit-* headers
+    "max_queue_wait": 120,  # Seconds a call may wait for capacity before failing
+    "priority_aging": 10,  # Seconds queued that raise a call one priority level (0 = strict priority)
+    "overrides": {},  # Per provider or model, e.g. {"openrouter": {"requests_per_minute": 200}}
+}
+
+# ============================================================================
+# Hedging
+# ============================================================================
+HEDGING_CONFIG = {
+    "enabled": False,  # Duplicate slow LM calls to a fallback model; first valid answer wins
+    "percentile": 95,  # Hedge once a call runs longer than this percentile of the role's latency
+    "min_samples": 20,  # Latencies observed before the percentile is trusted
+    "initial_delay": 30.0,  # Hedge delay (seconds) until enough latencies are observed
+    "min_delay": 1.0,  # Never hedge earlier than this (seconds)
+    "max_hedge_ratio": 0.1,  # At most this fraction of a role's calls is hedged
+    "fallback_model": os.getenv("FALLBACK_MODEL"),  # None hedges to the same model
+    "fallback_models": {},  # Per role, e.g. {"executor": "openrouter/openai/gpt-4o"}
+    "failover": True,  # Retry a failed call on the fallback model right away
+}
+
+# ============================================================================
+# Model Routing
+# ============================================================================
+ROUTING_CONFIG = {
+    "enabled": False,  # Pick a model per call instead of one model for every role
+    "tiers": {
+        "strong": None,  # None uses the module's configured model
+        "fast": os.getenv("FAST_MODEL"),  # Small, cheap model; unset keeps the module's model
+    },
+    "roles": {  # Preferred tier per role
+        "atomizer": "fast",
+        "planner": "strong",
+        "executor": "strong",
+        "aggregator": "strong",
+        "verifier": "fast",
+    },
+    "escalate_images": 2,  # Calls with at least this many images use the strong tier
+    "escalate_prompt_tokens": 8000,  # Calls with larger prompts use the strong tier
+    "fast_executor_depth": None,  # e.g. 2 sends executor subtasks this deep to the fast tier
+    "max_error_rate": 0.25,  # Skip a tier whose recent error rate is higher
+    "max_p95_latency": 60.0,  # Skip a tier whose recent p95 latency (seconds) is higher
+    "min_samples": 10,  # Calls observed before a tier can be marked unhealthy
+    "log_path": "logs/routing_decisions.jsonl",  # One JSON line per routing decision
+}
+
+# ============================================================================
+# Response Cache
+# ============================================================================
+RESPONSE_CACHE_CONFIG = {
+    "enabled": True,  # Cache module responses (keys use image content hashes)
+    "backend": "memory",  # "memory" (LRU), "sqlite" or "redis" (any Redis-protocol server)
+    "max_entries": 2048,  # LRU size of the memory backend
+    "path": "cache/responses.sqlite",  # File of the sqlite backend
+    "redis_url": os.getenv("REDIS_URL"),  # Server of the redis backend
+    "ttl": {  # Seconds a response is reused, per role; 0 disables caching for the role
+        "atomizer": 0,
+        "planner": 3600,
+        "executor": 600,
+        "aggregator": 3600,
+        "verifier": 0,
+    },
+    "default_ttl": 3600,  # Roles missing from "ttl"
+}
+
+# ============================================================================
+# Prompt Caching
+# ============================================================================
+PROMPT_CACHE_CONFIG = {
+    "enabled": True,  # Mark the stable prompt prefix for provider prompt caching
+    "cache_control_models": ["anthropic/", "claude"],  # Models needing explicit cache_control
+}
+
+# ============================================================================
+# Retry and Repair
+# ============================================================================
+RETRY_CONFIG = {
+    "enabled": True,  # Repair malformed module outputs and retry the failing node
+    "repair": True,  # Fix unparseable outputs locally (JSON cleanup, type coercion) before retrying
+    "max_attempts": 3,  # Attempts per module call, including the first
+    "base_delay": 1.0,  # Backoff before the first retry (seconds); doubles on each retry
+    "max_delay": 20.0,  # Backoff cap (seconds)
+    "jitter": 0.5,  # Up to this fraction of each delay is randomly removed
+    "roles": ["atomizer", "planner", "executor", "aggregator", "verifier"],  # Modules wrapped
+}
+
+# ============================================================================
+# Checkpointing
+# ============================================================================
+CHECKPOINT_CONFIG = {
+    "enabled": False,  # Save each module prediction by request id so interrupted solves can resume
+    "skip_completed": True,  # Resuming a completed request returns its saved result
+}
+
+# ============================================================================
+# Executor Memo
+# ============================================================================
+EXECUTOR_MEMO_CONFIG = {
+    "enabled": True,  # Reuse executor answers to identical subtasks across requests
+    "backend": "memory",  # "memory" (LRU), "sqlite" or "redis" (shared across workers)
+    "max_entries": 4096,  # LRU size of the memory backend
+    "path": "cache/executor_memo.sqlite",  # File of the sqlite backend
+    "redis_url": os.getenv("REDIS_URL"),  # Server of the redis backend
+    "ttl": {  # Seconds an answer is reused, by how it was produced
+        "no_tools": 86400,  # Pure visual/text reasoning
+        "tools": 60,  # Used tools not listed in "tool_ttl" (or unknown which)
+    },
+    "tool_ttl": {  # Per toolkit; the shortest TTL of the toolkits called wins
+        "calculator": 86400,
+        "web_search": 900,
+        "defillama": 300,
+        "coingecko": 60,
+        "binance": 30,
+    },
+    "include_context": True,  # Key on the subtask's context (dependency results) too
+}
@@ -2,6 +2,8 @@ import os
 import dspy
 from dotenv import load_dotenv
 
+from configs import defaults
+
 load_dotenv()
 
 # ============================================================================
@@ -169,9 +171,14 @@ TOOL_CONFIGS = {
 }
 
 # ============================================================================
-# Memory Configuration
+# Runtime Configurations (shared defaults in configs/defaults.py; override keys here)
 # ============================================================================
-MEMORY_CONFIG = {
-    "score_threshold": 0.3,  # Minimum similarity score
-    "limit": 5,  # Return top 5 most relevant memories
-}
\ No newline at end of file
+MEMORY_CONFIG = {**defaults.MEMORY_CONFIG}
+RATE_LIMIT_CONFIG = {**defaults.RATE_LIMIT_CONFIG}
+HEDGING_CONFIG = {**defaults.HEDGING_CONFIG}
+ROUTING_CONFIG = {**defaults.ROUTING_CONFIG}
+RESPONSE_CACHE_CONFIG = {**defaults.RESPONSE_CACHE_CONFIG}
+PROMPT_CACHE_CONFIG = {**defaults.PROMPT_CACHE_CONFIG}
+RETRY_CONFIG = {**defaults.RETRY_CONFIG}
+CHECKPOINT_CONFIG = {**defaults.CHECKPOINT_CONFIG}
+EXECUTOR_MEMO_CONFIG = {**defaults.EXECUTOR_MEMO_CONFIG}
@@ -0,0 +1,134 @@
+"""
+TTL/archival job for cold memories.
+
+Memories older than `archive_after_days` that were retrieved fewer than
+`max_access_count` times are moved to `<collection>_archive`: a collection with on-disk
+vectors and scalar quantization kept off-RAM, so it costs little to keep. The hot
+collection stays small and fast to search.
+
+    python -m memory.archive --collection memories --older-than-days 180
+    python -m memory.archive --all-agents   # every memory-enabled agent, per its MEMORY_CONFIG
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from qdrant_client.models import models
+
+from .schema import ensure_collection, load_all_agent_configs
+from .clients import get_qdrant_client
+from .vectordb import get_collection_config, register_collection_config
+
+
+def archive_collection_name(collection_name: str) -> str:
+    return f"{collection_name}_archive"
+
+
+def cold_memory_filter(older_than_days: float, max_access_count: int) -> models.Filter:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    return models.Filter(
+        must=[models.FieldCondition(key="date", range=models.DatetimeRange(lt=cutoff))],
+        should=[
+            models.IsEmptyCondition(is_empty=models.PayloadField(key="access_count")),
+            models.FieldCondition(key="access_count", range=models.Range(lt=max_access_count)),
+        ],
+    )
+
+
+async def archive_cold_memories(
+    collection_name: str,
+    older_than_days: float = 180,
+    max_access_count: int = 3,
+    archive_name: Optional[str] = None,
+    batch_size: int = 256,
+) -> int:
+    """
+    Move cold memories from a hot collection into its archive collection.
+
+    Each page is upserted into the archive (wait=True) before it is deleted from the
+    hot collection, so an interrupted run never loses memories; re-running it is safe.
+
+    Args:
+        collection_name: Hot collection
+        older_than_days: Only memories dated before now - older_than_days are moved
+        max_access_count: Only memories retrieved fewer times than this are moved
+        archive_name: Archive collection (default: <collection>_archive)
+        batch_size: Points moved per round trip
+
+    Returns:
+        Number of archived memories
+    """
+    archive_name = archive_name or archive_collection_name(collection_name)
+    hot_config = get_collection_config(collection_name)
+    await ensure_collection(
+        archive_name,
+        hot_config.model_copy(
+            update={"on_disk": True, "quantization": "scalar", "always_ram": False}
+        ),
+    )
+
+    scroll_filter = cold_memory_filter(older_than_days, max_access_count)
+    archived = 0
+    # Deleting while scrolling would shift the pages, so restart the scroll after each move
+    while True:
+        records, _ = await get_qdrant_client().scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not records:
+            break
+        await get_qdrant_client().upsert(
+            collection_name=archive_name,
+            points=[
+                models.PointStruct(id=r.id, payload=r.payload, vector=r.vector) for r in records
+            ],
+            wait=True,
+        )
+        await get_qdrant_client().delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=[r.id for r in records]),
+            wait=True,
+        )
+        archived += len(records)
+        print(f"[INFO] Archived {archived} memories from {collection_name} to {archive_name}")
+    return archived
+
+
+async def archive_agent_collections(agent_configs) -> dict[str, int]:
+    """Run the archival job for every memory-enabled agent collection."""
+    results = {}
+    for config in agent_configs:
+        name = getattr(config, "COLLECTION_NAME", None)
+        memory_config = getattr(config, "MEMORY_CONFIG", {})
+        if not name or not memory_config.get("enabled") or name in results:
+            continue
+        register_collection_config(name, memory_config)
+        results[name] = await archive_cold_memories(
+            name, older_than_days=memory_config.get("archive_after_days", 180)
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move cold memories to an archive collection")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--collection")
+    target.add_argument(
+        "--all-agents",
+        action="store_true",
+        help="Archive every memory-enabled agent collection (archive_after_days from its MEMORY_CONFIG)",
+    )
+    parser.add_argument("--older-than-days", type=float, default=180)
+    parser.add_argument("--max-access-count", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.all_agents:
+        print(asyncio.run(archive_agent_collections(load_all_agent_configs())))
+    else:
+        asyncio.run(
+            archive_cold_memories(args.collection, args.older_than_days, args.max_access_count)
+        )
@@ -0,0 +1,214 @@
+"""
+Recall/latency benchmark for memory collections.
+
+Samples stored vectors as queries and compares each search mode against exact
+(brute-force, full precision) search:
+
+    python -m memory.benchmark --collection memories --samples 200 --limit 5
+
+To measure a Matryoshka-truncated collection, pass the full-size collection as
+--reference. Queries are drawn from the reference, truncated to the target size
+and compared against the reference's exact results (point ids must match, e.g.
+both collections were loaded from the same export).
+
+With --batch, measures per-query latency of search_memories_batch against one
+search_memories call per query, at batch sizes 1-64:
+
+    python -m memory.benchmark --collection memories --batch --user-id 1
+"""
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+from qdrant_client.models import models
+
+from .clients import get_qdrant_client
+from .vectordb import (
+    DEFAULT_USER_ID,
+    DENSE_VECTOR_NAME,
+    search_memories,
+    search_memories_batch,
+)
+
+
+SEARCH_MODES = {
+    "float32": models.SearchParams(quantization=models.QuantizationSearchParams(ignore=True)),
+    "quantized": models.SearchParams(
+        quantization=models.QuantizationSearchParams(ignore=False, rescore=False)
+    ),
+    "quantized+rescore": models.SearchParams(
+        quantization=models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+    ),
+}
+
+
+def truncate_vector(vector: list[float], size: int) -> list[float]:
+    """Keep the first `size` dimensions and re-normalize (Matryoshka truncation)."""
+    arr = np.asarray(vector[:size], dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return (arr / norm if norm > 0 else arr).tolist()
+
+
+async def _dense_layout(collection_name: str) -> tuple[Optional[str], int]:
+    """(vector name to query, dense size); hybrid collections store named vectors."""
+    vectors = (await get_qdrant_client().get_collection(collection_name)).config.params.vectors
+    if isinstance(vectors, dict):
+        return DENSE_VECTOR_NAME, vectors[DENSE_VECTOR_NAME].size
+    return None, vectors.size
+
+
+async def _sample_vectors(collection_name: str, samples: int) -> list[list[float]]:
+    records, _ = await get_qdrant_client().scroll(
+        collection_name=collection_name,
+        limit=samples,
+        with_payload=False,
+        with_vectors=True,
+    )
+    vectors = [record.vector for record in records if record.vector is not None]
+    return [v[DENSE_VECTOR_NAME] if isinstance(v, dict) else v for v in vectors]
+
+
+async def _timed_search(collection_name, vector, limit, search_params, using=None):
+    start = time.perf_counter()
+    out = await get_qdrant_client().query_points(
+        collection_name=collection_name,
+        query=vector,
+        using=using,
+        limit=limit,
+        with_payload=False,
+        search_params=search_params,
+    )
+    return time.perf_counter() - start, [point.id for point in out.points]
+
+
+async def benchmark_collection(
+    collection_name: str,
+    samples: int = 100,
+    limit: int = 5,
+    reference_collection: Optional[str] = None,
+) -> dict:
+    """
+    Measure recall@limit and latency of each search mode against exact search.
+
+    Args:
+        collection_name: Collection under test
+        samples: Number of stored vectors to use as queries
+        limit: Number of results per query (the k in recall@k)
+        reference_collection: Optional full-size collection providing the ground truth
+
+    Returns:
+        Dict mapping mode name to {"recall", "p50_ms", "p95_ms"}
+    """
+    truth_collection = reference_collection or collection_name
+    queries = await _sample_vectors(truth_collection, samples)
+    if not queries:
+        raise ValueError(f"Collection {truth_collection} has no vectors to sample")
+
+    using, target_size = await _dense_layout(collection_name)
+    truth_using, _ = await _dense_layout(truth_collection)
+
+    exact = models.SearchParams(exact=True)
+    truth = [
+        set((await _timed_search(truth_collection, q, limit, exact, truth_using))[1])
+        for q in queries
+    ]
+    targets = [truncate_vector(q, target_size) if len(q) > target_size else q for q in queries]
+
+    report = {}
+    for mode, search_params in SEARCH_MODES.items():
+        latencies, hits = [], 0
+        for vector, expected in zip(targets, truth):
+            latency, ids = await _timed_search(collection_name, vector, limit, search_params, using)
+            latencies.append(latency * 1000)
+            hits += len(expected.intersection(ids))
+        report[mode] = {
+            "recall": hits / max(1, sum(len(t) for t in truth)),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+    return report
+
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+
+async def benchmark_batch_search(
+    collection_name: str,
+    user_id: int = DEFAULT_USER_ID,
+    limit: int = 5,
+    batch_sizes: tuple[int, ...] = BATCH_SIZES,
+    repeats: int = 5,
+) -> dict:
+    """
+    Compare per-query latency of batched and one-at-a-time memory search.
+
+    Args:
+        collection_name: Collection under test
+        user_id: User whose memories are searched
+        limit: Number of results per query
+        batch_sizes: Numbers of queries sent together
+        repeats: Timed runs per batch size (the median is reported)
+
+    Returns:
+        Dict mapping batch size to {"batch_ms_per_query", "sequential_ms_per_query"}
+    """
+    queries = await _sample_vectors(collection_name, max(batch_sizes))
+    if not queries:
+        raise ValueError(f"Collection {collection_name} has no vectors to sample")
+
+    report = {}
+    for size in batch_sizes:
+        batch = [queries[i % len(queries)] for i in range(size)]
+        batched, sequential = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            await search_memories_batch(batch, collection_name, user_id, limit=limit)
+            batched.append((time.perf_counter() - start) * 1000 / size)
+
+            start = time.perf_counter()
+            for vector in batch:
+                await search_memories(vector, collection_name, user_id, limit=limit)
+            sequential.append((time.perf_counter() - start) * 1000 / size)
+        report[size] = {
+            "batch_ms_per_query": float(np.median(batched)),
+            "sequential_ms_per_query": float(np.median(sequential)),
+        }
+    return report
+
+
+def print_batch_report(report: dict):
+    print(f"{'batch':<10}{'batched ms/q':>15}{'sequential ms/q':>18}")
+    for size, row in report.items():
+        print(
+            f"{size:<10}{row['batch_ms_per_query']:>15.2f}{row['sequential_ms_per_query']:>18.2f}"
+        )
+
+
+def print_report(report: dict):
+    print(f"{'mode':<20}{'recall':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, row in report.items():
+        print(f"{mode:<20}{row['recall']:>10.3f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--reference", default=None)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--batch", action="store_true", help="Benchmark batched search instead")
+    parser.add_argument("--user-id", type=int, default=DEFAULT_USER_ID)
+    args = parser.parse_args()
+
+    if args.batch:
+        print_batch_report(
+            asyncio.run(benchmark_batch_search(args.collection, args.user_id, args.limit))
+        )
+    else:
+        print_report(
+            asyncio.run(
+                benchmark_collection(args.collection, args.samples, args.limit, args.reference)
+            )
+        )
@@ -0,0 +1,156 @@
+"""
+Category-routed memory search.
+
+Instead of searching every memory, the goal embedding is compared against one centroid
+per category (the mean of a sample of that category's stored vectors) and the search is
+filtered to the closest categories. Facets and centroids are built from the user's own
+memories (collections are shared by tenants) and cached per collection and user; they
+are dropped whenever the collection is written through memory.vectordb / consolidation /
+ingest, so new categories show up on the next request.
+"""
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+from qdrant_client.models import models
+
+from .clients import get_qdrant_client
+from .vectordb import (
+    DENSE_VECTOR_NAME,
+    get_all_categories,
+    on_categories_changed,
+    search_memories,
+    user_filter,
+)
+
+# (collection, user_id) -> (monotonic time built, category names, unit-norm centroid matrix)
+_centroid_cache: dict[tuple[str, int], tuple[float, list[str], np.ndarray]] = {}
+_centroid_locks: dict[tuple[str, int], asyncio.Lock] = {}
+
+
+def _drop_centroids(collection_name: str):
+    for key in [key for key in _centroid_cache if key[0] == collection_name]:
+        _centroid_cache.pop(key, None)
+
+
+on_categories_changed(_drop_centroids)
+
+
+async def _category_centroid(collection_name: str, user_id: int, category: str, sample_size: int):
+    records, _ = await get_qdrant_client().scroll(
+        collection_name=collection_name,
+        scroll_filter=user_filter(
+            user_id,
+            [models.FieldCondition(key="categories", match=models.MatchValue(value=category))],
+        ),
+        limit=sample_size,
+        with_payload=False,
+        with_vectors=True,
+    )
+    vectors = [
+        r.vector[DENSE_VECTOR_NAME] if isinstance(r.vector, dict) else r.vector
+        for r in records
+        if r.vector is not None
+    ]
+    if not vectors:
+        return None
+    centroid = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    norm = np.linalg.norm(centroid)
+    return centroid / norm if norm > 0 else None
+
+
+async def get_category_centroids(
+    collection_name: str,
+    user_id: int,
+    max_age: float = 300,
+    sample_size: int = 64,
+    max_concurrency: int = 8,
+) -> tuple[list[str], np.ndarray]:
+    """
+    Cached (category names, centroid matrix) of one user's memories in a collection.
+
+    Args:
+        collection_name: Collection to route
+        user_id: User whose memories the centroids are built from
+        max_age: Seconds a cached result may be reused
+        sample_size: Vectors sampled per category to build its centroid
+        max_concurrency: Parallel scrolls while (re)building
+
+    Returns:
+        Category names and a (n_categories, dim) matrix of unit-norm centroids
+    """
+    key = (collection_name, user_id)
+    lock = _centroid_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached = _centroid_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[1], cached[2]
+
+        categories = await get_all_categories(collection_name, max_age=max_age, user_id=user_id)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def build(category):
+            async with slots:
+                return await _category_centroid(collection_name, user_id, category, sample_size)
+
+        centroids = await asyncio.gather(*(build(c) for c in categories))
+        names = [c for c, v in zip(categories, centroids) if v is not None]
+        matrix = np.stack([v for v in centroids if v is not None]) if names else np.empty((0, 0))
+        _centroid_cache[key] = (time.monotonic(), names, matrix)
+        return names, matrix
+
+
+async def route_categories(
+    goal_embedding: list[float],
+    collection_name: str,
+    user_id: int,
+    top_k: int = 3,
+    min_similarity: float = 0.35,
+    max_age: float = 300,
+) -> list[str]:
+    """The user's categories whose centroids are closest to the goal (may be empty)."""
+    names, matrix = await get_category_centroids(collection_name, user_id, max_age=max_age)
+    if not names:
+        return []
+    query = np.asarray(goal_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    similarities = matrix @ query
+    best = np.argsort(-similarities)[:top_k]
+    return [names[i] for i in best if similarities[i] >= min_similarity]
+
+
+async def routed_search_memories(
+    search_vector: list[float],
+    collection_name: str,
+    user_id: int,
+    memory_config: dict,
+    query_text: Optional[str] = None,
+):
+    """
+    search_memories restricted to the goal's likely categories.
+
+    Falls back to an unfiltered search when no category is close enough or the
+    filtered search returns nothing, so routing never loses recall entirely.
+    """
+    search_kwargs = dict(
+        search_vector=search_vector,
+        collection_name=collection_name,
+        user_id=user_id,
+        score_threshold=memory_config["score_threshold"],
+        limit=memory_config["limit"],
+        query_text=query_text,
+    )
+    categories = await route_categories(
+        search_vector,
+        collection_name,
+        user_id,
+        top_k=memory_config.get("routing_top_k", 3),
+        min_similarity=memory_config.get("routing_min_similarity", 0.35),
+        max_age=memory_config.get("facet_cache_ttl", 300),
+    )
+    if categories:
+        memories = await search_memories(categories=categories, **search_kwargs)
+        if memories:
+            return memories
+    return await search_memories(categories=None, **search_kwargs)
@@ -0,0 +1,148 @@
+"""
+Managed Qdrant and OpenAI clients.
+
+Clients are created once per process (at API startup, or lazily on first use in CLI
+scripts), share pooled keep-alive connections, and are closed on shutdown. Settings come
+from the environment and are validated up front, so a missing QDRANT_URL fails at boot
+instead of as a "None" URL on the first request.
+
+Environment:
+    QDRANT_URL            http(s)://host:port, ":memory:" or a local path (embedded mode)
+    QDRANT_API_KEY        Optional API key
+    QDRANT_PREFER_GRPC    "true" to use gRPC (port QDRANT_GRPC_PORT, default 6334)
+    QDRANT_TIMEOUT        Request timeout in seconds (default 10)
+    OPENAI_TIMEOUT        Embedding request timeout in seconds (default 30)
+    OPENAI_MAX_CONNECTIONS  Pooled connections to the embeddings API (default 20)
+"""
+import os
+from typing import Optional
+
+import httpx
+import openai
+from pydantic import BaseModel
+from qdrant_client import AsyncQdrantClient
+
+
+class ClientSettings(BaseModel):
+    qdrant_url: Optional[str] = None
+    qdrant_api_key: Optional[str] = None
+    qdrant_prefer_grpc: bool = False
+    qdrant_grpc_port: int = 6334
+    qdrant_timeout: int = 10
+    openai_timeout: float = 30.0
+    openai_max_connections: int = 20
+    openai_keepalive_expiry: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        return cls(
+            qdrant_url=os.getenv("QDRANT_URL") or None,
+            qdrant_api_key=os.getenv("QDRANT_API_KEY") or None,
+            qdrant_prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+            qdrant_grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            qdrant_timeout=int(os.getenv("QDRANT_TIMEOUT", "10")),
+            openai_timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+            openai_max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+        )
+
+    def validate_for_memory(self):
+        if not self.qdrant_url:
+            raise ValueError("QDRANT_URL must be set when memory is enabled")
+
+
+_settings: Optional[ClientSettings] = None
+_qdrant: Optional[AsyncQdrantClient] = None
+_openai: Optional[openai.AsyncClient] = None
+
+
+def get_client_settings() -> ClientSettings:
+    global _settings
+    if _settings is None:
+        _settings = ClientSettings.from_env()
+    return _settings
+
+
+def _create_qdrant_client(settings: ClientSettings) -> AsyncQdrantClient:
+    settings.validate_for_memory()
+    url = settings.qdrant_url
+    if url == ":memory:":
+        return AsyncQdrantClient(location=":memory:")
+    if not url.startswith(("http://", "https://")):
+        # Embedded local mode, persisted under a directory
+        return AsyncQdrantClient(path=url)
+    return AsyncQdrantClient(
+        url=url,
+        api_key=settings.qdrant_api_key,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        timeout=settings.qdrant_timeout,
+    )
+
+
+def _create_openai_client(settings: ClientSettings) -> openai.AsyncClient:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        ),
+        timeout=settings.openai_timeout,
+    )
+    return openai.AsyncClient(http_client=http_client, timeout=settings.openai_timeout)
+
+
+def get_qdrant_client() -> AsyncQdrantClient:
+    global _qdrant
+    if _qdrant is None:
+        _qdrant = _create_qdrant_client(get_client_settings())
+    return _qdrant
+
+
+def get_embedding_client() -> openai.AsyncClient:
+    global _openai
+    if _openai is None:
+        _openai = _create_openai_client(get_client_settings())
+    return _openai
+
+
+def is_local_qdrant() -> bool:
+    """True when Qdrant runs embedded in this process (":memory:" or a path)."""
+    url = get_client_settings().qdrant_url or ""
+    return not url.startswith(("http://", "https://"))
+
+
+async def check_clients_health():
+    """
+    Round-trip to Qdrant and validate the OpenAI configuration.
+
+    Raises:
+        ValueError: If QDRANT_URL is not set
+        RuntimeError: If Qdrant is unreachable or OPENAI_API_KEY is missing
+    """
+    qdrant = get_qdrant_client()
+    try:
+        await qdrant.get_collections()
+    except Exception as e:
+        raise RuntimeError(f"Qdrant at {get_client_settings().qdrant_url} is unreachable: {e}") from e
+    try:
+        get_embedding_client()
+    except openai.OpenAIError as e:
+        raise RuntimeError(f"Embedding client is misconfigured: {e}") from e
+
+
+async def startup_clients():
+    """Create the clients and fail fast if they can't be used. Call once at process start."""
+    global _settings
+    _settings = ClientSettings.from_env()
+    await check_clients_health()
+
+
+async def shutdown_clients():
+    """Close pooled connections. Call once at process shutdown."""
+    global _qdrant, _openai
+    if _qdrant is not None:
+        await _qdrant.close()
+        _qdrant = None
+    if _openai is not None:
+        await _openai.close()
+        _openai = None
@@ -0,0 +1,162 @@
+"""
+Memory consolidation engine.
+
+The memory updater no longer writes to Qdrant while it reasons. Its tools record
+ADD/UPDATE/DELETE operations into a ConsolidationPlan; once the plan is complete it is
+applied with one batched embedding call and a single `batch_update_points` request:
+
+- UPDATE keeps the point id and overwrites it in place (upsert), or only rewrites the
+  payload (set_payload) when the text is unchanged, so readers never see the memory
+  missing or duplicated.
+- ADD derives its id from the user and normalized text, so two concurrent updaters
+  adding the same fact converge on one point.
+"""
+from typing import Literal, Optional
+from uuid import NAMESPACE_URL, uuid5
+
+from pydantic import BaseModel
+from qdrant_client.models import models
+
+from .clients import get_qdrant_client
+from .generate_embeddings import generate_embeddings
+from .vectordb import (
+    COLLECTION_NAME,
+    RetrievedMemory,
+    build_point_vector,
+    get_collection_config,
+    invalidate_category_cache,
+    memory_timestamp,
+)
+
+
+class MemoryOperation(BaseModel):
+    action: Literal["ADD", "UPDATE", "DELETE"]
+    point_id: str
+    memory_text: Optional[str] = None
+    categories: list[str] = []
+
+
+def stable_memory_id(user_id: int, memory_text: str) -> str:
+    normalized = " ".join(memory_text.lower().split())
+    return str(uuid5(NAMESPACE_URL, f"memory:{user_id}:{normalized}"))
+
+
+class ConsolidationPlan:
+    """
+    The net set of operations produced by one memory update.
+
+    Later operations on the same memory replace earlier ones (e.g. UPDATE then DELETE
+    becomes a single DELETE), so the applied batch never contradicts itself.
+    """
+
+    def __init__(self, user_id: int, existing_memories: list[RetrievedMemory]):
+        self.user_id = user_id
+        self.existing_memories = existing_memories
+        self._operations: dict[str, MemoryOperation] = {}
+
+    def _point_id(self, memory_id: int) -> str:
+        if not 0 <= memory_id < len(self.existing_memories):
+            raise IndexError(f"Unknown memory_id {memory_id}")
+        return self.existing_memories[memory_id].point_id
+
+    def add(self, memory_text: str, categories: list[str]):
+        point_id = stable_memory_id(self.user_id, memory_text)
+        self._operations[point_id] = MemoryOperation(
+            action="ADD", point_id=point_id, memory_text=memory_text, categories=categories
+        )
+
+    def update(self, memory_id: int, memory_text: str, categories: list[str]):
+        point_id = self._point_id(memory_id)
+        self._operations[point_id] = MemoryOperation(
+            action="UPDATE", point_id=point_id, memory_text=memory_text, categories=categories
+        )
+
+    def delete(self, memory_id: int):
+        point_id = self._point_id(memory_id)
+        self._operations[point_id] = MemoryOperation(action="DELETE", point_id=point_id)
+
+    @property
+    def operations(self) -> list[MemoryOperation]:
+        return list(self._operations.values())
+
+    def __len__(self):
+        return len(self._operations)
+
+
+async def apply_plan(plan: ConsolidationPlan, collection_name: str = COLLECTION_NAME) -> dict:
+    """
+    Apply a plan with one embedding call and one batch_update_points request.
+
+    Args:
+        plan: Operations recorded by the memory updater
+        collection_name: Collection holding the user's memories
+
+    Returns:
+        Counts of applied operations per action
+    """
+    counts = {"ADD": 0, "UPDATE": 0, "DELETE": 0}
+    if not plan:
+        return counts
+
+    existing = {m.point_id: m for m in plan.existing_memories}
+    date = memory_timestamp()
+
+    def payload_for(op: MemoryOperation) -> dict:
+        return {
+            "user_id": plan.user_id,
+            "categories": op.categories,
+            "memory_text": op.memory_text,
+            "date": date,
+        }
+
+    to_embed, payload_only, to_delete = [], [], []
+    for op in plan.operations:
+        counts[op.action] += 1
+        if op.action == "DELETE":
+            to_delete.append(op.point_id)
+        elif op.action == "UPDATE" and existing[op.point_id].memory_text == op.memory_text:
+            payload_only.append(op)
+        else:
+            to_embed.append(op)
+
+    config = get_collection_config(collection_name)
+    embeddings = (
+        await generate_embeddings([op.memory_text for op in to_embed], dimensions=config.vector_size)
+        if to_embed
+        else []
+    )
+
+    update_operations: list = []
+    if to_embed:
+        update_operations.append(
+            models.UpsertOperation(
+                upsert=models.PointsList(
+                    points=[
+                        models.PointStruct(
+                            id=op.point_id,
+                            payload=payload_for(op),
+                            vector=build_point_vector(embedding, op.memory_text, config),
+                        )
+                        for op, embedding in zip(to_embed, embeddings)
+                    ]
+                )
+            )
+        )
+    for op in payload_only:
+        update_operations.append(
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(payload=payload_for(op), points=[op.point_id])
+            )
+        )
+    if to_delete:
+        update_operations.append(
+            models.DeleteOperation(delete=models.PointIdsList(points=to_delete))
+        )
+
+    await get_qdrant_client().batch_update_points(
+        collection_name=collection_name,
+        update_operations=update_operations,
+        wait=True,
+    )
+    invalidate_category_cache(collection_name)
+    return counts
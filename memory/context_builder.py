@@ -0,0 +1,113 @@
+"""
+Memory-context builder.
+
+Turns retrieved memories into the block injected into the solver's prompts, under a
+token budget: exact duplicates are dropped, near-identical memories share one line (each
+wording kept, categories merged, so no fact is lost), and lines are added best-first
+until the budget is spent. The built block is cached, so a request (and retries of it)
+compresses the same memories only once.
+"""
+from collections import OrderedDict
+from typing import Optional
+
+from .prefilter import hamming_distance, simhash
+from .scoring import memory_relevance
+
+MEMORY_CONTEXT_HEADER = "\n\n## Relevant Memories from Previous Interactions:\n"
+
+# Rough estimate used across the project: 4 characters ≈ 1 token
+CHARS_PER_TOKEN = 4
+
+_context_cache: "OrderedDict[tuple, Optional[str]]" = OrderedDict()
+_CONTEXT_CACHE_SIZE = 256
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+# Simhashes of short texts are close even for different facts; only merge near-identical ones
+DEFAULT_MAX_HAMMING = 3
+
+
+def cluster_memories(memories: list, max_hamming: int = DEFAULT_MAX_HAMMING) -> list[list]:
+    """
+    Group near-identical memories, best first.
+
+    Args:
+        memories: RetrievedMemory objects
+        max_hamming: Simhash distance under which two memories state the same fact
+
+    Returns:
+        Clusters (lists of memories) ordered by their best score; each cluster's
+        first element is its representative
+    """
+    clusters: list[tuple[int, list]] = []
+    seen_texts = set()
+    for memory in sorted(memories, key=lambda m: m.score, reverse=True):
+        normalized = " ".join(memory.memory_text.lower().split())
+        if normalized in seen_texts:
+            continue
+        seen_texts.add(normalized)
+        fingerprint = simhash(memory.memory_text)
+        for representative, members in clusters:
+            if hamming_distance(fingerprint, representative) <= max_hamming:
+                members.append(memory)
+                break
+        else:
+            clusters.append((fingerprint, [memory]))
+    return [members for _, members in clusters]
+
+
+def _format_cluster(members: list) -> str:
+    best = members[0]
+    categories = list(dict.fromkeys(c for m in members for c in m.categories))
+    text = " / ".join(m.memory_text for m in members)
+    return f"{text} (Categories: {categories}) Relevance: {memory_relevance(best):.2f}"
+
+
+def build_memory_context(
+    memories: list,
+    token_budget: int = 400,
+    max_hamming: int = DEFAULT_MAX_HAMMING,
+) -> Optional[str]:
+    """
+    Build the compressed memory block injected into the solver's prompts.
+
+    Args:
+        memories: RetrievedMemory objects
+        token_budget: Approximate maximum size of the block in tokens
+        max_hamming: Simhash distance for clustering near-identical memories
+
+    Returns:
+        The memory block, or None when there is nothing to inject
+    """
+    if not memories:
+        return None
+    key = (
+        tuple((m.point_id, m.memory_text, round(m.score, 4)) for m in memories),
+        token_budget,
+        max_hamming,
+    )
+    if key in _context_cache:
+        _context_cache.move_to_end(key)
+        return _context_cache[key]
+
+    lines = []
+    remaining = token_budget - estimate_tokens(MEMORY_CONTEXT_HEADER)
+    for members in cluster_memories(memories, max_hamming):
+        line = "- " + _format_cluster(members)
+        cost = estimate_tokens(line) + 1
+        if cost > remaining:
+            if not lines and remaining > 0:
+                # Always keep (a truncated) best memory rather than nothing
+                lines.append(line[: remaining * CHARS_PER_TOKEN].rstrip() + "…")
+            break
+        lines.append(line)
+        remaining -= cost
+
+    context = MEMORY_CONTEXT_HEADER + "\n".join(lines) if lines else None
+    _context_cache[key] = context
+    if len(_context_cache) > _CONTEXT_CACHE_SIZE:
+        _context_cache.popitem(last=False)
+    return context
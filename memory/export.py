@@ -0,0 +1,202 @@
+"""
+Bulk export/import of memory collections for backups and migrations.
+
+Points are streamed with scroll pagination, so memory use stays bounded by the batch
+size whatever the collection size. Two formats are supported, chosen by file suffix:
+
+- .ndjson / .jsonl: one {"id", "vector", "payload"} object per line
+- .parquet: columns id, payload (JSON), vector (list<float32>) and named_vectors (JSON)
+  for collections with named vectors. Requires pyarrow.
+
+    python -m memory.export export --collection memories --path backup.ndjson [--user-id 1]
+    python -m memory.export import --collection memories_copy --path backup.ndjson
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from qdrant_client.models import models
+
+from .clients import get_qdrant_client
+from .vectordb import scroll_records, user_filter
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export/import requires pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def _format_of(path: Path) -> str:
+    if path.suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if path.suffix == ".parquet":
+        return "parquet"
+    raise ValueError(f"Unsupported export format for {path} (use .ndjson, .jsonl or .parquet)")
+
+
+def _point_id(raw: str):
+    # Qdrant ids are unsigned integers or UUIDs; both are stored as strings
+    return int(raw) if raw.isdigit() else raw
+
+
+def _to_jsonable(vector):
+    if isinstance(vector, dict):
+        return {
+            name: value.model_dump() if hasattr(value, "model_dump") else value
+            for name, value in vector.items()
+        }
+    return vector
+
+
+async def export_collection(
+    collection_name: str,
+    path: str,
+    user_id: Optional[int] = None,
+    batch_size: int = 512,
+    with_vectors: bool = True,
+) -> int:
+    """
+    Stream a collection (or one user's slice of it) to an NDJSON or Parquet file.
+
+    Args:
+        collection_name: Collection to export
+        path: Output file; the suffix selects the format
+        user_id: Only export this user's memories
+        batch_size: Points per scroll page / Parquet row group
+        with_vectors: Include vectors (needed to re-import without re-embedding)
+
+    Returns:
+        Number of exported points
+    """
+    out_path = Path(path)
+    fmt = _format_of(out_path)
+    scroll_filter = user_filter(user_id) if user_id is not None else None
+    pages = scroll_records(collection_name, scroll_filter, batch_size, with_vectors)
+    exported = 0
+
+    if fmt == "ndjson":
+        with out_path.open("w") as f:
+            async for records in pages:
+                for record in records:
+                    row = {"id": str(record.id), "vector": _to_jsonable(record.vector), "payload": record.payload}
+                    f.write(json.dumps(row) + "\n")
+                exported += len(records)
+        return exported
+
+    pa, pq = _require_pyarrow()
+    schema = pa.schema(
+        [
+            ("id", pa.string()),
+            ("payload", pa.string()),
+            ("vector", pa.list_(pa.float32())),
+            ("named_vectors", pa.string()),
+        ]
+    )
+    with pq.ParquetWriter(out_path, schema) as writer:
+        async for records in pages:
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        [str(r.id) for r in records],
+                        [json.dumps(r.payload) for r in records],
+                        [r.vector if isinstance(r.vector, list) else None for r in records],
+                        [
+                            json.dumps(_to_jsonable(r.vector)) if isinstance(r.vector, dict) else None
+                            for r in records
+                        ],
+                    ],
+                    schema=schema,
+                )
+            )
+            exported += len(records)
+    return exported
+
+
+def _checked_vector(path: Path, row: dict, vector):
+    # A payload-only export (--no-vectors) can't be upserted; fail before building the point
+    if vector is None:
+        raise ValueError(f"{path} was exported without vectors and can't be imported (point {row['id']})")
+    return vector
+
+
+async def _read_batches(path: Path, batch_size: int) -> AsyncIterator[list[models.PointStruct]]:
+    fmt = _format_of(path)
+    if fmt == "ndjson":
+        batch = []
+        with path.open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                vector = _checked_vector(path, row, row.get("vector"))
+                batch.append(models.PointStruct(id=_point_id(row["id"]), vector=vector, payload=row["payload"]))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+        return
+
+    _, pq = _require_pyarrow()
+    for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        rows = record_batch.to_pylist()
+        yield [
+            models.PointStruct(
+                id=_point_id(row["id"]),
+                vector=_checked_vector(
+                    path,
+                    row,
+                    row["vector"] if row["vector"] is not None else json.loads(row["named_vectors"] or "null"),
+                ),
+                payload=json.loads(row["payload"]),
+            )
+            for row in rows
+        ]
+
+
+async def import_collection(path: str, collection_name: str, batch_size: int = 512) -> int:
+    """
+    Upsert an exported file into a collection, keeping the original point ids.
+
+    The target collection must already exist with a matching vector layout
+    (see memory.schema.ensure_collection). Re-running an import is idempotent.
+
+    Returns:
+        Number of imported points
+
+    Raises:
+        ValueError: If the file was exported without vectors
+    """
+    imported = 0
+    async for points in _read_batches(Path(path), batch_size):
+        await get_qdrant_client().upsert(collection_name=collection_name, points=points, wait=True)
+        imported += len(points)
+        print(f"[INFO] Imported {imported} points into {collection_name}")
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import a memory collection")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--path", required=True)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--no-vectors", action="store_true", help="Export payloads only")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        count = asyncio.run(
+            export_collection(
+                args.collection, args.path, args.user_id, args.batch_size, not args.no_vectors
+            )
+        )
+    else:
+        count = asyncio.run(import_collection(args.path, args.collection, args.batch_size))
+    print(f"[INFO] {args.command}ed {count} points")
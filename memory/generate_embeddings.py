@@ -1,8 +1,11 @@
-import asyncio
-import openai
-import numpy as np
+from roma_vlm.runtime import traced
+from .clients import get_embedding_client
 
-client = openai.AsyncClient()
-async def generate_embeddings(strings: list[str]):
-    out = await client.embeddings.create(input=strings,model="text-embedding-3-small",dimensions=1536)
-    return [item.embedding for item in out.data]
\ No newline at end of file
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+@traced("memory.embed")
+async def generate_embeddings(strings: list[str], dimensions: int = 1536):
+    # text-embedding-3 models are Matryoshka-trained, so the API returns a truncated,
+    # re-normalized vector when dimensions < 1536
+    out = await get_embedding_client().embeddings.create(input=strings,model=EMBEDDING_MODEL,dimensions=dimensions)
+    return [item.embedding for item in out.data]
@@ -0,0 +1,269 @@
+"""
+Streaming bulk ingestion of memories from CSV or Parquet files.
+
+Rows are read in chunks, embedded in provider-sized batches with a bounded number of
+concurrent embedding requests (retried with backoff), and upserted with wait=False in
+parallel. Progress is checkpointed next to the source file, so an interrupted import
+resumes where it stopped instead of starting over. Point ids are derived from the
+source path and row number, so re-ingesting a row overwrites it instead of duplicating it.
+
+    python -m memory.ingest memories.csv --collection memories --text-column text \\
+        --categories-column categories --date-column date --user-id 1
+"""
+import argparse
+import ast
+import asyncio
+import json
+import random
+from pathlib import Path
+from typing import Iterator, Optional
+from uuid import NAMESPACE_URL, uuid5
+
+import pandas as pd
+from qdrant_client.models import models
+
+from .clients import get_qdrant_client
+from .generate_embeddings import generate_embeddings
+from .vectordb import (
+    build_point_vector,
+    get_collection_config,
+    invalidate_category_cache,
+    memory_timestamp,
+)
+
+
+class IngestCheckpoint:
+    """Tracks the contiguous prefix of rows that are embedded and upserted."""
+
+    def __init__(self, path: Path, source: str, collection_name: str):
+        self.path = path
+        self.source = source
+        self.collection_name = collection_name
+        self.rows_done = 0
+        self._finished: dict[int, int] = {}
+        if path.exists():
+            state = json.loads(path.read_text())
+            if state.get("source") == source and state.get("collection") == collection_name:
+                self.rows_done = state["rows_done"]
+
+    def mark_done(self, start: int, count: int):
+        # Chunks finish out of order; only advance over the completed prefix
+        self._finished[start] = count
+        while self.rows_done in self._finished:
+            self.rows_done += self._finished.pop(self.rows_done)
+        self.path.write_text(
+            json.dumps(
+                {"source": self.source, "collection": self.collection_name, "rows_done": self.rows_done}
+            )
+        )
+
+
+def parse_categories(raw, separator: str = ",") -> list[str]:
+    """Parse a categories cell written either as a Python list literal or a separated string."""
+    if not isinstance(raw, str):
+        return []
+    try:
+        parsed = ast.literal_eval(raw)
+        if isinstance(parsed, list):
+            return [str(c).strip() for c in parsed]
+        return [str(parsed).strip()]
+    except Exception:
+        return [c.strip() for c in raw.split(separator) if c.strip()]
+
+
+def read_chunks(path: Path, chunk_size: int, skip_rows: int = 0) -> Iterator[tuple[int, pd.DataFrame]]:
+    """
+    Yield (first_row_index, dataframe) chunks of a CSV or Parquet file, skipping done rows.
+    """
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet ingestion requires pyarrow: pip install pyarrow") from e
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            end = start + batch.num_rows
+            if end > skip_rows:
+                df = batch.to_pandas()
+                offset = max(0, skip_rows - start)
+                yield start + offset, df.iloc[offset:]
+            start = end
+        return
+
+    # Skip done rows by record count: quoted fields may span several physical lines, so
+    # skipping lines with skiprows would land in the wrong record
+    start = 0
+    for df in pd.read_csv(path, chunksize=chunk_size):
+        end = start + len(df)
+        if end > skip_rows:
+            offset = max(0, skip_rows - start)
+            yield start + offset, df.iloc[offset:]
+        start = end
+
+
+async def _with_retries(make_call, max_retries: int, what: str):
+    for attempt in range(max_retries + 1):
+        try:
+            return await make_call()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+            print(f"[WARN] {what} failed ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def ingest_file(
+    path: str,
+    collection_name: str,
+    text_column: str,
+    user_id: Optional[int] = None,
+    user_id_column: Optional[str] = None,
+    categories_column: Optional[str] = None,
+    date_column: Optional[str] = None,
+    category_separator: str = ",",
+    chunk_size: int = 5000,
+    embed_batch_size: int = 512,
+    max_concurrent_embeddings: int = 4,
+    max_concurrent_upserts: int = 4,
+    max_retries: int = 5,
+    checkpoint_path: Optional[str] = None,
+) -> int:
+    """
+    Ingest a CSV/Parquet file into a memory collection, resuming from the last checkpoint.
+
+    Args:
+        path: CSV or Parquet file
+        collection_name: Target collection (must exist, see memory.schema)
+        text_column: Column with the memory text
+        user_id: User owning every row (or use user_id_column)
+        user_id_column: Column with the owning user id
+        categories_column: Optional column with categories
+        date_column: Optional column with the memory date
+        category_separator: Separator for plain-string categories
+        chunk_size: Rows read and checkpointed together
+        embed_batch_size: Texts per embedding request (OpenAI accepts up to 2048)
+        max_concurrent_embeddings: Embedding requests in flight at once
+        max_concurrent_upserts: Upsert requests in flight at once
+        max_retries: Retries per embedding/upsert request
+        checkpoint_path: Progress file (default: <path>.<collection>.checkpoint.json)
+
+    Returns:
+        Number of rows ingested by this run
+    """
+    if user_id is None and user_id_column is None:
+        raise ValueError("Pass either user_id or user_id_column")
+
+    source = Path(path)
+    checkpoint = IngestCheckpoint(
+        Path(checkpoint_path or f"{source}.{collection_name}.checkpoint.json"),
+        str(source.resolve()),
+        collection_name,
+    )
+    if checkpoint.rows_done:
+        print(f"[INFO] Resuming {source} at row {checkpoint.rows_done}")
+
+    collection_config = get_collection_config(collection_name)
+    dimensions = collection_config.vector_size
+    embed_slots = asyncio.Semaphore(max_concurrent_embeddings)
+    upsert_slots = asyncio.Semaphore(max_concurrent_upserts)
+    # Bound the chunks held in memory while earlier ones are still being processed
+    chunk_slots = asyncio.Semaphore(max_concurrent_embeddings + max_concurrent_upserts)
+    ingested = 0
+
+    async def embed(texts: list[str]) -> list[list[float]]:
+        async with embed_slots:
+            return await _with_retries(
+                lambda: generate_embeddings(texts, dimensions=dimensions), max_retries, "Embedding"
+            )
+
+    async def upsert(points: list[models.PointStruct]):
+        async with upsert_slots:
+            await _with_retries(
+                lambda: get_qdrant_client().upsert(collection_name=collection_name, points=points, wait=False),
+                max_retries,
+                "Upsert",
+            )
+
+    async def process(start: int, df: pd.DataFrame):
+        nonlocal ingested
+        try:
+            texts = df[text_column].astype(str).tolist()
+            batches = [texts[i : i + embed_batch_size] for i in range(0, len(texts), embed_batch_size)]
+            embeddings = [e for batch in await asyncio.gather(*map(embed, batches)) for e in batch]
+
+            points = []
+            for offset, (row, embedding) in enumerate(zip(df.to_dict("records"), embeddings)):
+                date = row.get(date_column) if date_column else None
+                points.append(
+                    models.PointStruct(
+                        id=str(uuid5(NAMESPACE_URL, f"{checkpoint.source}:{start + offset}")),
+                        vector=build_point_vector(embedding, str(row[text_column]), collection_config),
+                        payload={
+                            "user_id": int(row[user_id_column]) if user_id_column else user_id,
+                            "categories": parse_categories(row.get(categories_column), category_separator)
+                            if categories_column
+                            else [],
+                            "memory_text": str(row[text_column]),
+                            "date": str(date) if date is not None and pd.notna(date) else memory_timestamp(),
+                        },
+                    )
+                )
+            await asyncio.gather(
+                *(upsert(points[i : i + embed_batch_size]) for i in range(0, len(points), embed_batch_size))
+            )
+            checkpoint.mark_done(start, len(df))
+            ingested += len(df)
+            print(f"[INFO] {checkpoint.rows_done} rows ingested into {collection_name}")
+        finally:
+            chunk_slots.release()
+
+    tasks = []
+    chunks = read_chunks(source, chunk_size, checkpoint.rows_done)
+    while True:
+        await chunk_slots.acquire()
+        if any(t.done() and t.exception() for t in tasks):
+            chunk_slots.release()
+            break  # stop reading; the checkpoint keeps the completed prefix
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            chunk_slots.release()
+            break
+        tasks.append(asyncio.create_task(process(*chunk)))
+    await asyncio.gather(*tasks)
+    invalidate_category_cache(collection_name)
+    return ingested
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a CSV/Parquet file into a memory collection")
+    parser.add_argument("path")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--text-column", required=True)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--user-id-column", default=None)
+    parser.add_argument("--categories-column", default=None)
+    parser.add_argument("--date-column", default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--embed-batch-size", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args()
+
+    total = asyncio.run(
+        ingest_file(
+            args.path,
+            args.collection,
+            args.text_column,
+            user_id=args.user_id,
+            user_id_column=args.user_id_column,
+            categories_column=args.categories_column,
+            date_column=args.date_column,
+            chunk_size=args.chunk_size,
+            embed_batch_size=args.embed_batch_size,
+            max_concurrent_embeddings=args.concurrency,
+            max_concurrent_upserts=args.concurrency,
+            checkpoint_path=args.checkpoint,
+        )
+    )
+    print(f"[INFO] Done: {total} rows ingested")
@@ -0,0 +1,131 @@
+"""
+Deterministic pre-filter for the LLM memory updater.
+
+Most turns carry nothing worth remembering: small talk, plain questions about an image,
+or restatements of a fact that is already stored. These are detected locally and short-
+circuit to NOOP before a ReAct run is started:
+
+1. Salience: too few words, small talk, or no personal signal in the user turn
+2. Near-duplicates: 64-bit simhash of the user turn vs. each existing memory
+3. Restatements: the retrieval similarity already computed for `existing_memories`
+
+Every decision is counted in PREFILTER_STATS, including the LLM calls avoided.
+"""
+import re
+import zlib
+from collections import Counter
+from typing import Optional
+
+from .sparse import tokenize
+
+SMALL_TALK_RE = re.compile(
+    r"^\s*(hi|hello|hey|yo|thanks|thank you|thx|ok|okay|cool|great|nice|bye|good (morning|night|evening)"
+    r"|lol|yes|no|sure|got it)\b[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+# First-person statements, preferences and plans are what the updater stores
+PERSONAL_SIGNAL_RE = re.compile(
+    r"\b(i|i'm|im|i've|i'd|my|mine|me|we|our|us|prefer|like|love|hate|allergic|always|never|"
+    r"usually|budget|plan|planning|going to|live|work|own|hold|bought|sold)\b",
+    re.IGNORECASE,
+)
+
+DEFAULT_PREFILTER_CONFIG = {
+    "prefilter": True,
+    "prefilter_min_tokens": 3,  # Words below which a turn is small talk (stopwords count)
+    "prefilter_max_hamming": 3,  # Simhash bits that may differ for a near-duplicate
+    "prefilter_similarity": 0.92,  # Retrieval score above which a turn restates a memory
+    "prefilter_require_personal": True,  # Skip turns without first-person/preference signal
+}
+
+
+class PrefilterStats:
+    def __init__(self):
+        self.checked = 0
+        self.skipped = Counter()
+
+    @property
+    def llm_calls_avoided(self) -> int:
+        return sum(self.skipped.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "llm_calls_avoided": self.llm_calls_avoided,
+            **{f"skipped_{reason}": n for reason, n in self.skipped.items()},
+        }
+
+
+PREFILTER_STATS = PrefilterStats()
+
+
+def simhash(text: str) -> int:
+    """64-bit simhash over word unigrams and bigrams."""
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * 64
+    for feature, count in Counter(features).items():
+        encoded = feature.encode("utf-8")
+        h = (zlib.crc32(encoded) << 32) | zlib.adler32(encoded)
+        for bit in range(64):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _user_text(messages: list[dict]) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+
+
+def prefilter_reason(
+    messages: list[dict],
+    existing_memories: list,
+    memory_config: Optional[dict] = None,
+) -> Optional[str]:
+    """
+    Decide whether a turn can skip the LLM memory updater.
+
+    Args:
+        messages: The conversation turn (user + assistant messages)
+        existing_memories: RetrievedMemory results for the user's goal
+        memory_config: The agent's MEMORY_CONFIG (prefilter_* keys override the defaults)
+
+    Returns:
+        The reason to skip ("small_talk", "not_personal", "duplicate", "restatement"),
+        or None when the LLM has to decide
+    """
+    config = {**DEFAULT_PREFILTER_CONFIG, **(memory_config or {})}
+    if not config["prefilter"]:
+        return None
+
+    text = _user_text(messages)
+    # Count every word: "I am vegan" is all stopwords but the subject, and still a fact
+    if SMALL_TALK_RE.match(text) or len(text.split()) < config["prefilter_min_tokens"]:
+        return "small_talk"
+    if config["prefilter_require_personal"] and not PERSONAL_SIGNAL_RE.search(text):
+        return "not_personal"
+
+    normalized = " ".join(text.lower().split())
+    fingerprint = simhash(text)
+    for memory in existing_memories:
+        if " ".join(memory.memory_text.lower().split()) == normalized:
+            return "duplicate"
+        if hamming_distance(fingerprint, simhash(memory.memory_text)) <= config["prefilter_max_hamming"]:
+            return "duplicate"
+
+    # Only plain cosine similarities are comparable to the threshold: RRF, reranker and
+    # recency-blended scores are ranking scores (the top hit of a rescored search is ~1.0)
+    similarities = [m.similarity for m in existing_memories if m.similarity is not None]
+    if similarities and max(similarities) >= config["prefilter_similarity"]:
+        return "restatement"
+    return None
+
+
+def record_prefilter(reason: Optional[str]):
+    PREFILTER_STATS.checked += 1
+    if reason is not None:
+        PREFILTER_STATS.skipped[reason] += 1
@@ -0,0 +1,50 @@
+"""
+Optional local cross-encoder reranking of retrieved memories.
+
+Uses fastembed's ONNX cross-encoders (CPU-only, no torch), loaded once per model name.
+When fastembed isn't installed the candidates are returned in their fused order.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=4)
+def _load_cross_encoder(model_name: str):
+    try:
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+    except ImportError:
+        print("⚠ Warning: fastembed is not installed, memory reranking is disabled")
+        return None
+    return TextCrossEncoder(model_name=model_name)
+
+
+async def rerank_memories(
+    query_text: str,
+    memories: list,
+    model_name: str,
+    limit: Optional[int] = None,
+) -> list:
+    """
+    Reorder memories by cross-encoder relevance to the query.
+
+    Args:
+        query_text: The user goal the memories were retrieved for
+        memories: RetrievedMemory candidates from the (hybrid) search, best first
+        model_name: fastembed cross-encoder, e.g. "Xenova/ms-marco-MiniLM-L-6-v2"
+        limit: Number of memories to keep
+
+    Returns:
+        The top `limit` memories, with `score` set to the reranker score
+    """
+    limit = limit or len(memories)
+    encoder = _load_cross_encoder(model_name) if memories else None
+    if encoder is None:
+        return memories[:limit]
+
+    # Inference is CPU-bound; keep it off the event loop
+    scores = await asyncio.to_thread(
+        lambda: list(encoder.rerank(query_text, [m.memory_text for m in memories]))
+    )
+    ranked = sorted(zip(scores, memories), key=lambda pair: pair[0], reverse=True)
+    return [m.model_copy(update={"score": float(s)}) for s, m in ranked[:limit]]
@@ -0,0 +1,324 @@
+"""
+Collection schema manager.
+
+Every agent collection gets the same layout: COSINE distance (OpenAI embeddings are
+unit-normalized), the configured vector size/quantization/HNSW parameters, named
+dense + BM25 sparse vectors for hybrid collections, and payload indexes on `user_id`,
+`categories`, `date` and `access_count`. Multitenant collections get a tenant `user_id`
+index and per-tenant HNSW graphs instead of a global one. `bootstrap_collections`
+runs once per process at startup; later calls are no-ops.
+
+    python -m memory.schema   # bootstrap every agent collection from the CLI
+"""
+import asyncio
+import importlib
+import re
+import time
+from typing import Iterable, Optional
+
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import models
+
+from configs import AGENT_CONFIG_MAP
+from .clients import get_qdrant_client
+from .vectordb import (
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    MemoryCollectionConfig,
+    build_point_vector,
+    build_quantization_config,
+    get_collection_config,
+    register_collection_config,
+    scroll_records,
+)
+
+MEMORY_DISTANCE = models.Distance.COSINE
+
+PAYLOAD_INDEXES = {
+    "user_id": models.PayloadSchemaType.INTEGER,
+    "categories": models.PayloadSchemaType.KEYWORD,
+    "date": models.PayloadSchemaType.DATETIME,
+    "access_count": models.PayloadSchemaType.INTEGER,
+}
+
+_bootstrapped: set[str] = set()
+_bootstrap_lock = asyncio.Lock()
+
+
+def build_hnsw_config(config: MemoryCollectionConfig) -> models.HnswConfigDiff:
+    if config.multitenant:
+        # Every search is user-scoped: build one small graph per tenant instead of a
+        # global graph (m=0), so a tenant's search only walks its own segment
+        return models.HnswConfigDiff(
+            m=0, payload_m=config.hnsw_m, ef_construct=config.hnsw_ef_construct
+        )
+    return models.HnswConfigDiff(m=config.hnsw_m, ef_construct=config.hnsw_ef_construct)
+
+
+def build_payload_index_schema(field_name: str, config: MemoryCollectionConfig):
+    if field_name == "user_id" and config.multitenant:
+        # is_tenant co-locates each user's points on disk and in the index
+        return models.IntegerIndexParams(
+            type=models.IntegerIndexType.INTEGER, lookup=True, range=False, is_tenant=True
+        )
+    return PAYLOAD_INDEXES[field_name]
+
+
+def _is_tenant_index(index_info) -> bool:
+    return bool(getattr(getattr(index_info, "params", None), "is_tenant", False))
+
+
+async def _create_collection(collection_name: str, config: MemoryCollectionConfig):
+    dense = models.VectorParams(
+        size=config.vector_size, distance=MEMORY_DISTANCE, on_disk=config.on_disk or None
+    )
+    await get_qdrant_client().create_collection(
+        collection_name=collection_name,
+        vectors_config={DENSE_VECTOR_NAME: dense} if config.hybrid else dense,
+        sparse_vectors_config=(
+            # Qdrant applies the IDF half of BM25 from live collection statistics
+            {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+            if config.hybrid
+            else None
+        ),
+        hnsw_config=build_hnsw_config(config),
+        quantization_config=build_quantization_config(config),
+    )
+
+
+def _dense_params(info) -> models.VectorParams:
+    vectors = info.config.params.vectors
+    if isinstance(vectors, dict):
+        return vectors.get(DENSE_VECTOR_NAME) or next(iter(vectors.values()))
+    return vectors
+
+
+def _same_quantization(stored, wanted) -> bool:
+    if stored is None or wanted is None:
+        return stored is None and wanted is None
+    return stored.model_dump(exclude_none=True) == wanted.model_dump(exclude_none=True)
+
+
+def _stored_dense_vector(vector):
+    if isinstance(vector, dict):
+        return vector.get(DENSE_VECTOR_NAME) or next(iter(vector.values()))
+    return vector
+
+
+async def _ensure_payload_indexes(
+    collection_name: str, config: MemoryCollectionConfig, existing: Optional[dict] = None
+):
+    existing = existing or {}
+    for field_name in PAYLOAD_INDEXES:
+        if field_name in existing:
+            if not (field_name == "user_id" and config.multitenant):
+                continue
+            if _is_tenant_index(existing[field_name]):
+                continue
+            # Upgrade a plain user_id index to a tenant index
+            await get_qdrant_client().delete_payload_index(collection_name, field_name, wait=True)
+        try:
+            await get_qdrant_client().create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=build_payload_index_schema(field_name, config),
+            )
+        except UnexpectedResponse as e:
+            # If index already exists, ignore; otherwise re-raise
+            if "already has index for field" not in str(e):
+                raise
+
+
+async def _resolve_alias(name: str) -> Optional[str]:
+    """The collection behind alias `name` (None if it isn't an alias)."""
+    response = await get_qdrant_client().get_aliases()
+    for alias in response.aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return None
+
+
+async def _migrate_collection(collection_name: str, config: MemoryCollectionConfig):
+    """
+    Copy a collection with the wrong distance or vector layout into a correctly configured one.
+
+    Neither can be changed in place, so points are copied into a new `<name>_v<timestamp>`
+    collection (re-shaping vectors and computing BM25 vectors from `memory_text` when
+    switching to hybrid) and `<name>` becomes an alias of it. All callers keep using
+    `<name>`. When `<name>` already is an alias (a previous migration), it is re-pointed
+    in one atomic alias update and the old collection is dropped only afterwards.
+    """
+    client = get_qdrant_client()
+    source = await _resolve_alias(collection_name) or collection_name
+    target = f"{collection_name}_v{time.time_ns() // 1_000_000}"
+
+    # Leftovers of a migration that stopped while copying
+    response = await client.get_collections()
+    for stale in _migration_targets(collection_name, (c.name for c in response.collections)):
+        if stale != source:
+            await client.delete_collection(stale)
+    await _create_collection(target, config)
+
+    copied = 0
+    try:
+        async for records in scroll_records(source, with_vectors=True):
+            await client.upsert(
+                collection_name=target,
+                points=[
+                    models.PointStruct(
+                        id=r.id,
+                        payload=r.payload,
+                        vector=build_point_vector(
+                            _stored_dense_vector(r.vector), r.payload.get("memory_text", ""), config
+                        ),
+                    )
+                    for r in records
+                ],
+            )
+            copied += len(records)
+    except Exception:
+        await client.delete_collection(target)
+        raise
+
+    if source != collection_name:
+        await client.update_collection_aliases(
+            change_aliases_operations=[
+                models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=collection_name)),
+                models.CreateAliasOperation(
+                    create_alias=models.CreateAlias(collection_name=target, alias_name=collection_name)
+                ),
+            ]
+        )
+        await client.delete_collection(source)
+    else:
+        # Qdrant won't create an alias named like an existing collection, so the source is
+        # dropped first; if the alias can't be created right after, ensure_collection
+        # re-points it at this target on the next boot (see _recover_alias)
+        await client.delete_collection(collection_name)
+        await _create_alias(collection_name, target)
+    print(f"Migrated {copied} points from {source} to {target}")
+
+
+async def _create_alias(alias_name: str, collection_name: str):
+    await get_qdrant_client().update_collection_aliases(
+        change_aliases_operations=[
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(
+                    collection_name=collection_name, alias_name=alias_name
+                )
+            )
+        ]
+    )
+
+
+def _migration_targets(collection_name: str, names: Iterable[str]) -> list[str]:
+    """Collections created by migrations of `collection_name`, oldest first."""
+    pattern = re.compile(rf"^{re.escape(collection_name)}_v(\d+)$")
+    matches = [(int(m.group(1)), name) for name in names if (m := pattern.match(name))]
+    return [name for _, name in sorted(matches)]
+
+
+async def _recover_alias(collection_name: str) -> bool:
+    """
+    Re-create `<name>` as an alias of its migration target after a migration that
+    stopped between dropping the source and creating the alias.
+
+    Returns:
+        Whether a target was found and the alias restored
+    """
+    response = await get_qdrant_client().get_collections()
+    targets = _migration_targets(collection_name, (c.name for c in response.collections))
+    if not targets:
+        return False
+    await _create_alias(collection_name, targets[-1])
+    print(f"[WARN] Restored alias {collection_name} -> {targets[-1]} after an interrupted migration")
+    return True
+
+
+async def ensure_collection(collection_name: str, config: Optional[MemoryCollectionConfig] = None):
+    """
+    Create or migrate one memory collection so it matches its configured schema.
+
+    Args:
+        collection_name: Name of the Qdrant collection (or alias)
+        config: Storage settings; defaults to the registered config for the collection
+
+    Raises:
+        ValueError: If the stored vector size differs from the configured one
+                    (that needs a re-embedding, not a schema migration)
+    """
+    config = config or get_collection_config(collection_name)
+
+    if not await get_qdrant_client().collection_exists(collection_name) and not await _recover_alias(
+        collection_name
+    ):
+        await _create_collection(collection_name, config)
+        await _ensure_payload_indexes(collection_name, config)
+        print("Created collection", collection_name, f"with size={config.vector_size}")
+        return
+
+    info = await get_qdrant_client().get_collection(collection_name)
+    vectors = _dense_params(info)
+    if vectors.size != config.vector_size:
+        raise ValueError(
+            f"Collection {collection_name} stores {vectors.size}-dim vectors but its config "
+            f"asks for {config.vector_size}; re-embed into a new collection instead"
+        )
+
+    is_hybrid = bool(info.config.params.sparse_vectors)
+    if vectors.distance != MEMORY_DISTANCE or is_hybrid != config.hybrid:
+        await _migrate_collection(collection_name, config)
+        info = await get_qdrant_client().get_collection(collection_name)
+    else:
+        hnsw = info.config.hnsw_config
+        wanted = build_hnsw_config(config)
+        needs_hnsw = (hnsw.m, hnsw.payload_m, hnsw.ef_construct) != (
+            wanted.m,
+            wanted.payload_m if config.multitenant else hnsw.payload_m,
+            wanted.ef_construct,
+        )
+        quantization = build_quantization_config(config)
+        stored_quantization = info.config.quantization_config
+        if _same_quantization(stored_quantization, quantization):
+            quantization = None
+        elif quantization is None:
+            quantization = models.Disabled.DISABLED
+        if needs_hnsw or quantization is not None:
+            await get_qdrant_client().update_collection(
+                collection_name=collection_name,
+                hnsw_config=build_hnsw_config(config) if needs_hnsw else None,
+                quantization_config=quantization,
+            )
+
+    await _ensure_payload_indexes(collection_name, config, info.payload_schema)
+
+
+async def bootstrap_collections(agent_configs: Iterable) -> list[str]:
+    """
+    Register and ensure the collection of every agent with memory enabled, once per process.
+
+    Args:
+        agent_configs: Agent config modules (with COLLECTION_NAME and MEMORY_CONFIG)
+
+    Returns:
+        Names of the collections bootstrapped by this call
+    """
+    done = []
+    async with _bootstrap_lock:
+        for config in agent_configs:
+            name = getattr(config, "COLLECTION_NAME", None)
+            memory_config = getattr(config, "MEMORY_CONFIG", {})
+            if not name or not memory_config.get("enabled") or name in _bootstrapped:
+                continue
+            await ensure_collection(name, register_collection_config(name, memory_config))
+            _bootstrapped.add(name)
+            done.append(name)
+    return done
+
+
+def load_all_agent_configs() -> list:
+    return [importlib.import_module(module) for module in dict.fromkeys(AGENT_CONFIG_MAP.values())]
+
+
+if __name__ == "__main__":
+    print(asyncio.run(bootstrap_collections(load_all_agent_configs())))
@@ -0,0 +1,142 @@
+"""
+Recency- and frequency-weighted memory scoring.
+
+final = (1 - recency_weight - frequency_weight) * relevance
+        + recency_weight * 0.5 ** (age / half_life)
+        + frequency_weight * (1 - exp(-access_count / FREQUENCY_SCALE))
+
+"local" mode rescores the candidates returned by search (relevance is min-max normalized,
+so fused/reranker scores blend the same way as cosine similarities). "server" mode builds
+the equivalent Qdrant formula query so the decay is computed inside Qdrant (>= 1.14).
+"""
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+from qdrant_client.models import models
+
+# Access count at which the frequency term reaches ~63% of its weight
+FREQUENCY_SCALE = 10.0
+
+
+def parse_memory_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def recency_decay(date: str, half_life_days: float, now: Optional[datetime] = None) -> float:
+    parsed = parse_memory_date(date)
+    if parsed is None:
+        return 1.0
+    now = now or datetime.now(timezone.utc)
+    age_days = max(0.0, (now - parsed).total_seconds() / 86400)
+    return 0.5 ** (age_days / half_life_days)
+
+
+def frequency_boost(access_count: int) -> float:
+    return 1 - math.exp(-access_count / FREQUENCY_SCALE)
+
+
+def memory_relevance(memory) -> float:
+    """Similarity of a retrieved memory to the query when known, else its ranking score."""
+    return memory.similarity if memory.similarity is not None else memory.score
+
+
+def rescore_memories(
+    memories: list,
+    half_life_days: float,
+    recency_weight: float,
+    frequency_weight: float,
+    limit: Optional[int] = None,
+) -> list:
+    """
+    Blend relevance with time decay and access frequency, best first.
+
+    Args:
+        memories: RetrievedMemory candidates
+        half_life_days: Age at which the recency term halves
+        recency_weight: Weight of the recency term
+        frequency_weight: Weight of the access-frequency term
+        limit: Number of memories to keep
+
+    Returns:
+        The top `limit` memories with `score` replaced by the blended score
+        (`similarity` keeps the raw cosine similarity)
+    """
+    if not memories:
+        return memories
+    scores = [m.score for m in memories]
+    low, high = min(scores), max(scores)
+    now = datetime.now(timezone.utc)
+    relevance_weight = 1 - recency_weight - frequency_weight
+
+    rescored = []
+    for memory in memories:
+        relevance = (memory.score - low) / (high - low) if high > low else 1.0
+        score = (
+            relevance_weight * relevance
+            + recency_weight * recency_decay(memory.date, half_life_days, now)
+            + frequency_weight * frequency_boost(memory.access_count)
+        )
+        rescored.append(memory.model_copy(update={"score": score}))
+    rescored.sort(key=lambda m: m.score, reverse=True)
+    return rescored[: limit or len(rescored)]
+
+
+def build_recency_formula(
+    half_life_days: float,
+    recency_weight: float,
+    frequency_weight: float,
+) -> models.FormulaQuery:
+    """The server-side equivalent of rescore_memories (without score normalization)."""
+    return models.FormulaQuery(
+        formula=models.SumExpression(
+            sum=[
+                models.MultExpression(mult=[1 - recency_weight - frequency_weight, "$score"]),
+                models.MultExpression(
+                    mult=[
+                        recency_weight,
+                        models.ExpDecayExpression(
+                            exp_decay=models.DecayParamsExpression(
+                                x=models.DatetimeKeyExpression(datetime_key="date"),
+                                target=models.DatetimeExpression(
+                                    datetime=datetime.now(timezone.utc).isoformat()
+                                ),
+                                scale=half_life_days * 86400,
+                                midpoint=0.5,
+                            )
+                        ),
+                    ]
+                ),
+                models.MultExpression(
+                    mult=[
+                        frequency_weight,
+                        models.SumExpression(
+                            sum=[
+                                1,
+                                models.MultExpression(
+                                    mult=[
+                                        -1,
+                                        models.ExpExpression(
+                                            exp=models.DivExpression(
+                                                div=models.DivParams(
+                                                    left=models.MultExpression(
+                                                        mult=[-1, "access_count"]
+                                                    ),
+                                                    right=FREQUENCY_SCALE,
+                                                )
+                                            )
+                                        ),
+                                    ]
+                                ),
+                            ]
+                        ),
+                    ]
+                ),
+            ]
+        ),
+        defaults={"access_count": 0},
+    )
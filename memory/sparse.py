@@ -0,0 +1,52 @@
+"""
+Local BM25-style sparse encoder for hybrid memory search.
+
+Documents are encoded with BM25's saturated, length-normalized term frequency; the IDF
+half of BM25 is applied by Qdrant (the sparse vector is configured with Modifier.IDF),
+so it stays correct as the collection grows without re-encoding stored points. Tokens
+are hashed into a 32-bit index space, so no vocabulary has to be trained or stored.
+"""
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import models
+
+# Keeps tickers ($BTC), amounts (3.5) and hyphenated names (co-op) as single tokens
+_TOKEN_RE = re.compile(r"\$?[a-z0-9]+(?:[.\-'][a-z0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or so that "
+    "the their this to was were what when where which who will with you your".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical memory length in tokens; memories are short atomic factoids
+BM25_AVG_LEN = 16.0
+
+
+def tokenize(text: str) -> list[str]:
+    return [t.lstrip("$") for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _token_index(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _to_sparse(weights: dict[int, float]) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+def encode_document(text: str) -> models.SparseVector:
+    """Encode a stored memory as BM25 term weights (without IDF)."""
+    tokens = tokenize(text)
+    counts = Counter(_token_index(t) for t in tokens)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / BM25_AVG_LEN)
+    return _to_sparse({i: tf * (BM25_K1 + 1) / (tf + norm) for i, tf in counts.items()})
+
+
+def encode_query(text: str) -> models.SparseVector:
+    """Encode a query as a bag of unique terms; Qdrant multiplies in the IDF."""
+    return _to_sparse({_token_index(t): 1.0 for t in set(tokenize(text))})
@@ -0,0 +1,116 @@
+"""
+Per-subtask memory retrieval.
+
+A SubtaskMemoryProvider is created for one request and passed to multimodal_solve as
+the executor's memory provider. Each executor call asks for memories matching its own
+subtask goal instead of reusing the root goal's memories. Sibling subtasks usually run
+concurrently, so lookups arriving within a short window are embedded and searched
+together (search_memories_batch). Identical goals share one lookup, results are cached
+for the rest of the request, and a semaphore caps the batches in flight.
+"""
+import asyncio
+from typing import Optional
+
+from .context_builder import build_memory_context
+from .generate_embeddings import generate_embeddings
+from .vectordb import RetrievedMemory, search_memories_batch
+
+
+def _normalize_goal(goal: str) -> str:
+    return " ".join(goal.lower().split())
+
+
+class SubtaskMemoryProvider:
+    """
+    Request-scoped memory lookup for subtask goals.
+
+    Args:
+        collection_name: Collection holding the user's memories
+        user_id: Tenant whose memories are searched
+        memory_config: The agent's MEMORY_CONFIG
+        batch_window: Seconds to wait for sibling lookups before searching
+        max_batch_size: Maximum goals searched in one request
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        user_id: int,
+        memory_config: dict,
+        batch_window: float = 0.01,
+        max_batch_size: int = 64,
+    ):
+        self.collection_name = collection_name
+        self.user_id = user_id
+        self.limit = memory_config.get("subtask_limit", 3)
+        self.token_budget = memory_config.get("subtask_token_budget", 200)
+        self.score_threshold = memory_config["score_threshold"]
+        self.vector_size = memory_config["vector_size"]
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._slots = asyncio.Semaphore(memory_config.get("subtask_max_concurrency", 4))
+        self._results: dict[str, asyncio.Future] = {}
+        self._pending: list[tuple[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._retrieved: dict[str, RetrievedMemory] = {}
+
+    def seed(self, goal: str, memories: list[RetrievedMemory]):
+        """Reuse memories already retrieved for a goal (e.g. the root goal)."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(memories)
+        self._results[_normalize_goal(goal)] = future
+        self._remember(memories)
+
+    @property
+    def retrieved(self) -> list[RetrievedMemory]:
+        """Every distinct memory handed out during the request."""
+        return list(self._retrieved.values())
+
+    async def __call__(self, goal: Optional[str]) -> Optional[str]:
+        """The memory block for one subtask goal, or None when nothing is relevant."""
+        if not goal:
+            return None
+        key = _normalize_goal(goal)
+        future = self._results.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._results[key] = future
+            self._pending.append((key, goal))
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        memories = await asyncio.shield(future)
+        return build_memory_context(memories, token_budget=self.token_budget)
+
+    def _remember(self, memories: list[RetrievedMemory]):
+        for memory in memories:
+            self._retrieved.setdefault(memory.point_id, memory)
+
+    async def _flush(self):
+        await asyncio.sleep(self.batch_window)
+        pending, self._pending, self._flush_task = self._pending, [], None
+        chunks = [
+            pending[i : i + self.max_batch_size]
+            for i in range(0, len(pending), self.max_batch_size)
+        ]
+        await asyncio.gather(*(self._search(chunk) for chunk in chunks))
+
+    async def _search(self, chunk: list[tuple[str, str]]):
+        goals = [goal for _, goal in chunk]
+        async with self._slots:
+            try:
+                embeddings = await generate_embeddings(goals, dimensions=self.vector_size)
+                results = await search_memories_batch(
+                    embeddings,
+                    self.collection_name,
+                    self.user_id,
+                    score_threshold=self.score_threshold,
+                    limit=self.limit,
+                    query_texts=goals,
+                )
+            except Exception as e:
+                # Missing memories shouldn't fail the subtask
+                print(f"[WARN] Subtask memory retrieval failed: {e}")
+                results = [[] for _ in chunk]
+        for (key, _), memories in zip(chunk, results):
+            self._remember(memories)
+            self._results[key].set_result(memories)
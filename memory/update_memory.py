@@ -1,19 +1,16 @@
 import os
 import dspy
 from pydantic import BaseModel
-from datetime import datetime
-from .generate_embeddings import generate_embeddings
+from typing import Optional
+from roma_vlm.runtime import install_accounting, install_rate_limit, traced
+from .consolidation import ConsolidationPlan, apply_plan
+from .prefilter import PREFILTER_STATS, prefilter_reason, record_prefilter
 from .vectordb import (
-    EmbeddedMemory,
+    COLLECTION_NAME,
+    DEFAULT_USER_ID,
     RetrievedMemory,
-    delete_records,
-    fetch_all_user_records,
-    insert_memories,
-    search_memories,
 )
 
-dspy.configure_cache(enable_disk_cache=False,enable_memory_cache=False)
-
 
 class MemoryWithIds(BaseModel):
     memory_id: int
@@ -45,92 +42,90 @@ class UpdateMemorySignature(dspy.Signature):
 
 
 
-def get_point_id_from_memory_id(memory_id):
-    return existing_memories[memory_id].point_id
-
-async def add_memory(memory_text: str, categories: list[str]) -> str:
-    """
-    Add the new_memory into the database.
-    No need to pass any args.
-    """
-    print("Adding memory: ", memory_text)
-    print("Categories: ", categories)
-
-    embeddings = await generate_embeddings([memory_text])
-    await insert_memories(
-        memories=[
-            EmbeddedMemory(
-                user_id=1,
-                memory_text=memory_text,
-                categories=categories,
-                date=datetime.now().strftime("%Y-%m-%d %H:%m"),
-                embedding=embeddings[0],
-            )
-        ]
-    )
-
-    return f"Memory: '{memory_text}' was added to DB"
-
-async def noop():
-    """
-    Call this is no action is required
-    """
-    return "No action done"
-
-async def delete(memory_ids: list[int]):
-    """
-    Remove these memory_ids from the database
-    """
-    print("Deleting these memories")
-    for memory_id in memory_ids:
-        print(existing_memories[memory_id].memory_text)
-
-    await delete_records(memory_ids)
-    return f"Memory {memory_ids} deleted"
-
-async def update(memory_id: int, updated_memory_text: str, categories: list[str]):
-    """
-    Updating memory_id to use updated_memory_text
-
-    Args:
-    memory_id: integer index of the memory to replace
-
-    updated_memory_text: Simple atomic factoid to replace the old memory with the new memory
-
-    categories: Use existing categories or create new ones if required
-    """
-    print(
-        "Memory updating: ",
-        "\n Original: ",
-        existing_memories[memory_id].memory_text,
-        "\n New memory text: ",
-        updated_memory_text,
-    )
-
-    point_id = get_point_id_from_memory_id(memory_id)
-    await delete_records([point_id])
-
-    embeddings = await generate_embeddings([updated_memory_text])
-
-    await insert_memories(
-        memories=[
-            EmbeddedMemory(
-                user_id=1,
-                memory_text=updated_memory_text,
-                categories=categories,
-                date=datetime.now().strftime("%Y-%m-%d %H:%m"),
-                embedding=embeddings[0],
-            )
-        ]
-    )
-    return f"Memory {memory_id} has been updated to: '{updated_memory_text}'"
-
-async def update_memories(messages: list[dict], existing_memories: list[RetrievedMemory], model: str):
-
-    memory_updater = dspy.ReAct(UpdateMemorySignature, tools=[add_memory, update, delete, noop], max_iters=3)
+def build_memory_tools(plan: ConsolidationPlan):
+    """Tools for the memory updater. They only record operations into the plan."""
+
+    async def add_memory(memory_text: str, categories: list[str]) -> str:
+        """
+        Add the new_memory into the database.
+        No need to pass any args.
+        """
+        print("Adding memory: ", memory_text)
+        print("Categories: ", categories)
+        plan.add(memory_text, categories)
+        return f"Memory: '{memory_text}' was added to DB"
+
+    async def noop():
+        """
+        Call this is no action is required
+        """
+        return "No action done"
+
+    async def delete(memory_ids: list[int]):
+        """
+        Remove these memory_ids from the database
+        """
+        print("Deleting these memories")
+        for memory_id in memory_ids:
+            print(plan.existing_memories[memory_id].memory_text)
+            plan.delete(memory_id)
+        return f"Memory {memory_ids} deleted"
+
+    async def update(memory_id: int, updated_memory_text: str, categories: list[str]):
+        """
+        Updating memory_id to use updated_memory_text
+
+        Args:
+        memory_id: integer index of the memory to replace
+
+        updated_memory_text: Simple atomic factoid to replace the old memory with the new memory
+
+        categories: Use existing categories or create new ones if required
+        """
+        print(
+            "Memory updating: ",
+            "\n Original: ",
+            plan.existing_memories[memory_id].memory_text,
+            "\n New memory text: ",
+            updated_memory_text,
+        )
+        plan.update(memory_id, updated_memory_text, categories)
+        return f"Memory {memory_id} has been updated to: '{updated_memory_text}'"
+
+    return [add_memory, update, delete, noop]
+
+
+@traced("memory.update")
+async def update_memories(
+    messages: list[dict],
+    existing_memories: list[RetrievedMemory],
+    model: str,
+    user_id: int = DEFAULT_USER_ID,
+    collection_name: str = COLLECTION_NAME,
+    memory_config: Optional[dict] = None,
+    rate_limit_config: Optional[dict] = None,
+):
+    # Skip the ReAct run for small talk and turns that restate stored memories
+    reason = prefilter_reason(messages, existing_memories, memory_config)
+    record_prefilter(reason)
+    if reason is not None:
+        print(f"Memory update skipped ({reason}); LLM calls avoided: {PREFILTER_STATS.llm_calls_avoided}")
+        return f"NOOP ({reason})"
+
+    plan = ConsolidationPlan(user_id=user_id, existing_memories=existing_memories)
+    memory_updater = dspy.ReAct(UpdateMemorySignature, tools=build_memory_tools(plan), max_iters=3)
     memory_ids = [ MemoryWithIds(memory_id=idx, memory_text=m.memory_text, memory_categories=m.categories) for idx, m in enumerate(existing_memories)]
 
-    with dspy.context(lm=dspy.LM(model=model, reasoning_effort="minimal", temperature=1, max_tokens=16000)):
+    # Never cache the updater: the same turn must be re-evaluated against current memories
+    lm = dspy.LM(model=model, reasoning_effort="minimal", temperature=1, max_tokens=16000, cache=False)
+    # Background work: queued behind the solver's calls to the same provider
+    install_rate_limit(lm, "memory", rate_limit_config)
+    install_accounting(lm, "memory")
+    with dspy.context(lm=lm):
         out = await memory_updater.acall(messages=messages, existing_memories=memory_ids)
     print(out)
+
+    # Apply everything the updater decided as one batch
+    counts = await apply_plan(plan, collection_name)
+    print(f"Applied memory operations: {counts}")
     return out.summary
\ No newline at end of file
@@ -1,22 +1,146 @@
 import os
 from datetime import datetime
-from typing import Optional, Callable
+from typing import AsyncIterator, Optional, Callable
 from uuid import uuid4
 from pydantic import BaseModel
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.grpc import Points, ScoredPoint
-from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.http.models import PayloadSchemaType
-from qdrant_client.models import Distance, Filter, VectorParams, models
+from qdrant_client.models import Filter, models
 import asyncio
+import time
 import numpy as np
-import pandas as pd
-import ast
+from roma_vlm.runtime import traced
+from .clients import get_qdrant_client, is_local_qdrant
 from .generate_embeddings import generate_embeddings
+from .rerank import rerank_memories
+from .scoring import build_recency_formula, memory_relevance, rescore_memories
+from .sparse import encode_document, encode_query
+
+COLLECTION_NAME = os.getenv("COLLECTION_NAME") or "memories"
+
+DEFAULT_VECTOR_SIZE = 1536
+DEFAULT_USER_ID = 1
+
+# Named vectors used by hybrid collections
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "bm25"
+
+
+class MemoryCollectionConfig(BaseModel):
+    """Storage settings for one memory collection (built from an agent's MEMORY_CONFIG)."""
+
+    # text-embedding-3-small is Matryoshka-trained: smaller sizes are prefix truncations
+    vector_size: int = DEFAULT_VECTOR_SIZE
+    # None (float32), "scalar" (int8) or "binary" (1 bit per dimension)
+    quantization: Optional[str] = None
+    quantile: float = 0.99
+    always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    # Search-time beam width; None lets Qdrant use ef_construct
+    hnsw_ef: Optional[int] = None
+    # Store a BM25 sparse vector next to the dense one and fuse both at search time
+    hybrid: bool = False
+    # Candidates fetched per retriever before fusion / reranking
+    prefetch_limit: int = 20
+    # Optional fastembed cross-encoder used to rerank the fused candidates
+    reranker: Optional[str] = None
+    # Blend time decay and access frequency into the ranking; None disables it
+    recency_half_life_days: Optional[float] = None
+    recency_weight: float = 0.2
+    frequency_weight: float = 0.1
+    # "local" rescoring of the candidates, or a "server" formula query (Qdrant >= 1.14)
+    recency_mode: str = "local"
+    # Keep vectors on disk (used for archive collections)
+    on_disk: bool = False
+    # Partition by user_id: tenant payload index + per-tenant HNSW graphs
+    multitenant: bool = False
+
+
+_collection_configs: dict[str, MemoryCollectionConfig] = {}
+
+
+def register_collection_config(collection_name: str, memory_config: Optional[dict] = None):
+    """
+    Register the storage settings of an agent's collection.
+
+    Args:
+        collection_name: Name of the Qdrant collection (the agent's COLLECTION_NAME)
+        memory_config: The agent's MEMORY_CONFIG dict; unknown keys are ignored
+
+    Returns:
+        The registered MemoryCollectionConfig
+    """
+    fields = MemoryCollectionConfig.model_fields
+    config = MemoryCollectionConfig(
+        **{k: v for k, v in (memory_config or {}).items() if k in fields}
+    )
+    if config.quantization not in (None, "scalar", "binary"):
+        raise ValueError(
+            f"Unknown quantization '{config.quantization}' for collection {collection_name}"
+        )
+    _collection_configs[collection_name] = config
+    return config
+
+
+def get_collection_config(collection_name: str) -> MemoryCollectionConfig:
+    return _collection_configs.get(collection_name) or MemoryCollectionConfig()
+
+
+def build_quantization_config(config: MemoryCollectionConfig):
+    if config.quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=config.quantile,
+                always_ram=config.always_ram,
+            )
+        )
+    if config.quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=config.always_ram)
+        )
+    return None
+
+
+def build_search_params(config: MemoryCollectionConfig) -> Optional[models.SearchParams]:
+    """Search over the quantized vectors, then rescore the oversampled candidates in float32."""
+    if config.quantization is None and config.hnsw_ef is None:
+        return None
+    quantization = None
+    if config.quantization is not None:
+        quantization = models.QuantizationSearchParams(
+            ignore=False,
+            rescore=config.rescore,
+            oversampling=config.oversampling,
+        )
+    return models.SearchParams(hnsw_ef=config.hnsw_ef, quantization=quantization)
+
+
+def dense_vector_name(config: MemoryCollectionConfig) -> Optional[str]:
+    return DENSE_VECTOR_NAME if config.hybrid else None
 
-COLLECTION_NAME = str(os.getenv("COLLECTION_NAME"))
-print(COLLECTION_NAME)
-client = AsyncQdrantClient(url=str(os.getenv("QDRANT_URL")))
+
+def build_point_vector(embedding: list[float], memory_text: str, config: MemoryCollectionConfig):
+    """The `vector` of a point: plain for dense-only collections, named for hybrid ones."""
+    if not config.hybrid:
+        return embedding
+    return {DENSE_VECTOR_NAME: embedding, SPARSE_VECTOR_NAME: encode_document(memory_text)}
+
+
+def memory_timestamp() -> str:
+    """Current time in the RFC 3339 form accepted by the `date` datetime index."""
+    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+
+def user_filter(user_id: int, must: Optional[list[models.Condition]] = None) -> Filter:
+    """Filter scoped to one user's memories, so searches hit the `user_id` index."""
+    return Filter(
+        must=[
+            models.FieldCondition(key="user_id", match=models.MatchValue(value=user_id)),
+            *(must or []),
+        ]
+    )
 
 
 class EmbeddedMemory(BaseModel):
@@ -33,64 +157,18 @@ class RetrievedMemory(BaseModel):
     memory_text: str
     categories: list[str]
     date: str
-    score: float
-
-
-async def init_qdrant():
-    collections = await client.get_collections()
-    existing_names = {c.name for c in collections.collections}
-
-    if COLLECTION_NAME not in existing_names:
-        await client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=models.VectorParams(
-                size=1536,
-                distance=models.Distance.COSINE,
-            ),
-        )
-        print("Recreated collection", COLLECTION_NAME, "with size=1536")
-    # Ensure payload index for faceting on `categories`
-    try:
-        await client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="categories",
-            field_schema=PayloadSchemaType.KEYWORD,  # important
-        )
-    except UnexpectedResponse as e:
-        # If index already exists, ignore; otherwise re-raise
-        if "already has index for field" in str(e):
-            pass
-        else:
-            raise
-
-
-async def create_memory_collection():
-    if not (await client.collection_exists(COLLECTION_NAME)):
-        await client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(size=1536, distance=Distance.DOT),
-        )
-
-        await client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="user_id",
-            field_schema=models.PayloadSchemaType.INTEGER,
-        )
+    score: float = 0.0
+    # Cosine similarity to the query; `score` may be a fused, reranked or recency-blended
+    # ranking score. None when the search produced no plain similarity (hybrid, server recency)
+    similarity: Optional[float] = None
+    access_count: int = 0
+    embedding: Optional[list[float]] = None
 
-        # Create an index on the 'categories' field
-        await client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="categories",
-            field_schema=models.PayloadSchemaType.KEYWORD,
-        )
-        print("Collection created")
-    else:
-        print("Collection exists")
 
-
-async def insert_memories(memories: list[EmbeddedMemory]):
-    await client.upsert(
-        collection_name=COLLECTION_NAME,
+async def insert_memories(memories: list[EmbeddedMemory], collection_name: str = COLLECTION_NAME):
+    config = get_collection_config(collection_name)
+    await get_qdrant_client().upsert(
+        collection_name=collection_name,
         points=[
             models.PointStruct(
                 id=uuid4().hex,
@@ -100,62 +178,334 @@ async def insert_memories(memories: list[EmbeddedMemory]):
                     "memory_text": memory.memory_text,
                     "date": memory.date,
                 },
-                vector=memory.embedding,
+                vector=build_point_vector(memory.embedding, memory.memory_text, config),
             )
             for memory in memories
         ],
     )
+    invalidate_category_cache(collection_name)
 
 
 async def search_memories(
     search_vector: list[float],
     collection_name: str,
+    user_id: int,
     categories: Optional[list[str]] = None,
     score_threshold: float = 0.1,
     limit: int = 2,
+    query_text: Optional[str] = None,
 ):
     """
     Search for similar memories in the vector database using semantic similarity.
+
+    For hybrid collections, passing query_text adds a BM25 sparse retriever whose
+    results are fused with the dense ones by reciprocal-rank fusion, so exact terms
+    (merchants, tickers, cities) are found even when the embedding misses them.
+    If the collection has a reranker configured, the fused candidates are reranked.
+    With recency_half_life_days set, the ranking also blends time decay and access
+    frequency (see memory.scoring).
     
     Args:
-        search_vector: Embedding vector (1536-dim) to search for
+        search_vector: Embedding vector (the collection's vector_size) to search for
         collection_name: Name of the Qdrant collection to query
+        user_id: Only this user's memories are searched
         categories: Optional list of categories to filter by
         score_threshold: Minimum similarity score (0-1) to return
         limit: Maximum number of results to return
+        query_text: Raw query, used by the sparse retriever and the reranker
         
     Returns:
         List of RetrievedMemory objects sorted by similarity score
+        (RRF, reranker or blended recency score when those stages are enabled)
     """
-    must_conditions: list[models.Condition] = []
-    print('done1')
-    if categories is not None and len(categories) > 0:
-        must_conditions.append(
-            models.FieldCondition(
-                key="categories", match=models.MatchAny(any=categories)
+    results = await search_memories_batch(
+        [search_vector],
+        collection_name,
+        user_id,
+        categories=[categories],
+        score_threshold=score_threshold,
+        limit=limit,
+        query_texts=[query_text],
+    )
+    return results[0]
+
+
+def _memory_query_request(
+    search_vector: list[float],
+    config: MemoryCollectionConfig,
+    query_filter: Filter,
+    score_threshold: float,
+    limit: int,
+    query_text: Optional[str],
+) -> models.QueryRequest:
+    """The Qdrant query for one memory search (dense, hybrid RRF and/or recency formula)."""
+    search_params = build_search_params(config)
+    hybrid = config.hybrid and bool(query_text)
+    recency = config.recency_half_life_days is not None
+    # Fetch extra candidates when a later stage (reranker, recency) picks the final top-k
+    candidates = max(limit, config.prefetch_limit)
+    rescored_later = (hybrid and config.reranker) or (recency and config.recency_mode == "local")
+
+    prefetch = [
+        models.Prefetch(
+            query=search_vector,
+            using=dense_vector_name(config),
+            filter=query_filter,
+            params=search_params,
+            score_threshold=score_threshold,
+            limit=candidates,
+        )
+    ]
+    if hybrid:
+        prefetch.append(
+            models.Prefetch(
+                query=encode_query(query_text),
+                using=SPARSE_VECTOR_NAME,
+                filter=query_filter,
+                limit=candidates,
             )
         )
-    
-    print('done2')
-    query_filter = Filter(must=must_conditions) if must_conditions else None
-    print('done3')
+        prefetch = [
+            models.Prefetch(
+                prefetch=prefetch,
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=candidates,
+            )
+        ]
 
-    outs = await client.query_points(
-        collection_name=collection_name,
+    if recency and config.recency_mode == "server":
+        return models.QueryRequest(
+            prefetch=prefetch,
+            query=build_recency_formula(
+                config.recency_half_life_days, config.recency_weight, config.frequency_weight
+            ),
+            with_payload=True,
+            limit=limit,
+        )
+    if hybrid:
+        return models.QueryRequest(
+            prefetch=prefetch[0].prefetch,
+            query=prefetch[0].query,
+            with_payload=True,
+            limit=candidates if rescored_later else limit,
+        )
+    return models.QueryRequest(
         query=search_vector,
-        with_payload=True,
-        query_filter=query_filter,
+        using=dense_vector_name(config),
+        filter=query_filter,
+        params=search_params,
         score_threshold=score_threshold,
-        limit=limit,
+        with_payload=True,
+        limit=candidates if rescored_later else limit,
+    )
+
+
+async def _finish_memory_search(
+    memories: list[RetrievedMemory],
+    config: MemoryCollectionConfig,
+    limit: int,
+    query_text: Optional[str],
+) -> list[RetrievedMemory]:
+    """Rerank and/or recency-rescore the candidates of one query down to `limit`."""
+    hybrid = config.hybrid and bool(query_text)
+    recency = config.recency_half_life_days is not None
+    if hybrid and config.reranker:
+        memories = await rerank_memories(
+            query_text, memories, config.reranker, None if recency else limit
+        )
+    if recency and config.recency_mode == "local":
+        memories = rescore_memories(
+            memories,
+            config.recency_half_life_days,
+            config.recency_weight,
+            config.frequency_weight,
+            limit,
+        )
+    return memories
+
+
+async def _local_search_batch(
+    search_vectors: list[list[float]],
+    collection_name: str,
+    user_id: int,
+    categories: list[Optional[list[str]]],
+    score_threshold: float,
+    limit: int,
+) -> list[list[RetrievedMemory]]:
+    """
+    Embedded-Qdrant batch search: load the user's vectors once and score every query
+    with a single (queries x memories) cosine matrix multiply.
+    """
+    stored = []
+    async for records in scroll_records(collection_name, user_filter(user_id), with_vectors=True):
+        stored.extend(m for m in map(convert_retrieved_records, records) if m.embedding)
+    if not stored:
+        return [[] for _ in search_vectors]
+
+    matrix = np.asarray([m.embedding for m in stored], dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    queries = np.asarray(search_vectors, dtype=np.float32)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ matrix.T
+
+    results = []
+    for row, query_categories in zip(scores, categories):
+        allowed = row >= score_threshold
+        if query_categories:
+            wanted = set(query_categories)
+            allowed &= np.array([bool(wanted.intersection(m.categories)) for m in stored])
+        # Mask before taking the top-k, so filtered-out memories don't use up the limit
+        candidates = np.flatnonzero(allowed)
+        top = candidates[np.argsort(-row[candidates])[:limit]]
+        results.append(
+            [stored[i].model_copy(update={"score": float(row[i]), "similarity": float(row[i]), "embedding": None}) for i in top]
+        )
+    return results
+
+
+@traced("memory.search")
+async def search_memories_batch(
+    search_vectors: list[list[float]],
+    collection_name: str,
+    user_id: int,
+    categories: Optional[list[Optional[list[str]]]] = None,
+    score_threshold: float = 0.1,
+    limit: int = 2,
+    query_texts: Optional[list[Optional[str]]] = None,
+) -> list[list[RetrievedMemory]]:
+    """
+    Search memories for many query vectors in one round trip.
+
+    Against a Qdrant server the queries are sent as one `query_batch_points` request;
+    with embedded Qdrant (QDRANT_URL=":memory:" or a path) several dense queries are
+    scored with a single NumPy matrix multiply. A single query is a plain `query_points`
+    call. Ranking is otherwise identical to search_memories.
+
+    Args:
+        search_vectors: Embedding vectors (the collection's vector_size), one per query
+        collection_name: Name of the Qdrant collection to query
+        user_id: Only this user's memories are searched
+        categories: Optional per-query category filters (None entries are unfiltered)
+        score_threshold: Minimum similarity score (0-1) to return
+        limit: Maximum number of results per query
+        query_texts: Optional per-query raw text for the sparse retriever and reranker
+
+    Returns:
+        One list of RetrievedMemory per query, in the order of search_vectors
+    """
+    if not search_vectors:
+        return []
+    categories = categories or [None] * len(search_vectors)
+    query_texts = query_texts or [None] * len(search_vectors)
+    if not len(categories) == len(query_texts) == len(search_vectors):
+        raise ValueError("categories and query_texts must have one entry per search vector")
+
+    config = get_collection_config(collection_name)
+    recency = config.recency_half_life_days is not None
+    hybrid = config.hybrid and any(query_texts)
+
+    # Loading the user's vectors only pays off when they are scored against several queries
+    local_batch = len(search_vectors) > 1 and is_local_qdrant()
+    if local_batch and not hybrid and not (recency and config.recency_mode == "server"):
+        candidates = max(limit, config.prefetch_limit) if recency else limit
+        groups = await _local_search_batch(
+            search_vectors, collection_name, user_id, categories, score_threshold, candidates
+        )
+    else:
+        requests = [
+            _memory_query_request(
+                vector,
+                config,
+                user_filter(
+                    user_id,
+                    [models.FieldCondition(key="categories", match=models.MatchAny(any=cats))]
+                    if cats
+                    else None,
+                ),
+                score_threshold,
+                limit,
+                text,
+            )
+            for vector, cats, text in zip(search_vectors, categories, query_texts)
+        ]
+        if len(requests) == 1:
+            request = requests[0]
+            responses = [
+                await get_qdrant_client().query_points(
+                    collection_name=collection_name,
+                    query=request.query,
+                    using=request.using,
+                    prefetch=request.prefetch,
+                    query_filter=request.filter,
+                    search_params=request.params,
+                    score_threshold=request.score_threshold,
+                    with_payload=True,
+                    limit=request.limit,
+                )
+            ]
+        else:
+            responses = await get_qdrant_client().query_batch_points(
+                collection_name=collection_name, requests=requests
+            )
+        groups = [
+            [convert_retrieved_records(point) for point in response.points if point is not None]
+            for response in responses
+        ]
+        if not hybrid and not (recency and config.recency_mode == "server"):
+            # Plain dense queries: the returned score is the cosine similarity
+            groups = [
+                [m.model_copy(update={"similarity": m.score}) for m in memories]
+                for memories in groups
+            ]
+
+    return list(
+        await asyncio.gather(
+            *(
+                _finish_memory_search(memories, config, limit, text)
+                for memories, text in zip(groups, query_texts)
+            )
+        )
+    )
+
+
+def record_memory_access(memories: list[RetrievedMemory], collection_name: str = COLLECTION_NAME):
+    """
+    Bump access_count/last_accessed of retrieved memories in the background.
+
+    Counts are read-modify-write from the retrieved payload, so concurrent reads of the
+    same memory may undercount; that's fine for a ranking signal.
+    """
+    if not memories:
+        return
+    accessed = memory_timestamp()
+    task = asyncio.create_task(
+        get_qdrant_client().batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                models.SetPayloadOperation(
+                    set_payload=models.SetPayload(
+                        payload={"access_count": m.access_count + 1, "last_accessed": accessed},
+                        points=[m.point_id],
+                    )
+                )
+                for m in memories
+            ],
+            wait=False,
+        )
     )
-    print('done4')
-    return [convert_retrieved_records(point) for point in outs.points if point is not None]
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+_background_tasks: set[asyncio.Task] = set()
+
 
 async def add_llm_response_memory(
     user_id: int,
     response_text: str,
     categories: Optional[list[str]] = None,
     date: Optional[str] = None,
+    collection_name: str = COLLECTION_NAME,
 ):
     """
     Take an LLM response text, generate an embedding, and store it
@@ -171,12 +521,14 @@ async def add_llm_response_memory(
 
     # Use current UTC time if no date is provided
     if date is None:
-        date_str = datetime.utcnow().isoformat()
+        date_str = memory_timestamp()
     else:
         date_str = date
 
     # generate_embeddings already used in your CSV import (async)
-    embeddings = await generate_embeddings([response_text])
+    embeddings = await generate_embeddings(
+        [response_text], dimensions=get_collection_config(collection_name).vector_size
+    )
     embedding = embeddings[0]
 
     memory = EmbeddedMemory(
@@ -188,153 +540,150 @@ async def add_llm_response_memory(
     )
 
     # Reuse existing insertion logic
-    await insert_memories([memory])
+    await insert_memories([memory], collection_name)
 
     return memory  # optional, in case you want to inspect what was stored
 
-# async def import_csv_to_qdrant(
-#     csv_path: str,
-#     user_id: int,
-#     text_column: str,
-#     categories_column: Optional[str] = None,
-#     date_column: Optional[str] = None,
-#     category_separator: str = ",",
-# ):
-#     """
-#     Reads a CSV file, generates embeddings using OpenAI, and inserts into Qdrant.
-#     """
-#
-#     df = pd.read_csv(csv_path)
-#
-#     # Get texts
-#     texts = df[text_column].astype(str).tolist()
-#
-#     print(f"[INFO] Generating embeddings for {len(texts)} rows...")
-#     embeddings = await generate_embeddings(texts)
-#     print("[INFO] Embeddings generated.")
-#
-#     memories = []
-#
-#     for idx, row in df.iterrows():
-#         memory_text = str(row[text_column])
-#
-#         # Categories
-#         if categories_column and categories_column in df.columns:
-#             raw_cats = row[categories_column]
-#             if isinstance(raw_cats, str):
-#                 try:
-#                     parsed = ast.literal_eval(raw_cats)
-#                     if isinstance(parsed, list):
-#                         categories = [str(c).strip() for c in parsed]
-#                     else:
-#                         categories = [str(parsed).strip()]
-#                 except Exception:
-#                     categories = [
-#                         c.strip()
-#                         for c in raw_cats.split(category_separator)
-#                         if c.strip()
-#                     ]
-#             else:
-#                 categories = []
-#         else:
-#             categories = []
-#
-#         # Date
-#         if date_column and date_column in df.columns:
-#             if pd.notna(row[date_column]):
-#                 date_str = str(row[date_column])
-#             else:
-#                 date_str = datetime.utcnow().isoformat()
-#         else:
-#             date_str = datetime.utcnow().isoformat()
-#
-#         # Build memory object
-#         memories.append(
-#             EmbeddedMemory(
-#                 user_id=user_id,
-#                 memory_text=memory_text,
-#                 categories=categories,
-#                 date=date_str,
-#                 embedding=embeddings[idx],
-#             )
-#         )
-#
-#     print(f"[INFO] Inserting {len(memories)} rows into Qdrant...")
-#     await insert_memories(memories)
-#     print("[INFO] Done inserting CSV → Qdrant.")
-#
-
-
-async def delete_user_records(user_id):
-    await client.delete(
-        collection_name=COLLECTION_NAME,
+
+async def delete_user_records(user_id, collection_name: str = COLLECTION_NAME):
+    await get_qdrant_client().delete(
+        collection_name=collection_name,
         points_selector=models.FilterSelector(
-            filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="user_id", match=models.MatchValue(value=user_id)
-                    )
-                ]
-            )
+            filter=user_filter(user_id)
         ),
     )
+    invalidate_category_cache(collection_name)
 
 
-async def delete_records(point_ids):
-    await client.delete(
-        collection_name=COLLECTION_NAME,
+async def delete_records(point_ids, collection_name: str = COLLECTION_NAME):
+    await get_qdrant_client().delete(
+        collection_name=collection_name,
         points_selector=models.PointIdsList(points=point_ids),
     )
+    invalidate_category_cache(collection_name)
 
 
-async def fetch_all_user_records(user_id):
-    out = await client.query_points(
-        collection_name=COLLECTION_NAME,
-        query_filter=models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="user_id", match=models.MatchValue(value=user_id)
-                )
-            ]
-        ),
-    )
-    return [convert_retrieved_records(point) for point in out.points]
+async def scroll_records(
+    collection_name: str,
+    scroll_filter: Optional[Filter] = None,
+    batch_size: int = 256,
+    with_vectors: bool = False,
+) -> AsyncIterator[list]:
+    """
+    Stream raw Qdrant records page by page using scroll pagination.
+
+    Args:
+        collection_name: Name of the Qdrant collection to read
+        scroll_filter: Optional filter applied server-side
+        batch_size: Points per page (one round trip each)
+        with_vectors: Also return the stored vectors
+
+    Yields:
+        Lists of qdrant Record objects, at most batch_size long
+    """
+    offset = None
+    while True:
+        records, offset = await get_qdrant_client().scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+        if records:
+            yield records
+        if offset is None:
+            break
+
+
+async def scroll_user_records(
+    user_id: int,
+    collection_name: str = COLLECTION_NAME,
+    batch_size: int = 256,
+    with_vectors: bool = False,
+) -> AsyncIterator[list[RetrievedMemory]]:
+    """
+    Stream one user's memories in pages instead of materializing them all at once.
+
+    Yields:
+        Lists of RetrievedMemory (score is 0.0; embedding is set only with with_vectors)
+    """
+    async for records in scroll_records(
+        collection_name, user_filter(user_id), batch_size, with_vectors
+    ):
+        yield [convert_retrieved_records(record) for record in records]
+
+
+async def fetch_all_user_records(user_id, collection_name: str = COLLECTION_NAME):
+    memories = []
+    async for page in scroll_user_records(user_id, collection_name):
+        memories.extend(page)
+    return memories
 
 
 def convert_retrieved_records(point) -> RetrievedMemory:
+    vector = getattr(point, "vector", None)
+    if isinstance(vector, dict):
+        vector = vector.get(DENSE_VECTOR_NAME)
     return RetrievedMemory(
-        point_id=point.id,
+        point_id=str(point.id),
         user_id=point.payload["user_id"],
         memory_text=point.payload["memory_text"],
         categories=point.payload["categories"],
         date=point.payload["date"],
-        score=point.score,
+        score=getattr(point, "score", None) or 0.0,
+        access_count=point.payload.get("access_count", 0),
+        embedding=vector if isinstance(vector, list) else None,
     )
 
 
-async def get_all_categories(collection_name: str):
+async def get_all_categories(collection_name: str, max_age: float = 0, user_id: Optional[int] = None):
     """
     Uses Qdrant's facet feature to efficiently get all unique categories
     from the indexed 'categories' field.
     
     Args:
         collection_name: Name of the Qdrant collection to query
+        max_age: Reuse a cached facet result younger than this many seconds
+                 (writes through this module invalidate the cache)
+        user_id: Only count this user's memories (collections are shared by tenants)
         
     Returns:
         List of unique category strings found in the collection
     """
+    cached = _category_cache.get((collection_name, user_id))
+    if cached is not None and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
     # Use the facet method to get unique values from the indexed field
-    facet_result = await client.facet(
+    facet_result = await get_qdrant_client().facet(
         collection_name=collection_name,
         key="categories",
+        facet_filter=user_filter(user_id) if user_id is not None else None,
         limit=1000,  # Maximum number of unique categories to return
     )
-    return [hit.value for hit in facet_result.hits]
+    categories = [hit.value for hit in facet_result.hits]
+    _category_cache[(collection_name, user_id)] = (time.monotonic(), categories)
+    return categories
 
 
-def stringify_retrieved_point(retrieved_memory: RetrievedMemory):
-    return f"""{retrieved_memory.memory_text} (Categories: {retrieved_memory.categories}) Relevance: {retrieved_memory.score:.2f}"""
+# (collection, user_id) -> (monotonic time fetched, categories)
+_category_cache: dict[tuple[str, Optional[int]], tuple[float, list[str]]] = {}
+_category_listeners: list[Callable[[str], None]] = []
+
 
+def on_categories_changed(listener: Callable[[str], None]):
+    """Register a callback run with the collection name whenever its memories are written."""
+    _category_listeners.append(listener)
 
-if __name__ == "__main__":
-    asyncio.run(create_memory_collection())
\ No newline at end of file
+
+def invalidate_category_cache(collection_name: str):
+    for key in [key for key in _category_cache if key[0] == collection_name]:
+        _category_cache.pop(key, None)
+    for listener in _category_listeners:
+        listener(collection_name)
+
+
+def stringify_retrieved_point(retrieved_memory: RetrievedMemory):
+    return f"""{retrieved_memory.memory_text} (Categories: {retrieved_memory.categories}) Relevance: {memory_relevance(retrieved_memory):.2f}"""
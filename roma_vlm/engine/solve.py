@@ -1,6 +1,6 @@
 """Multimodal recursive solve function that extends ROMA's solve with VLM support."""
 
-from typing import Optional, List, Union
+from typing import Awaitable, Callable, Optional, List, Union
 from pathlib import Path
 import functools
 
@@ -13,6 +13,24 @@ from roma_vlm.modules import (
     MultimodalVerifier,
 )
 from roma_vlm.utils import encode_image_base64, resize_image_if_needed, get_image_info
+from roma_vlm.runtime import (
+    RequestCheckpoint,
+    TaskDepthTracker,
+    install_accounting,
+    install_checkpointing,
+    install_executor_memo,
+    install_hedging,
+    install_model_router,
+    install_prompt_caching,
+    install_rate_limit,
+    install_response_cache,
+    install_retry,
+    install_tracing,
+    instrument_module,
+    trace_module,
+    trace_tools,
+    traced,
+)
 
 # Import ROMA core components
 from roma_dspy.core.engine.solve import RecursiveSolver
@@ -33,6 +51,9 @@ except ImportError:
             self.url = url
 
 
+MODULE_ROLES = ("atomizer", "planner", "executor", "aggregator", "verifier")
+
+
 def _convert_images_to_data_uris(images: Optional[List[str]], max_dimension: int = 2048) -> Optional[List[str]]:
     """
     Convert image paths to data URIs for VLM APIs with automatic resizing.
@@ -101,7 +122,13 @@ def _convert_images_to_data_uris(images: Optional[List[str]], max_dimension: int
     return converted
 
 
-def _wrap_forward_with_images(module, images: Optional[List[str]], memories: Optional[str] = None, param_name: str = 'images'):
+def _wrap_forward_with_images(
+    module,
+    images: Optional[List[str]],
+    memories: Optional[str] = None,
+    param_name: str = 'images',
+    memory_provider: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+):
     """
     Wrap a module's forward and aforward methods to automatically inject images and memories.
     
@@ -116,6 +143,8 @@ def _wrap_forward_with_images(module, images: Optional[List[str]], memories: Opt
         images: The images to inject
         memories: The memories to inject
         param_name: The parameter name to use (e.g., 'images' or 'original_images')
+        memory_provider: Optional async callable returning memories for the call's goal;
+                         used by aforward instead of the fixed memories
     """
     # Store original methods
     original_forward = module.forward
@@ -153,9 +182,12 @@ def _wrap_forward_with_images(module, images: Optional[List[str]], memories: Opt
         if param_name not in kwargs:
             kwargs[param_name] = images
         
-        # Inject memories if not already provided
+        # Inject memories if not already provided, looked up per goal when possible
         if 'memories' not in kwargs:
-            kwargs['memories'] = memories
+            if memory_provider is not None:
+                kwargs['memories'] = await memory_provider(kwargs.get('goal'))
+            else:
+                kwargs['memories'] = memories
         
         return await original_aforward(*args, **kwargs)
     
@@ -164,6 +196,70 @@ def _wrap_forward_with_images(module, images: Optional[List[str]], memories: Opt
     module.aforward = wrapped_aforward
 
 
+def _install_lm_layers(
+    module,
+    role: str,
+    rate_limit_config: Optional[dict] = None,
+    hedging_config: Optional[dict] = None,
+    routing_config: Optional[dict] = None,
+    response_cache_config: Optional[dict] = None,
+    prompt_cache_config: Optional[dict] = None,
+):
+    """
+    Apply the runtime layers to a module's LM calls.
+
+    Prompt-cache breakpoints are added closest to the provider (only for models that
+    need them), then hedging, then the rate limiter, then the model router,
+    which gives every model it routes to the same hedging and rate limiting. Hedging's
+    fallback LM gets the same inner layers; the response it discards is accounted
+    through telemetry's hedge-loser listener. The
+    response cache comes next, so hits skip all of them, and token/latency
+    accounting and the tracing span are outermost so that hits are recorded too.
+    """
+    def prepare_lm(lm, hedge: bool = True):
+        if response_cache_config and response_cache_config.get("enabled", False):
+            # Our response cache replaces DSPy's (and its base64-keyed entries)
+            lm.cache = False
+        install_prompt_caching(lm, prompt_cache_config)
+        if hedge:
+            # The fallback gets the same inner layers, but isn't hedged itself
+            install_hedging(lm, role, hedging_config, functools.partial(prepare_lm, hedge=False))
+        install_rate_limit(lm, role, rate_limit_config)
+
+    lm = getattr(module, "_lm", None)
+    if lm is None:
+        return
+    prepare_lm(lm)
+    install_model_router(lm, role, routing_config, prepare_lm)
+    install_response_cache(lm, role, response_cache_config)
+    install_accounting(lm, role)
+    install_tracing(lm, role)
+
+
+def _install_module_wrappers(
+    module,
+    role: str,
+    depth_tracker: TaskDepthTracker,
+    retry_config: Optional[dict] = None,
+    checkpoint: Optional[RequestCheckpoint] = None,
+    executor_memo: Optional[dict] = None,
+):
+    """
+    Apply the runtime wrappers to a module's aforward, after the image/memory wrapper.
+
+    From the inside out: repair/retry, the executor memo (executor_memo holds the
+    install_executor_memo arguments), checkpointing, the module span and the module
+    call instrumentation. They all see ROMA's own kwargs (input_task, context_payload).
+    """
+    install_retry(module, role, retry_config)
+    if executor_memo is not None:
+        install_executor_memo(module, **executor_memo)
+    install_checkpointing(module, role, checkpoint)
+    trace_module(module, role)
+    instrument_module(module, role, depth_tracker)
+
+
+@traced("multimodal_solve")
 async def multimodal_solve(
     goal: str,
     images: Optional[Union[str, List[str]]] = None,
@@ -200,10 +296,22 @@ async def multimodal_solve(
     verifier_demos: Optional[List] = None,
     max_depth: int = 5,
     verify: bool = True,
-    enable_mlflow: bool = True,
+    enable_mlflow: bool = False,
     mlflow_tracking_uri: str = "http://localhost:5001",
     mlflow_experiment_name: str = "ROMA-VLM",
     max_image_dimension: int = 2048,
+    memory_roles: Optional[List[str]] = None,
+    memory_provider: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+    rate_limit_config: Optional[dict] = None,
+    hedging_config: Optional[dict] = None,
+    routing_config: Optional[dict] = None,
+    response_cache_config: Optional[dict] = None,
+    prompt_cache_config: Optional[dict] = None,
+    retry_config: Optional[dict] = None,
+    checkpoint: Optional[RequestCheckpoint] = None,
+    executor_memo_config: Optional[dict] = None,
+    agent: str = "general_agent",
+    executor_memo_scope: Optional[str] = None,
 ) -> str:
     """
     Recursively solve a task with multimodal VLM support using ROMA's solve infrastructure.
@@ -245,11 +353,44 @@ async def multimodal_solve(
         verifier_demos: List of dspy.Example objects for verifier few-shot learning
         max_depth: Maximum recursion depth
         verify: Whether to verify final output
-        enable_mlflow: Enable MLflow tracking and logging (default: True)
+        enable_mlflow: Enable ROMA's in-solve MLflow tracking (default: False). It logs
+                       synchronously during the solve; request traces are exported in
+                       the background by roma_vlm.runtime.mlflow_export instead
         mlflow_tracking_uri: MLflow tracking server URI (default: "http://localhost:5001")
         mlflow_experiment_name: MLflow experiment name (default: "ROMA-VLM")
         max_image_dimension: Max width/height for images before resizing (default: 2048px).
                             Prevents context window overflow from large images.
+        memory_roles: Roles that receive memories, e.g. ["executor", "aggregator"]
+                     (default: all of atomizer, planner, executor, aggregator, verifier).
+                     The atomizer and planner run at every depth, so leaving them out
+                     keeps recursion from multiplying the memory block's prompt cost.
+        memory_provider: Optional async callable mapping a subtask goal to its memory
+                        block. When given, each executor call retrieves memories for its
+                        own subtask instead of receiving the root goal's memories.
+        rate_limit_config: RATE_LIMIT_CONFIG; when enabled, every module's LM calls are
+                          queued through a shared per-provider+model rate limiter
+        hedging_config: HEDGING_CONFIG; when enabled, calls slower than the role's
+                       latency percentile are duplicated to a fallback model
+        routing_config: ROUTING_CONFIG; when enabled, each call picks a model tier from
+                       its role, depth, image count, prompt size and live model health
+        response_cache_config: RESPONSE_CACHE_CONFIG; when enabled, responses are cached
+                              per role with image content hashes as keys, independent of
+                              DSPy's global cache settings
+        prompt_cache_config: PROMPT_CACHE_CONFIG; when enabled, requests to models that
+                            need explicit breakpoints (Anthropic) mark the end of the
+                            stable prompt prefix with cache_control
+        retry_config: RETRY_CONFIG; when enabled, a module call whose output can't be
+                     parsed is repaired locally, and failing calls are retried with
+                     backoff and jitter (only that node, not the whole solve)
+        checkpoint: RequestCheckpoint of the request; each module prediction is saved
+                    to it, and predictions it already holds are replayed without LM
+                    calls, so a resumed solve only runs the nodes that hadn't completed
+        executor_memo_config: EXECUTOR_MEMO_CONFIG; when enabled, executor answers are
+                             reused across requests for the same subtask goal, images
+                             and context, with TTLs depending on the tools used
+        agent: Agent the request runs as (part of the executor memo keys)
+        executor_memo_scope: Restricts memoized executor answers to this scope (e.g. a
+                            user id) when the executor sees personal memories
         
     Returns:
         Final synthesized result string
@@ -269,6 +410,12 @@ async def multimodal_solve(
         images = [DspyImage(url=img) if isinstance(img, str) else img for img in images]
         print(f"✓ Images converted to DSPy Image objects for proper vision API handling")
     
+    # Record a span per tool call when tracing is on
+    atomizer_tools = trace_tools(atomizer_tools)
+    planner_tools = trace_tools(planner_tools)
+    executor_tools = trace_tools(executor_tools)
+    aggregator_tools = trace_tools(aggregator_tools)
+
     # Initialize all VLM-powered modules with prediction strategies and signature instructions
     atomizer = MultimodalAtomizer(
         prediction_strategy=atomizer_strategy,
@@ -306,6 +453,23 @@ async def multimodal_solve(
         demos=aggregator_demos
     )
     
+    # Route, rate-limit and hedge every module's LM calls
+    for role, module in (
+        ("atomizer", atomizer),
+        ("planner", planner),
+        ("executor", executor),
+        ("aggregator", aggregator),
+    ):
+        _install_lm_layers(
+            module,
+            role,
+            rate_limit_config,
+            hedging_config,
+            routing_config,
+            response_cache_config,
+            prompt_cache_config,
+        )
+
     # Store images in module state so they're available during forward calls
     # This allows ROMA's solver to work with multimodal modules seamlessly
     atomizer._images = images
@@ -313,12 +477,52 @@ async def multimodal_solve(
     executor._images = images
     aggregator._images = images
     
+    # Only the roles listed in memory_roles see the memories
+    if memory_roles is None:
+        memory_roles = ["atomizer", "planner", "executor", "aggregator", "verifier"]
+    role_memories = {role: memories if role in memory_roles else None for role in MODULE_ROLES}
+
     # Wrap the forward methods to inject images and memories automatically
     # Aggregator uses 'original_images' parameter name, others use 'images'
-    _wrap_forward_with_images(atomizer, images, memories, param_name='images')
-    _wrap_forward_with_images(planner, images, memories, param_name='images')
-    _wrap_forward_with_images(executor, images, memories, param_name='images')
-    _wrap_forward_with_images(aggregator, images, memories, param_name='original_images')
+    _wrap_forward_with_images(atomizer, images, role_memories["atomizer"], param_name='images')
+    _wrap_forward_with_images(planner, images, role_memories["planner"], param_name='images')
+    _wrap_forward_with_images(
+        executor,
+        images,
+        role_memories["executor"],
+        param_name='images',
+        memory_provider=memory_provider if "executor" in memory_roles else None,
+    )
+    _wrap_forward_with_images(aggregator, images, role_memories["aggregator"], param_name='original_images')
+
+    # Let the LM layers (and the module spans) know the role and depth of each call's node.
+    # Repair/retry sits inside, so every attempt belongs to the same module call and span;
+    # the executor memo and checkpointing wrap it, so only final predictions are reused
+    depth_tracker = TaskDepthTracker(goal)
+    for role, module in (
+        ("atomizer", atomizer),
+        ("planner", planner),
+        ("executor", executor),
+        ("aggregator", aggregator),
+    ):
+        _install_module_wrappers(
+            module,
+            role,
+            depth_tracker,
+            retry_config=retry_config,
+            checkpoint=checkpoint,
+            executor_memo=(
+                dict(
+                    config=executor_memo_config,
+                    agent=agent,
+                    images=images,
+                    tools=executor_tools,
+                    user_scope=executor_memo_scope,
+                )
+                if role == "executor"
+                else None
+            ),
+        )
     
     # Create a custom AgentRegistry with our multimodal modules
     registry = AgentRegistry()
@@ -327,7 +531,8 @@ async def multimodal_solve(
     registry.register_agent(AgentType.EXECUTOR, None, executor)
     registry.register_agent(AgentType.AGGREGATOR, None, aggregator)
     
-    # Create a config with MLflow observability settings
+    # Create a config with MLflow observability settings (off unless asked for: the
+    # runner exports request traces to MLflow in the background instead)
     # The config won't be used for agent configuration since we're providing a custom registry
     mlflow_config = MLflowConfig(
         enabled=enable_mlflow,
@@ -371,11 +576,24 @@ async def multimodal_solve(
             signature_instructions=verifier_signature_instructions,
             demos=verifier_demos
         )
+        _install_lm_layers(
+            verifier,
+            "verifier",
+            rate_limit_config,
+            hedging_config,
+            routing_config,
+            response_cache_config,
+            prompt_cache_config,
+        )
+        install_retry(verifier, "verifier", retry_config)
+        install_checkpointing(verifier, "verifier", checkpoint)
+        trace_module(verifier, "verifier")
+        instrument_module(verifier, "verifier", depth_tracker)
         
         verdict = await verifier.aforward(
             goal=goal,
             images=images,
-            memories=memories,
+            memories=role_memories["verifier"],
             candidate_output=result
         )
         
@@ -0,0 +1,107 @@
+"""Runtime layers applied to the LM calls of the multimodal modules."""
+
+from roma_vlm.runtime.call_context import (
+    ModuleCall,
+    TaskDepthTracker,
+    current_module_call,
+    instrument_module,
+)
+from roma_vlm.runtime.checkpoints import (
+    CHECKPOINT_RETENTION_HOURS,
+    CheckpointStore,
+    RequestCheckpoint,
+    RequestMismatchError,
+    check_request_inputs,
+    checkpoint_stats,
+    get_checkpoint_store,
+    install_checkpointing,
+    validate_request_id,
+)
+from roma_vlm.runtime.executor_memo import install_executor_memo
+from roma_vlm.runtime.hedging import hedging_stats, install_hedging
+from roma_vlm.runtime.lm_layers import add_lm_layer
+from roma_vlm.runtime.mlflow_export import (
+    export_request_trace,
+    mlflow_export_stats,
+    start_mlflow_export,
+    stop_mlflow_export,
+)
+from roma_vlm.runtime.prompt_cache import add_cache_breakpoints, install_prompt_caching
+from roma_vlm.runtime.rate_limit import (
+    ROLE_PRIORITY,
+    get_rate_limiter,
+    install_rate_limit,
+    rate_limit_stats,
+)
+from roma_vlm.runtime.repair import install_retry, repair_prediction, retry_stats
+from roma_vlm.runtime.response_cache import install_response_cache, response_cache_stats
+from roma_vlm.runtime.router import flush_routing_logs, install_model_router
+from roma_vlm.runtime.tracing import (
+    configure_tracing,
+    install_tracing,
+    shutdown_tracing,
+    span,
+    trace_module,
+    trace_tools,
+    traced,
+)
+from roma_vlm.runtime.telemetry import (
+    CallRecord,
+    RequestTrace,
+    current_trace,
+    install_accounting,
+    record_request,
+    render_prometheus,
+    start_trace,
+)
+
+__all__ = [
+    "add_lm_layer",
+    "add_cache_breakpoints",
+    "install_prompt_caching",
+    "hedging_stats",
+    "install_hedging",
+    "ROLE_PRIORITY",
+    "get_rate_limiter",
+    "install_rate_limit",
+    "rate_limit_stats",
+    "flush_routing_logs",
+    "install_model_router",
+    "install_response_cache",
+    "response_cache_stats",
+    "ModuleCall",
+    "TaskDepthTracker",
+    "current_module_call",
+    "instrument_module",
+    "CallRecord",
+    "RequestTrace",
+    "current_trace",
+    "install_accounting",
+    "record_request",
+    "render_prometheus",
+    "start_trace",
+    "configure_tracing",
+    "install_tracing",
+    "shutdown_tracing",
+    "span",
+    "trace_module",
+    "trace_tools",
+    "traced",
+    "export_request_trace",
+    "mlflow_export_stats",
+    "start_mlflow_export",
+    "stop_mlflow_export",
+    "install_retry",
+    "repair_prediction",
+    "retry_stats",
+    "CHECKPOINT_RETENTION_HOURS",
+    "CheckpointStore",
+    "RequestCheckpoint",
+    "RequestMismatchError",
+    "check_request_inputs",
+    "checkpoint_stats",
+    "get_checkpoint_store",
+    "install_checkpointing",
+    "validate_request_id",
+    "install_executor_memo",
+]
@@ -0,0 +1,157 @@
+"""
+Pluggable key/value backends for the runtime caches.
+
+All backends store JSON strings with a per-entry TTL (seconds) and expose the same
+async get/set interface:
+
+- "memory": in-process LRU, lost on restart
+- "sqlite": a local SQLite file, shared by the workers of one host
+- "redis": any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly...), shared by
+  every host; needs the optional `redis` package
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class MemoryCacheBackend:
+    """In-process LRU with expiry."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SQLiteCacheBackend:
+    """Persistent cache in a local SQLite file; queries run in a worker thread."""
+
+    def __init__(self, path: str, namespace: Optional[str] = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # One table per namespace, so caches sharing a file never see each other's keys
+        self.table = f"cache_{_check_namespace(namespace)}" if namespace else "cache"
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._connection.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            return row[0]
+
+    def _set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._connection.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+
+class RedisCacheBackend:
+    """Cache on a Redis-protocol server; entries expire server-side."""
+
+    def __init__(self, url: str, namespace: Optional[str] = None, prefix: str = "roma_vlm:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis cache backend needs the redis package: pip install redis"
+            ) from e
+        self._client = redis.from_url(url, decode_responses=True)
+        self.prefix = f"{prefix}{_check_namespace(namespace)}:" if namespace else prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+
+_backends: dict[tuple, object] = {}
+
+_NAMESPACE_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _check_namespace(namespace: str) -> str:
+    # Namespaces become SQLite table names and Redis key prefixes
+    if not _NAMESPACE_RE.match(namespace):
+        raise ValueError(f"Invalid cache namespace: {namespace!r} (letters, digits and _ only)")
+    return namespace
+
+
+def get_cache_backend(config: dict):
+    """
+    The shared backend described by a cache config (one instance per process).
+
+    Args:
+        config: Dict with "backend" ("memory", "sqlite" or "redis") and its settings:
+                "max_entries", "path" or "redis_url"; "namespace" keeps the keys of one
+                cache apart from other caches on the same file or server
+
+    Raises:
+        ValueError: If the backend is unknown or its location is missing
+    """
+    backend = config.get("backend", "memory")
+    namespace = config.get("namespace")
+    if backend == "memory":
+        location = None
+    elif backend == "sqlite":
+        location = config.get("path")
+    elif backend == "redis":
+        location = config.get("redis_url")
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    key = (backend, location, namespace)
+
+    if key not in _backends:
+        if backend == "memory":
+            _backends[key] = MemoryCacheBackend(config.get("max_entries", 2048))
+        elif not location:
+            raise ValueError(f"The {backend} cache backend needs a location (path / redis_url)")
+        elif backend == "sqlite":
+            _backends[key] = SQLiteCacheBackend(location, namespace)
+        else:
+            _backends[key] = RedisCacheBackend(location, namespace)
+    return _backends[key]
@@ -0,0 +1,90 @@
+"""
+Which module call an LM request belongs to.
+
+LM layers only see the raw request. `instrument_module` wraps a module's aforward so
+that, for the duration of the call, `current_module_call()` tells them the role, goal
+and depth of the task node being processed.
+
+ROMA doesn't pass the node's depth to the modules, so a TaskDepthTracker follows it
+from the planner outputs instead: the root goal is depth 0, and every subtask goal a
+planner returns is one deeper than the goal that was planned.
+"""
+import contextvars
+import functools
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ModuleCall(BaseModel):
+    role: str
+    goal: Optional[str] = None
+    depth: int = 0
+    attempt: int = 0  # Module-level retry attempt (see repair.install_retry)
+    retries_recorded: int = 0  # Attempts already counted as retries by telemetry
+
+
+_current_call: contextvars.ContextVar[Optional[ModuleCall]] = contextvars.ContextVar(
+    "roma_vlm_module_call", default=None
+)
+
+
+def current_module_call() -> Optional[ModuleCall]:
+    """The module call in progress in this task, if any."""
+    return _current_call.get()
+
+
+def normalize_goal(goal: str) -> str:
+    return " ".join(str(goal).lower().split())
+
+
+def module_signature(module):
+    """The signature a module's predictor fills (with strategy fields such as reasoning)."""
+    predictor = getattr(module, "_predictor", None)
+    return getattr(predictor, "signature", None) or getattr(module, "signature", None)
+
+
+class TaskDepthTracker:
+    """Depth of each goal of one solve, learned from the planner's subtasks."""
+
+    def __init__(self, root_goal: str):
+        self._depths = {normalize_goal(root_goal): 0}
+
+    def depth_of(self, goal: Optional[str]) -> int:
+        if not goal:
+            return 0
+        return self._depths.get(normalize_goal(goal), 0)
+
+    def record_subtasks(self, parent_goal: Optional[str], prediction):
+        depth = self.depth_of(parent_goal) + 1
+        for subtask in getattr(prediction, "subtasks", None) or []:
+            goal = subtask.get("goal") if isinstance(subtask, dict) else getattr(subtask, "goal", None)
+            if goal:
+                self._depths.setdefault(normalize_goal(goal), depth)
+
+
+def instrument_module(module, role: str, tracker: TaskDepthTracker):
+    """
+    Expose each aforward call of a module to LM layers via current_module_call().
+
+    Args:
+        module: Module whose aforward is wrapped (after the image/memory wrapper)
+        role: Module role
+        tracker: Depth tracker of the current solve
+    """
+    original_aforward = module.aforward
+
+    @functools.wraps(original_aforward)
+    async def instrumented_aforward(*args, **kwargs):
+        goal = kwargs.get("goal") or kwargs.get("original_goal") or kwargs.get("input_task")
+        call = ModuleCall(role=role, goal=goal, depth=tracker.depth_of(goal))
+        token = _current_call.set(call)
+        try:
+            prediction = await original_aforward(*args, **kwargs)
+        finally:
+            _current_call.reset(token)
+        if role == "planner":
+            tracker.record_subtasks(goal, prediction)
+        return prediction
+
+    module.aforward = instrumented_aforward
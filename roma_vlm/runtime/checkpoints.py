@@ -0,0 +1,308 @@
+"""
+Checkpoint and resume of a request's solve.
+
+ROMA's own checkpointing is internal to RecursiveSolver, so progress is recorded one
+level up, at the module calls: every atomizer/planner/executor/aggregator/verifier
+prediction of a request is stored in SQLite, keyed by the request id, as soon as it
+completes. The planner predictions are the task DAG (subtasks and dependencies).
+
+Resuming a request runs the same solve again with its stored predictions replayed:
+a module call whose key is already stored returns the saved prediction without any
+LM call, so the solve walks straight back to where it stopped (replayed planner
+outputs produce the same subtask goals, hence the same keys) and only the nodes that
+hadn't completed are executed.
+
+A call's key is its role, its normalized goal and how many calls with that role and
+goal the request made before it, so repeated goals replay in order. The request's
+inputs are stored too, with copies of its images, so a request can be resumed from
+its id alone after a worker restart.
+
+Environment:
+    CHECKPOINT_DB               SQLite file of the checkpoints (default checkpoints/requests.sqlite)
+    CHECKPOINT_RETENTION_HOURS  Checkpoints older than this are purged at API startup (default 24)
+"""
+import asyncio
+import enum
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import dspy
+from pydantic import BaseModel, TypeAdapter
+
+from .call_context import module_signature, normalize_goal
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB") or "checkpoints/requests.sqlite"
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("CHECKPOINT_RETENTION_HOURS", "24"))
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def validate_request_id(request_id: str) -> str:
+    """
+    Check a client-supplied request id (it names a directory of the store).
+
+    Raises:
+        ValueError: If it isn't 1-64 letters, digits, '-' or '_'
+    """
+    if not _REQUEST_ID.match(request_id or ""):
+        raise ValueError("request_id must be 1-64 letters, digits, '-' or '_'")
+    return request_id
+
+
+class RequestMismatchError(ValueError):
+    """A request id was sent again with other inputs, or by another user."""
+
+
+def check_request_inputs(request: dict, goal: str, agent: str, user_id: int):
+    """
+    Check that a checkpointed request is the one being sent again.
+
+    Its stored result and module predictions are only valid for the same goal and
+    agent, and only belong to the user who started it.
+
+    Raises:
+        RequestMismatchError: If the goal, agent or user differ from the stored ones
+    """
+    same = (
+        normalize_goal(request["goal"] or "") == normalize_goal(goal or "")
+        and request["agent"] == agent
+        and request["user_id"] == user_id
+    )
+    if not same:
+        # Deliberately vague: don't tell a caller whose request an id belongs to
+        raise RequestMismatchError(
+            f"request_id {request['request_id']} is already used by a different request"
+        )
+
+
+def checkpoint_stats() -> dict:
+    """Module calls saved and replayed, per role."""
+    return {role: dict(counts) for role, counts in _stats.items()}
+
+
+class CheckpointStore:
+    """Requests and their completed module calls in a local SQLite file."""
+
+    def __init__(self, path: str = CHECKPOINT_DB):
+        self.path = Path(path)
+        self.image_dir = self.path.parent / "images"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                "request_id TEXT PRIMARY KEY, agent TEXT, model TEXT, user_id INTEGER, goal TEXT, "
+                "images TEXT, status TEXT, result TEXT, created_at REAL, updated_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS module_calls ("
+                "request_id TEXT, call_key TEXT, role TEXT, goal TEXT, prediction TEXT, created_at REAL, "
+                "PRIMARY KEY (request_id, call_key))"
+            )
+            self._connection.commit()
+
+    def _execute(self, query: str, params: tuple = ()) -> list:
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+            self._connection.commit()
+            return [dict(row) for row in rows]
+
+    async def get_request(self, request_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT * FROM requests WHERE request_id = ?", (request_id,)
+        )
+        if not rows:
+            return None
+        request = rows[0]
+        request["images"] = json.loads(request["images"] or "null")
+        return request
+
+    async def start_request(self, request_id: str, agent: str, model: Optional[str], user_id: int, goal: str, images):
+        """Record a request's inputs (kept from its first run) and mark it running."""
+        now = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO requests (request_id, agent, model, user_id, goal, images, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'running', ?, ?) "
+            "ON CONFLICT(request_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+            (request_id, agent, model, user_id, goal, json.dumps(images), now, now),
+        )
+
+    async def finish_request(self, request_id: str, status: str, result: Optional[str] = None):
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE requests SET status = ?, result = ?, updated_at = ? WHERE request_id = ?",
+            (status, result, time.time(), request_id),
+        )
+        if status == "completed":
+            # Resuming a completed request returns its result; the images are no longer needed
+            shutil.rmtree(self.image_dir / request_id, ignore_errors=True)
+
+    async def load_calls(self, request_id: str) -> dict[str, str]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT call_key, prediction FROM module_calls WHERE request_id = ?",
+            (request_id,),
+        )
+        return {row["call_key"]: row["prediction"] for row in rows}
+
+    async def save_call(self, request_id: str, key: str, role: str, goal: Optional[str], prediction: str):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO module_calls (request_id, call_key, role, goal, prediction, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (request_id, key, role, goal, prediction, time.time()),
+        )
+
+    def keep_images(self, request_id: str, images) -> Optional[list[str]]:
+        """Copy a request's image files next to its checkpoint (URLs/data URIs are kept as is)."""
+        validate_request_id(request_id)
+        if images is None:
+            return None
+        if isinstance(images, str):
+            images = [images]
+        kept = []
+        for i, image in enumerate(images):
+            source = Path(image)
+            if image.startswith(("data:", "http://", "https://")) or not source.is_file():
+                kept.append(image)
+                continue
+            target = self.image_dir / request_id / f"{i}{source.suffix}"
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(source, target)
+            kept.append(str(target))
+        return kept
+
+    async def purge(self, older_than: float) -> int:
+        """Delete requests (and their calls and images) not updated for `older_than` seconds."""
+        cutoff = time.time() - older_than
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT request_id FROM requests WHERE updated_at < ?", (cutoff,)
+        )
+        for row in rows:
+            await asyncio.to_thread(
+                self._execute, "DELETE FROM module_calls WHERE request_id = ?", (row["request_id"],)
+            )
+            await asyncio.to_thread(
+                self._execute, "DELETE FROM requests WHERE request_id = ?", (row["request_id"],)
+            )
+            shutil.rmtree(self.image_dir / row["request_id"], ignore_errors=True)
+        return len(rows)
+
+
+_store: Optional[CheckpointStore] = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """The process-wide checkpoint store (CHECKPOINT_DB)."""
+    global _store
+    if _store is None:
+        _store = CheckpointStore(CHECKPOINT_DB)
+    return _store
+
+
+def _jsonable(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+def serialize_prediction(prediction) -> str:
+    return json.dumps(dict(prediction.items()), default=_jsonable)
+
+
+def restore_prediction(signature, value: str):
+    """A stored prediction with its fields validated back to the signature's types."""
+    fields = json.loads(value)
+    output_fields = signature.output_fields if signature is not None else {}
+    for name, field in output_fields.items():
+        if name in fields:
+            fields[name] = TypeAdapter(field.annotation).validate_python(fields[name])
+    return dspy.Prediction(**fields)
+
+
+class RequestCheckpoint:
+    """The stored module calls of one request, replayed and extended as it runs."""
+
+    def __init__(self, store: CheckpointStore, request_id: str, completed: dict[str, str]):
+        self.store = store
+        self.request_id = request_id
+        self.completed = completed
+        self._occurrences: dict[tuple, int] = defaultdict(int)
+
+    @classmethod
+    async def open(cls, store: CheckpointStore, request_id: str) -> "RequestCheckpoint":
+        checkpoint = cls(store, request_id, await store.load_calls(request_id))
+        if checkpoint.completed:
+            print(f"✓ Resuming request {request_id}: {len(checkpoint.completed)} module calls to replay")
+        return checkpoint
+
+    def call_key(self, role: str, goal: Optional[str]) -> str:
+        goal_key = normalize_goal(goal or "")
+        occurrence = self._occurrences[(role, goal_key)]
+        self._occurrences[(role, goal_key)] += 1
+        digest = hashlib.sha256(goal_key.encode()).hexdigest()[:32]
+        return f"{role}:{digest}:{occurrence}"
+
+    async def save(self, key: str, role: str, goal: Optional[str], prediction):
+        try:
+            await self.store.save_call(self.request_id, key, role, goal, serialize_prediction(prediction))
+        except Exception as e:
+            # A lost checkpoint only costs a re-run on resume; never fail the solve for it
+            print(f"[WARN] Could not checkpoint {role} call: {e}")
+
+
+def install_checkpointing(module, role: str, checkpoint: Optional[RequestCheckpoint]):
+    """
+    Save each of a module's predictions, and replay the saved ones on resume.
+
+    Args:
+        module: Module whose aforward is wrapped (after retry, before instrumentation)
+        role: Module role (part of the call keys)
+        checkpoint: Checkpoint of the current request (no-op when None)
+    """
+    if checkpoint is None:
+        return
+    counts = _stats.setdefault(role, {"saved": 0, "replayed": 0})
+    signature = module_signature(module)
+    original_aforward = module.aforward
+
+    @functools.wraps(original_aforward)
+    async def checkpointed_aforward(*args, **kwargs):
+        # ROMA passes the goal as input_task; the image wrapper only renames it further in
+        goal = kwargs.get("goal") or kwargs.get("input_task") or kwargs.get("original_goal")
+        key = checkpoint.call_key(role, goal)
+        saved = checkpoint.completed.get(key)
+        if saved is not None:
+            try:
+                prediction = restore_prediction(signature, saved)
+            except Exception as e:
+                print(f"[WARN] Could not replay checkpointed {role} call, running it again: {e}")
+            else:
+                counts["replayed"] += 1
+                return prediction
+
+        prediction = await original_aforward(*args, **kwargs)
+        await checkpoint.save(key, role, goal, prediction)
+        counts["saved"] += 1
+        return prediction
+
+    module.aforward = checkpointed_aforward
@@ -0,0 +1,220 @@
+"""
+Executor memo: reuse the answer to an identical atomic subtask across requests.
+
+Users often send the same atomic subtask, e.g. "convert 1 BTC to USD at current price",
+or "extract the line items from this receipt" with the same picture. The response
+cache only helps when the LM request is byte-identical, and a ReAct executor still
+re-runs its tools. The memo sits on the executor call itself and is keyed by:
+
+- the agent, the executor's model and the normalized subtask goal;
+- the content digests of the request's images;
+- optionally the subtask's context (dependency results), with volatile ids and
+  timestamps stripped;
+- the user, whenever the executor sees memories, so a personal answer is never served
+  to someone else.
+
+How long an answer is reused depends on how it was produced: a long TTL for pure
+visual/text reasoning, the shortest TTL of the toolkits it called otherwise (a live
+price is stale in seconds, a calculation never is). Entries live in the runtime cache
+backends under their own namespace.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import re
+from typing import Optional
+
+from .cache_backends import get_cache_backend
+from .call_context import current_module_call, module_signature, normalize_goal
+from .checkpoints import restore_prediction, serialize_prediction
+from .response_cache import image_digest
+from .telemetry import METRICS, CallRecord, current_trace, record_call
+
+DEFAULT_EXECUTOR_MEMO_CONFIG = {
+    "enabled": False,
+    "backend": "memory",
+    "max_entries": 4096,
+    "path": None,
+    "redis_url": None,
+    "ttl": {"no_tools": 86400, "tools": 60},
+    "tool_ttl": {},
+    "include_context": True,
+}
+
+MEMO_NAMESPACE = "executor_memo"
+
+# Toolkit class -> its key in TOOL_CONFIGS and EXECUTOR_MEMO_CONFIG["tool_ttl"]
+TOOLKIT_TTL_KEYS = {
+    "CalculatorToolkit": "calculator",
+    "WebSearchToolkit": "web_search",
+    "BinanceToolkit": "binance",
+    "CoinGeckoToolkit": "coingecko",
+    "DefiLlamaToolkit": "defillama",
+}
+
+# Ids and timestamps ROMA puts in the context that differ between otherwise equal subtasks
+_VOLATILE = re.compile(
+    r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"
+    r"|\b[0-9a-f]{16,}\b"
+    r"|\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?",
+    re.IGNORECASE,
+)
+
+
+def normalize_context(context: Optional[str]) -> str:
+    if not context:
+        return ""
+    return " ".join(_VOLATILE.sub("#", str(context)).split())
+
+
+def _dependency_context(kwargs: dict) -> Optional[str]:
+    """The subtask's dependency results: ROMA's context_payload, or a string context."""
+    context = kwargs.get("context_payload")
+    if context is None and isinstance(kwargs.get("context"), str):
+        context = kwargs["context"]
+    return context
+
+
+def _image_url(image) -> str:
+    return image if isinstance(image, str) else str(getattr(image, "url", image))
+
+
+def _toolkit_of(tool) -> Optional[str]:
+    """tool_ttl key of a tool method, e.g. "web_search" for a WebSearchToolkit method."""
+    owner = getattr(inspect.unwrap(tool), "__self__", None)
+    if owner is None:
+        return None
+    name = type(owner).__name__
+    return TOOLKIT_TTL_KEYS.get(name, name)
+
+
+def _tool_ttls(config: dict, toolkits: dict) -> dict:
+    """tool_ttl keyed by toolkit key (class names are accepted too), checked against the toolkits."""
+    tool_ttl = {TOOLKIT_TTL_KEYS.get(key, key): ttl for key, ttl in config["tool_ttl"].items()}
+    known = set(TOOLKIT_TTL_KEYS.values()) | {key for key in toolkits.values() if key}
+    for key in tool_ttl:
+        if key not in known:
+            print(f"[WARN] Executor memo tool_ttl key '{key}' matches no toolkit; "
+                  f"its answers fall back to ttl['tools']")
+    return tool_ttl
+
+
+def tools_used(prediction) -> Optional[list[str]]:
+    """Tool names called by a ReAct prediction (None when it can't be told)."""
+    trajectory = getattr(prediction, "trajectory", None)
+    if not isinstance(trajectory, dict):
+        return None
+    return [
+        name
+        for key, name in trajectory.items()
+        if key.startswith("tool_name_") and name != "finish"
+    ]
+
+
+def answer_ttl(
+    config: dict, used: Optional[list[str]], toolkits: dict, has_tools: bool, tool_ttl: Optional[dict] = None
+) -> float:
+    """Seconds an answer is reused, given the tools that produced it."""
+    default = config["ttl"].get("tools", 0)
+    if used is None and has_tools:
+        # Can't tell which tools ran: assume the answer depends on them
+        return default
+    if not used:
+        return config["ttl"].get("no_tools", 0)
+    tool_ttl = config["tool_ttl"] if tool_ttl is None else tool_ttl
+    return min(tool_ttl.get(toolkits.get(name), default) for name in used)
+
+
+def memo_key(
+    agent: str,
+    model: Optional[str],
+    goal: str,
+    image_digests: list[str],
+    context: str,
+    scope: Optional[str],
+) -> str:
+    payload = {
+        "agent": agent,
+        "model": model,
+        "goal": normalize_goal(goal),
+        "images": image_digests,
+        "context": context,
+        "scope": scope,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def install_executor_memo(
+    module,
+    config: Optional[dict],
+    agent: str,
+    images=None,
+    tools: Optional[dict] = None,
+    user_scope: Optional[str] = None,
+):
+    """
+    Serve an executor's calls from the cross-request memo.
+
+    Apply inside checkpointing, so that memo hits are checkpointed like any prediction.
+
+    Args:
+        module: Executor module whose aforward is wrapped
+        config: EXECUTOR_MEMO_CONFIG (no-op when missing or disabled)
+        agent: Agent the request runs as (part of the key)
+        images: The request's images (their content digests are part of the key)
+        tools: The executor's tools, to map tool calls to toolkit TTLs
+        user_scope: Set when the executor sees user memories; answers are then only
+                    shared with that user
+    """
+    if not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_EXECUTOR_MEMO_CONFIG, **config}
+    backend = get_cache_backend({**config, "namespace": MEMO_NAMESPACE})
+    digests = [image_digest(_image_url(image)) for image in images or []]
+    toolkits = {name: _toolkit_of(tool) for name, tool in (tools or {}).items()}
+    tool_ttl = _tool_ttls(config, toolkits)
+    # The API lets the client pick the model; one model's answer isn't another's
+    model = getattr(getattr(module, "_lm", None), "model", None)
+    signature = module_signature(module)
+    original_aforward = module.aforward
+
+    @functools.wraps(original_aforward)
+    async def memoized_aforward(*args, **kwargs):
+        goal = kwargs.get("goal") or kwargs.get("input_task")
+        if not goal:
+            return await original_aforward(*args, **kwargs)
+        context = normalize_context(_dependency_context(kwargs)) if config["include_context"] else ""
+        key = f"{MEMO_NAMESPACE}:{memo_key(agent, model, goal, digests, context, user_scope)}"
+
+        try:
+            cached = await backend.get(key)
+        except Exception as e:
+            print(f"[WARN] Executor memo read failed: {e}")
+            cached = None
+        if cached is not None:
+            try:
+                prediction = restore_prediction(signature, cached)
+            except Exception as e:
+                print(f"[WARN] Could not restore memoized executor answer: {e}")
+            else:
+                METRICS.inc("roma_executor_memo_total", {"agent": agent, "result": "hit"})
+                call = current_module_call()
+                trace = current_trace()
+                record_call(
+                    CallRecord(role="executor", depth=call.depth if call else 0, model=MEMO_NAMESPACE, cache_hit=True),
+                    trace.agent if trace is not None else agent,
+                )
+                return prediction
+
+        METRICS.inc("roma_executor_memo_total", {"agent": agent, "result": "miss"})
+        prediction = await original_aforward(*args, **kwargs)
+        ttl = answer_ttl(config, tools_used(prediction), toolkits, bool(tools), tool_ttl)
+        if ttl > 0:
+            try:
+                await backend.set(key, serialize_prediction(prediction), ttl)
+            except Exception as e:
+                print(f"[WARN] Executor memo write failed: {e}")
+        return prediction
+
+    module.aforward = memoized_aforward
@@ -0,0 +1,199 @@
+"""
+Hedged LM requests and failover.
+
+When a call is still running after the role's recent latency percentile (p95 by
+default), a duplicate request goes to a fallback model and whichever returns a valid
+response first wins. A primary that fails outright fails over to the fallback
+immediately, when the fallback is a different model; rate-limit errors are raised
+instead, so the rate limiter around this layer pauses the model. Hedges are capped at a fraction of each role's calls, so the extra cost
+stays bounded.
+
+The losing request is not cancelled: the provider bills it either way, and letting it
+finish gives its real latency, from which the tail latency saved is measured. Its
+response is handed to the `on_hedge_loser` listeners, so its tokens are accounted
+like those of the response that was returned.
+"""
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import dspy
+
+from .lm_layers import add_lm_layer
+from .rate_limit import is_rate_limit_error
+
+DEFAULT_HEDGING_CONFIG = {
+    "enabled": False,
+    "percentile": 95,
+    "min_samples": 20,
+    "initial_delay": 30.0,
+    "min_delay": 1.0,
+    "max_hedge_ratio": 0.1,
+    "fallback_model": None,
+    "fallback_models": {},
+    "failover": True,
+}
+
+
+class RoleLatency:
+    """Rolling latency window and hedging counters of one role."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.latency_saved = 0.0
+
+    def hedge_delay(self, config: dict) -> float:
+        if len(self.latencies) < max(2, config["min_samples"]):
+            return config["initial_delay"]
+        percentile = statistics.quantiles(self.latencies, n=100)[config["percentile"] - 1]
+        return max(config["min_delay"], percentile)
+
+    def can_hedge(self, config: dict) -> bool:
+        return self.hedged < config["max_hedge_ratio"] * max(self.calls, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "latency_saved_seconds": self.latency_saved,
+        }
+
+
+_role_latency: dict[str, RoleLatency] = {}
+_loser_listeners: list[Callable] = []
+
+
+def on_hedge_loser(listener: Callable):
+    """
+    Register a callback for the discarded response of every hedged call.
+
+    It is called with (role, model, request, response, latency), in the context of the
+    module call that was hedged.
+    """
+    _loser_listeners.append(listener)
+
+
+def hedging_stats() -> dict:
+    """Hedge rate, wins, failovers and tail latency saved, per role."""
+    return {role: stats.as_dict() for role, stats in _role_latency.items()}
+
+
+def _is_valid(task: asyncio.Task) -> bool:
+    if task.cancelled() or task.exception() is not None:
+        return False
+    return bool(getattr(task.result(), "choices", None))
+
+
+def _can_fail_over(primary: asyncio.Task, config: dict, lm, fallback_lm) -> bool:
+    if not config["failover"] or fallback_lm.model == lm.model:
+        # The same model would fail the same way
+        return False
+    error = None if primary.cancelled() else primary.exception()
+    # A 429 has to reach the rate limiter, which pauses the model for everyone
+    return error is None or not is_rate_limit_error(error)
+
+
+def _build_fallback_lm(lm, model: str):
+    return dspy.LM(model=model, model_type=lm.model_type, cache=lm.cache, **lm.kwargs)
+
+
+def hedging_layer(role: str, config: dict, fallback_lm):
+    """LM layer that hedges slow calls of `role` and fails over to `fallback_lm`."""
+    stats = _role_latency.setdefault(role, RoleLatency())
+
+    def report_loser(model: str, request: dict, start: float):
+        def report(task: asyncio.Task):
+            # _is_valid also retrieves the exception of a failed loser
+            if not _is_valid(task):
+                return
+            for listener in _loser_listeners:
+                try:
+                    listener(role, model, request, task.result(), time.monotonic() - start)
+                except Exception as e:
+                    print(f"[WARN] Hedge loser listener failed: {e}")
+
+        return report
+
+    async def layer(call_next, lm, **request):
+        stats.calls += 1
+        start = time.monotonic()
+        primary = asyncio.create_task(call_next(**request))
+        done, _ = await asyncio.wait({primary}, timeout=stats.hedge_delay(config))
+
+        if done:
+            if _is_valid(primary):
+                stats.latencies.append(time.monotonic() - start)
+                return primary.result()
+            if not _can_fail_over(primary, config, lm, fallback_lm):
+                return primary.result()
+            # Failed fast: retry on the fallback instead of waiting for a hedge
+            stats.failovers += 1
+            print(f"[WARN] {role} call to {lm.model} failed; failing over to {fallback_lm.model}")
+            return await fallback_lm.aforward(**request)
+
+        if not stats.can_hedge(config):
+            return await primary
+
+        stats.hedged += 1
+        hedge = asyncio.create_task(fallback_lm.aforward(**request))
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if _is_valid(task)), None)
+        if winner is None:
+            # Both failed: surface the primary's error
+            return primary.result()
+
+        for task, model in ((primary, lm.model), (hedge, fallback_lm.model)):
+            if task is not winner:
+                # The loser keeps running; account its tokens once it's done
+                task.add_done_callback(report_loser(model, request, start))
+        elapsed = time.monotonic() - start
+        if winner is primary:
+            stats.latencies.append(elapsed)
+        else:
+            stats.hedge_wins += 1
+
+            def record_saved(task: asyncio.Task):
+                if _is_valid(task):
+                    stats.latencies.append(time.monotonic() - start)
+                    stats.latency_saved += time.monotonic() - start - elapsed
+
+            primary.add_done_callback(record_saved)
+        return winner.result()
+
+    return layer
+
+
+def install_hedging(lm, role: str, config: Optional[dict], prepare_lm: Optional[Callable] = None):
+    """
+    Hedge and fail over an LM's calls.
+
+    Install before the rate limiter, so queueing time doesn't count as provider latency.
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        role: Module role; latency percentiles and budgets are tracked per role
+        config: HEDGING_CONFIG (no-op when missing or disabled)
+        prepare_lm: Called with the fallback LM to install its inner layers (prompt
+                    caching, rate limiting), as for the router's tier LMs
+    """
+    if lm is None or not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_HEDGING_CONFIG, **config}
+    # Without a fallback, the duplicate goes to the same model (still cuts provider tails)
+    fallback_model = config["fallback_models"].get(role) or config["fallback_model"] or lm.model
+    fallback_lm = _build_fallback_lm(lm, fallback_model)
+    if prepare_lm is not None:
+        prepare_lm(fallback_lm)
+    add_lm_layer(lm, hedging_layer(role, config, fallback_lm))
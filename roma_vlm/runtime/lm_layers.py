@@ -0,0 +1,92 @@
+"""
+Call-path layers around a DSPy LM.
+
+`dspy.LM.acall` sends every request through `LM.aforward(prompt, messages, **kwargs)`,
+which returns the raw litellm response (with usage and provider headers). A layer wraps
+that method on one LM instance, the same way solve.py wraps module forwards, so rate
+limiting, caching, accounting etc. apply to every call a module makes (including the
+extra calls of ReAct/CodeAct strategies) without changing the modules themselves.
+
+A layer is an async callable:
+
+    async def layer(call_next, lm, **request):
+        ...
+        return await call_next(**request)
+
+Layers added later run first (outermost).
+"""
+import functools
+from typing import Any, Awaitable, Callable
+
+LMLayer = Callable[..., Awaitable[Any]]
+
+
+def add_lm_layer(lm, layer: LMLayer):
+    """
+    Wrap `lm.aforward` with a layer.
+
+    Args:
+        lm: dspy.LM instance (e.g. a module's `_lm`)
+        layer: Async callable taking (call_next, lm, **request)
+    """
+    inner = lm.aforward
+
+    @functools.wraps(inner)
+    async def aforward(prompt=None, messages=None, **kwargs):
+        return await layer(inner, lm, prompt=prompt, messages=messages, **kwargs)
+
+    lm.aforward = aforward
+
+
+def response_headers(response) -> dict:
+    """Provider response headers litellm attached to a response (lower-cased keys)."""
+    hidden = getattr(response, "_hidden_params", None) or {}
+    headers = hidden.get("additional_headers") or {}
+    normalized = {}
+    for key, value in headers.items():
+        key = key.lower()
+        # litellm prefixes raw provider headers with "llm_provider-"
+        normalized[key.removeprefix("llm_provider-")] = value
+    return normalized
+
+
+def response_usage(response) -> dict:
+    """Token usage of a response as a plain dict (empty when unknown)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    if isinstance(usage, dict):
+        return usage
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+
+
+# Same rough estimate used across the project: 4 characters ≈ 1 token
+CHARS_PER_TOKEN = 4
+# Typical cost of one high-detail image after provider downscaling
+IMAGE_TOKENS = 1000
+
+
+def count_images(messages) -> int:
+    """Number of image parts in chat messages."""
+    count = 0
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            count += sum(1 for part in content if part.get("type") == "image_url")
+    return count
+
+
+def estimate_prompt_tokens(messages=None, prompt=None) -> int:
+    """Cheap pre-call estimate of a request's prompt tokens."""
+    chars = len(prompt or "")
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content if part.get("type") == "text")
+    return chars // CHARS_PER_TOKEN + count_images(messages) * IMAGE_TOKENS
@@ -0,0 +1,276 @@
+"""
+Background export of request traces to MLflow.
+
+ROMA's built-in MLflow integration logs from inside the solve, so every request waits
+on the tracking server, and pays connection attempts and timeouts when none is
+running. Instead, the runner hands each finished RequestTrace to an exporter that:
+
+- samples requests (failed requests are always kept by default);
+- queues them without blocking, dropping traces when the queue is full;
+- exports from a daemon thread, which drains the queue up to `batch_size` traces at a
+  time. MLflow has no multi-run write API, so every trace still costs its own calls: one
+  run per request (create_run, log_batch for the summary metrics and params, log_text
+  for the per-call trace.json artifact, set_terminated). Only the queue draining and
+  the circuit breaker's failure counting work per batch;
+- probes the tracking server when it starts, and stops exporting through a circuit
+  breaker while the server is down, probing again after a cooldown.
+
+Environment:
+    MLFLOW_EXPORT              "true" to export request traces (default false)
+    MLFLOW_TRACKING_URI        Tracking server (default http://localhost:5001)
+    MLFLOW_EXPERIMENT_NAME     Experiment of the runs (default "ROMA-VLM")
+    MLFLOW_SAMPLE_RATE         Fraction of successful requests exported, 0-1 (default 1.0)
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from .telemetry import RequestTrace
+
+
+class MLflowExportSettings(BaseModel):
+    enabled: bool = False
+    tracking_uri: str = "http://localhost:5001"
+    experiment_name: str = "ROMA-VLM"
+    sample_rate: float = 1.0
+    always_export_errors: bool = True
+    batch_size: int = 20  # Traces taken off the queue per export pass (each is still its own run)
+    flush_interval: float = 5.0  # Seconds a partial batch waits for more traces
+    max_queue_size: int = 1000  # Traces buffered before new ones are dropped
+    probe_timeout: float = 2.0  # Seconds the connectivity probe waits
+    failure_threshold: int = 3  # Consecutive failed batches that open the circuit
+    cooldown: float = 300.0  # Seconds the circuit stays open before probing again
+
+    @classmethod
+    def from_env(cls) -> "MLflowExportSettings":
+        return cls(
+            enabled=os.getenv("MLFLOW_EXPORT", "false").lower() == "true",
+            tracking_uri=os.getenv("MLFLOW_TRACKING_URI") or "http://localhost:5001",
+            experiment_name=os.getenv("MLFLOW_EXPERIMENT_NAME") or "ROMA-VLM",
+            sample_rate=float(os.getenv("MLFLOW_SAMPLE_RATE", "1.0")),
+        )
+
+
+class CircuitBreaker:
+    """Closed while exports succeed; open for `cooldown` seconds after repeated failures."""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        self.opened_at = time.monotonic()
+
+
+class MLflowExporter:
+    """Exports RequestTraces to MLflow from a background thread."""
+
+    def __init__(self, settings: MLflowExportSettings):
+        self.settings = settings
+        self.breaker = CircuitBreaker(settings.failure_threshold, settings.cooldown)
+        self.stats = {"queued": 0, "exported": 0, "sampled_out": 0, "dropped": 0, "failed_batches": 0}
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=settings.max_queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._experiment_id: Optional[str] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mlflow-export", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Export what is queued (unless the circuit is open) and stop the thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, trace: "RequestTrace", ok: bool):
+        """Queue a finished request for export; never blocks."""
+        if ok or not self.settings.always_export_errors:
+            if random.random() >= self.settings.sample_rate:
+                self.stats["sampled_out"] += 1
+                return
+        if not self.breaker.allow():
+            self.stats["dropped"] += 1
+            return
+        entry = {"trace": trace.model_dump(), "summary": trace.summary(), "ok": ok}
+        try:
+            self._queue.put_nowait(entry)
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def probe(self) -> bool:
+        """Whether the tracking server answers its health check."""
+        uri = self.settings.tracking_uri.rstrip("/")
+        if not uri.startswith(("http://", "https://")):
+            # File stores and managed backends have no health endpoint
+            return True
+        try:
+            return httpx.get(f"{uri}/health", timeout=self.settings.probe_timeout).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def _next_batch(self) -> list[dict]:
+        batch = []
+        deadline = time.monotonic() + self.settings.flush_interval
+        while len(batch) < self.settings.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _run(self):
+        if not self.probe():
+            print(f"[WARN] MLflow tracking server {self.settings.tracking_uri} is unreachable; "
+                  f"trace export paused for {self.settings.cooldown:.0f}s")
+            self.breaker.trip()
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            state = self.breaker.state
+            if state == "open" or (state == "half_open" and not self.probe()):
+                if state == "half_open":
+                    self.breaker.trip()
+                self.stats["dropped"] += len(batch)
+                continue
+            try:
+                self._export(batch)
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                self.stats["dropped"] += len(batch)
+                self.breaker.record_failure()
+                print(f"[WARN] MLflow trace export failed: {e}")
+            else:
+                self.stats["exported"] += len(batch)
+                self.breaker.record_success()
+
+    def _mlflow_client(self):
+        if self._client is None:
+            from mlflow.tracking import MlflowClient
+
+            client = MlflowClient(tracking_uri=self.settings.tracking_uri)
+            experiment = client.get_experiment_by_name(self.settings.experiment_name)
+            self._experiment_id = (
+                experiment.experiment_id
+                if experiment is not None
+                else client.create_experiment(self.settings.experiment_name)
+            )
+            self._client = client
+        return self._client
+
+    def _export(self, batch: list[dict]):
+        """Create one run per trace (four tracking calls each)."""
+        from mlflow.entities import Metric, Param, RunTag
+
+        client = self._mlflow_client()
+        for entry in batch:
+            summary = entry["summary"]
+            timestamp = int(entry["trace"]["started_at"] * 1000)
+            metrics = {
+                "wall_time": summary["wall_time"],
+                "lm_calls": summary["calls"],
+                "prompt_tokens": summary["prompt_tokens"],
+                "completion_tokens": summary["completion_tokens"],
+                "max_depth": summary["max_depth"],
+            }
+            for role, row in summary["per_role"].items():
+                for field in ("calls", "prompt_tokens", "completion_tokens", "latency", "retries", "cache_hits"):
+                    metrics[f"{role}.{field}"] = row[field]
+
+            run = client.create_run(
+                self._experiment_id,
+                start_time=timestamp,
+                run_name=f"{summary['agent'] or 'request'}-{summary['request_id'][:8]}",
+            )
+            run_id = run.info.run_id
+            client.log_batch(
+                run_id,
+                metrics=[Metric(key, float(value), timestamp, 0) for key, value in metrics.items()],
+                params=[Param("agent", str(summary["agent"])), Param("request_id", summary["request_id"])],
+                tags=[RunTag("roma.success", str(entry["ok"]).lower())],
+            )
+            client.log_text(run_id, json.dumps(entry["trace"], default=str), "trace.json")
+            client.set_terminated(
+                run_id,
+                status="FINISHED" if entry["ok"] else "FAILED",
+                end_time=int((entry["trace"]["finished_at"] or time.time()) * 1000),
+            )
+
+
+_exporter: Optional[MLflowExporter] = None
+_configured = False
+
+
+def start_mlflow_export(settings: Optional[MLflowExportSettings] = None) -> Optional[MLflowExporter]:
+    """Start the process-wide exporter once (None when MLFLOW_EXPORT is off)."""
+    global _exporter, _configured
+    if not _configured:
+        _configured = True
+        settings = settings or MLflowExportSettings.from_env()
+        if settings.enabled:
+            _exporter = MLflowExporter(settings)
+            _exporter.start()
+            print(f"✓ Exporting request traces to MLflow at {settings.tracking_uri} "
+                  f"(sample rate {settings.sample_rate})")
+    return _exporter
+
+
+def stop_mlflow_export():
+    """Flush queued traces and stop the exporter."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+
+
+def export_request_trace(trace: "RequestTrace", ok: bool):
+    """Queue a finished request for MLflow export (started on first use)."""
+    exporter = start_mlflow_export()
+    if exporter is not None:
+        exporter.submit(trace, ok)
+
+
+def mlflow_export_stats() -> dict:
+    """Exporter counters and circuit state (empty when export is off)."""
+    if _exporter is None:
+        return {}
+    return {**_exporter.stats, "circuit_open": int(_exporter.breaker.state == "open")}
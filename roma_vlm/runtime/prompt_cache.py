@@ -0,0 +1,83 @@
+"""
+Provider prompt-cache breakpoints.
+
+OpenAI-style providers cache long common prompt prefixes automatically; Anthropic
+models only do so for prefixes that end at an explicit `cache_control` breakpoint. For
+models matching PROMPT_CACHE_CONFIG["cache_control_models"], this layer marks the end of
+the stable parts of each request:
+
+1. the system message (signature instructions and field descriptions),
+2. the last demo turn before the final user message,
+3. the last image of the final user message (images are the first input fields).
+
+Anthropic allows four breakpoints per request, so three leaves room for callers.
+"""
+from typing import Optional
+
+from .lm_layers import add_lm_layer
+
+DEFAULT_PROMPT_CACHE_CONFIG = {
+    "enabled": True,
+    "cache_control_models": ["anthropic/", "claude"],
+}
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _mark_last_part(message: dict, part_type: Optional[str] = None) -> dict:
+    content = message.get("content")
+    if isinstance(content, str):
+        parts = [{"type": "text", "text": content}]
+    elif isinstance(content, list):
+        parts = [dict(part) for part in content]
+    else:
+        return message
+    for part in reversed(parts):
+        if part_type is None or part.get("type") == part_type:
+            part["cache_control"] = CACHE_CONTROL
+            break
+    return {**message, "content": parts}
+
+
+def add_cache_breakpoints(messages: list) -> list:
+    """A copy of chat messages with cache_control breakpoints after the stable prefix."""
+    if not messages:
+        return messages
+    marked = list(messages)
+    if marked[0].get("role") == "system":
+        marked[0] = _mark_last_part(marked[0])
+    last = len(marked) - 1
+    if last >= 2 and marked[last].get("role") == "user":
+        # End of the few-shot demos
+        marked[last - 1] = _mark_last_part(marked[last - 1])
+    if marked[last].get("role") == "user":
+        marked[last] = _mark_last_part(marked[last], part_type="image_url")
+    return marked
+
+
+def prompt_cache_layer():
+    async def layer(call_next, lm, **request):
+        if request.get("messages"):
+            request["messages"] = add_cache_breakpoints(request["messages"])
+        return await call_next(**request)
+
+    return layer
+
+
+def install_prompt_caching(lm, config: Optional[dict]):
+    """
+    Add cache_control breakpoints to an LM's requests when its model needs them.
+
+    Install first (innermost), so only the model that actually receives the request
+    decides whether it carries breakpoints.
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        config: PROMPT_CACHE_CONFIG (no-op when missing or disabled)
+    """
+    if lm is None or not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_PROMPT_CACHE_CONFIG, **config}
+    if not any(pattern in lm.model for pattern in config["cache_control_models"]):
+        return
+    add_lm_layer(lm, prompt_cache_layer())
@@ -0,0 +1,307 @@
+"""
+Provider-aware rate limiting for LM calls.
+
+All modules of a solve (and the memory updater) share one limiter per provider+model,
+so parallel subtasks queue instead of bursting into 429s. Each limiter keeps two token
+buckets (requests/min and tokens/min) and grants waiting calls by priority: the
+verifier and aggregator, which sit on the critical path of a finished request, go
+ahead of planning/execution, and background memory work goes last. Waiting calls age:
+every `priority_aging` seconds in the queue raise a call one priority level, so memory
+calls are delayed under sustained solver load but never starved.
+
+Limits start from RATE_LIMIT_CONFIG and follow the provider's x-ratelimit-* /
+anthropic-ratelimit-* response headers when present; a 429 pauses the limiter for the
+Retry-After period (or an exponential backoff) instead of letting every waiter retry.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional
+
+from .lm_layers import add_lm_layer, estimate_prompt_tokens, response_headers, response_usage
+
+# Lower runs first
+ROLE_PRIORITY = {
+    "verifier": 0,
+    "aggregator": 0,
+    "atomizer": 1,
+    "planner": 1,
+    "executor": 2,
+    "memory": 3,
+}
+DEFAULT_PRIORITY = 2
+
+# Completion tokens reserved up front; corrected with the actual usage afterwards
+COMPLETION_ESTIMATE = 500
+
+DEFAULT_RATE_LIMIT_CONFIG = {
+    "enabled": True,
+    "requests_per_minute": 60,
+    "tokens_per_minute": 200_000,
+    "adapt_to_headers": True,
+    "max_queue_wait": 120,
+    "priority_aging": 10,
+    "overrides": {},
+}
+
+# Header -> (bucket, field). Limits are treated as per-minute values.
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit-requests": ("requests", "limit"),
+    "x-ratelimit-remaining-requests": ("requests", "remaining"),
+    "x-ratelimit-limit-tokens": ("tokens", "limit"),
+    "x-ratelimit-remaining-tokens": ("tokens", "remaining"),
+    "anthropic-ratelimit-requests-limit": ("requests", "limit"),
+    "anthropic-ratelimit-requests-remaining": ("requests", "remaining"),
+    "anthropic-ratelimit-tokens-limit": ("tokens", "limit"),
+    "anthropic-ratelimit-tokens-remaining": ("tokens", "remaining"),
+    "x-ratelimit-limit": ("requests", "limit"),
+    "x-ratelimit-remaining": ("requests", "remaining"),
+}
+
+
+class TokenBucket:
+    """Continuously refilling bucket; consuming past zero is allowed and repaid by refill."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed (requests larger than the bucket wait for a full one)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def set_capacity(self, per_minute: float):
+        self._refill()
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = min(self.level, self.capacity)
+
+    def cap_level(self, remaining: float):
+        self._refill()
+        self.level = min(self.level, float(remaining))
+
+
+class ProviderRateLimiter:
+    """Priority queue in front of the request and token buckets of one provider+model."""
+
+    def __init__(
+        self,
+        key: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_queue_wait: float,
+        priority_aging: Optional[float] = None,
+    ):
+        self.key = key
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue_wait = max_queue_wait
+        self.priority_aging = priority_aging
+        self.paused_until = 0.0
+        self.consecutive_429 = 0
+        self.stats = {"granted": 0, "queued": 0, "rate_limited": 0, "wait_seconds": 0.0}
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, priority: int, tokens: int):
+        """
+        Wait until the call may be sent.
+
+        Raises:
+            TimeoutError: If the call waited longer than max_queue_wait
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self._rank(priority), next(self._sequence), tokens, future))
+        self._dispatch()
+        if future.done():
+            return
+        self.stats["queued"] += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.max_queue_wait)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"Rate limiter {self.key}: call waited more than {self.max_queue_wait}s"
+            ) from None
+        finally:
+            self.stats["wait_seconds"] += time.monotonic() - start
+
+    def _rank(self, priority: int) -> float:
+        """
+        Queue position of a call enqueued now.
+
+        Aging lowers a waiter's priority by (now - enqueued) / priority_aging. `now` is the
+        same for every waiter, so ranking by priority + enqueued / priority_aging gives the
+        aged order while the heap keys stay fixed.
+        """
+        if not self.priority_aging:
+            return float(priority)
+        return priority + time.monotonic() / self.priority_aging
+
+    def _dispatch(self):
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait > 0:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.stats["granted"] += 1
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        self.consecutive_429 = 0
+        if actual_tokens:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+        self._dispatch()
+
+    def adapt(self, headers: dict):
+        """Follow the limits the provider reports in its response headers."""
+        for header, (bucket_name, field) in RATE_LIMIT_HEADERS.items():
+            value = headers.get(header)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            bucket = self.requests if bucket_name == "requests" else self.tokens
+            if field == "limit" and value > 0:
+                bucket.set_capacity(value)
+            elif field == "remaining":
+                bucket.cap_level(value)
+        self._dispatch()
+
+    def pause(self, retry_after: Optional[float] = None):
+        """Stop granting calls after a 429, for Retry-After or an exponential backoff."""
+        self.consecutive_429 += 1
+        self.stats["rate_limited"] += 1
+        delay = retry_after if retry_after is not None else min(60.0, 2.0 ** self.consecutive_429)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        print(f"[WARN] Rate limited by {self.key}; pausing {delay:.1f}s")
+        self._dispatch()
+
+
+_limiters: dict[str, ProviderRateLimiter] = {}
+
+
+def limiter_key(model: str) -> str:
+    return model if "/" in model else f"default/{model}"
+
+
+def get_rate_limiter(model: str, config: Optional[dict] = None) -> ProviderRateLimiter:
+    """
+    The process-wide limiter of a model, created from config on first use.
+
+    Args:
+        model: LiteLLM model string, e.g. "openrouter/anthropic/claude-sonnet-4-5"
+        config: RATE_LIMIT_CONFIG; `overrides` may be keyed by model or provider
+
+    Returns:
+        The shared ProviderRateLimiter for the provider+model
+    """
+    key = limiter_key(model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        config = {**DEFAULT_RATE_LIMIT_CONFIG, **(config or {})}
+        provider = key.split("/", 1)[0]
+        overrides = config["overrides"].get(model) or config["overrides"].get(provider) or {}
+        settings = {**config, **overrides}
+        limiter = ProviderRateLimiter(
+            key,
+            settings["requests_per_minute"],
+            settings["tokens_per_minute"],
+            settings["max_queue_wait"],
+            settings["priority_aging"],
+        )
+        _limiters[key] = limiter
+    return limiter
+
+
+def rate_limit_stats() -> dict:
+    """Counters of every limiter, keyed by provider+model."""
+    return {key: dict(limiter.stats) for key, limiter in _limiters.items()}
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def rate_limit_layer(role: str, config: dict):
+    """LM layer that queues calls of `role` through the shared limiter of the LM's model."""
+    priority = ROLE_PRIORITY.get(role, DEFAULT_PRIORITY)
+
+    async def layer(call_next, lm, **request):
+        limiter = get_rate_limiter(lm.model, config)
+        estimated = (
+            estimate_prompt_tokens(request.get("messages"), request.get("prompt"))
+            + COMPLETION_ESTIMATE
+        )
+        await limiter.acquire(priority, estimated)
+        try:
+            response = await call_next(**request)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                limiter.pause(_retry_after(e))
+            raise
+        limiter.settle(estimated, response_usage(response).get("total_tokens", 0))
+        if config.get("adapt_to_headers", True):
+            limiter.adapt(response_headers(response))
+        return response
+
+    return layer
+
+
+def install_rate_limit(lm, role: str, config: Optional[dict]):
+    """
+    Route an LM's calls through the shared rate limiter.
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        role: Module role ("planner", "executor", ..., or "memory"), sets the priority
+        config: RATE_LIMIT_CONFIG (no-op when missing or disabled)
+    """
+    if lm is None or not config or not config.get("enabled", False):
+        return
+    add_lm_layer(lm, rate_limit_layer(role, config))
@@ -0,0 +1,249 @@
+"""
+Repair and retry of a single module call.
+
+A VLM occasionally returns output DSPy can't parse into the signature: a
+`dependencies_graph` with int keys or as a list, "yes" for `is_atomic`, "execute" for
+`node_type`, JSON wrapped in a code fence with a trailing comma... Left alone, the
+error fails the node and with it the whole solve. `install_retry` wraps a module's
+aforward so that a failing call is handled where it happened:
+
+1. A parse failure is first repaired locally from the raw LM response: sections or
+   the JSON object are extracted, cleaned up, and each field is coerced to the type
+   the signature expects. No LM call is made.
+2. Otherwise the call is retried with exponential backoff and jitter, for parse
+   failures and transient provider errors only. Only this node is retried; the
+   rest of the task tree is untouched.
+
+Retries bypass the response cache (a malformed response would be served again), and
+the attempt number is kept on the ModuleCall so telemetry can attribute retries.
+"""
+import ast
+import asyncio
+import enum
+import functools
+import json
+import random
+import re
+from typing import Any, Optional
+
+import dspy
+from pydantic import TypeAdapter
+
+from .call_context import current_module_call, module_signature
+
+try:
+    from dspy.utils.exceptions import AdapterParseError
+except ImportError:
+    # Older DSPy versions raise plain ValueErrors on parse failures
+    AdapterParseError = None
+
+DEFAULT_RETRY_CONFIG = {
+    "enabled": False,
+    "repair": True,
+    "max_attempts": 3,
+    "base_delay": 1.0,
+    "max_delay": 20.0,
+    "jitter": 0.5,
+    "roles": ["atomizer", "planner", "executor", "aggregator", "verifier"],
+}
+
+# Provider errors worth retrying; anything else (auth, bad request, context length) fails fast
+TRANSIENT_ERRORS = {
+    "APIConnectionError",
+    "APIError",
+    "InternalServerError",
+    "RateLimitError",
+    "ServiceUnavailableError",
+    "Timeout",
+    "TimeoutError",
+}
+
+_SECTION = re.compile(r"\[\[ ## (\w+) ## \]\]")
+_FENCE = re.compile(r"^```[\w]*\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def retry_stats() -> dict:
+    """Repairs, retries and final failures per role."""
+    return {role: dict(counts) for role, counts in _stats.items()}
+
+
+def is_parse_error(error: Exception) -> bool:
+    if AdapterParseError is not None and isinstance(error, AdapterParseError):
+        return True
+    return type(error).__name__ == "AdapterParseError"
+
+
+def is_retryable(error: Exception) -> bool:
+    if is_parse_error(error) or isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return True
+    return type(error).__name__ in TRANSIENT_ERRORS
+
+
+def _loads(text: str) -> Any:
+    """Parse JSON, tolerating code fences, trailing commas and Python literals."""
+    text = _FENCE.sub("", text.strip())
+    for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(candidate)
+        except (ValueError, SyntaxError):
+            pass
+    raise ValueError("not a JSON value")
+
+
+def extract_fields(text: str) -> dict:
+    """Output fields found in a raw response (ChatAdapter sections or a JSON object)."""
+    if not text:
+        return {}
+    parts = _SECTION.split(text)
+    if len(parts) > 1:
+        return {
+            name: value.strip()
+            for name, value in zip(parts[1::2], parts[2::2])
+            if name != "completed"
+        }
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        value = _loads(text[start : end + 1])
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _normalize_dependencies(value: Any) -> Any:
+    """dependencies_graph as {"index": ["index", ...]}, whatever shape the model used."""
+    if isinstance(value, list):
+        value = {str(i): deps for i, deps in enumerate(value)}
+    if not isinstance(value, dict):
+        return value
+    graph = {}
+    for key, deps in value.items():
+        if deps is None:
+            deps = []
+        elif not isinstance(deps, (list, tuple, set)):
+            deps = [deps]
+        graph[str(key)] = [str(dep) for dep in deps]
+    return graph
+
+
+def coerce_value(name: str, annotation: Any, value: Any) -> Any:
+    """Coerce a raw field value towards the signature's annotation, then validate it."""
+    original = value
+    if isinstance(value, str) and annotation is not str:
+        text = value.strip()
+        if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+            key = text.strip("\"'").upper()
+            for member in annotation:
+                if key in (str(member.value).upper(), member.name.upper()):
+                    return member
+        elif annotation is bool:
+            lowered = text.strip("\"'").lower()
+            if lowered in ("true", "yes", "1"):
+                return True
+            if lowered in ("false", "no", "0"):
+                return False
+        elif text.lower() in ("none", "null", ""):
+            value = None
+        else:
+            try:
+                value = _loads(text)
+            except ValueError:
+                pass
+    if name == "dependencies_graph":
+        value = _normalize_dependencies(value)
+    adapter = TypeAdapter(annotation)
+    try:
+        return adapter.validate_python(value)
+    except ValueError:
+        if value is original:
+            raise
+        # e.g. free text that happened to parse as a number
+        return adapter.validate_python(original)
+
+
+def repair_prediction(signature, lm_response: Optional[str], parsed: Optional[dict] = None):
+    """
+    Build a Prediction from a response DSPy failed to parse.
+
+    Args:
+        signature: Signature the response was meant to fill
+        lm_response: Raw LM output
+        parsed: Fields the adapter already parsed
+
+    Returns:
+        dspy.Prediction, or None if a required field is missing or invalid
+    """
+    raw = {**extract_fields(lm_response or ""), **(parsed or {})}
+    fields = {}
+    for name, field in signature.output_fields.items():
+        if name not in raw:
+            if field.is_required() and name != "reasoning":
+                return None
+            fields[name] = "" if field.is_required() else field.get_default(call_default_factory=True)
+            continue
+        try:
+            fields[name] = coerce_value(name, field.annotation, raw[name])
+        except Exception:
+            return None
+    return dspy.Prediction(**fields)
+
+
+def install_retry(module, role: str, config: Optional[dict]):
+    """
+    Repair and retry a module's failing calls.
+
+    Apply before instrument_module, so that attempts are recorded on the module call.
+
+    Args:
+        module: Module whose aforward is wrapped
+        role: Module role (wrapped only if listed in config["roles"])
+        config: RETRY_CONFIG (no-op when missing or disabled)
+    """
+    if not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_RETRY_CONFIG, **config}
+    if role not in config["roles"]:
+        return
+    counts = _stats.setdefault(role, {"repaired": 0, "retried": 0, "failed": 0})
+    original_aforward = module.aforward
+
+    @functools.wraps(original_aforward)
+    async def aforward_with_retry(*args, **kwargs):
+        call = current_module_call()
+        for attempt in range(config["max_attempts"]):
+            if call is not None:
+                call.attempt = attempt
+            try:
+                return await original_aforward(*args, **kwargs)
+            except Exception as e:
+                if config["repair"] and is_parse_error(e):
+                    signature = getattr(e, "signature", None) or module_signature(module)
+                    prediction = (
+                        repair_prediction(signature, getattr(e, "lm_response", None), getattr(e, "parsed_result", None))
+                        if signature is not None
+                        else None
+                    )
+                    if prediction is not None:
+                        counts["repaired"] += 1
+                        return prediction
+                if not is_retryable(e) or attempt + 1 >= config["max_attempts"]:
+                    counts["failed"] += 1
+                    raise
+                delay = min(config["max_delay"], config["base_delay"] * 2 ** attempt)
+                delay *= 1 - random.uniform(0, config["jitter"])
+                counts["retried"] += 1
+                print(f"[WARN] {role} call failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    module.aforward = aforward_with_retry
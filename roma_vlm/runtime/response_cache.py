@@ -0,0 +1,165 @@
+"""
+Response cache for the multimodal modules' LM calls.
+
+DSPy's own cache keys requests by their full text, so every lookup hashes the complete
+base64 payload of each image, and it is switched on or off process-wide by
+`dspy.configure_cache`. This layer keeps its own cache instead:
+
+- images are keyed by a digest of their decoded content, so the same picture is the
+  same key however it was encoded and lookups don't rehash megabytes of base64;
+- entries live in a pluggable backend (memory LRU, SQLite or Redis) with per-role TTLs;
+- DSPy's cache is turned off for the wrapped LMs, so global cache settings elsewhere
+  neither disable this cache nor store a second copy of each response.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional
+
+from litellm import ModelResponse
+
+from .cache_backends import get_cache_backend
+from .call_context import current_module_call
+from .lm_layers import add_lm_layer
+
+DEFAULT_RESPONSE_CACHE_CONFIG = {
+    "enabled": False,
+    "backend": "memory",
+    "max_entries": 2048,
+    "path": None,
+    "redis_url": None,
+    "ttl": {},
+    "default_ttl": 3600,
+}
+
+_image_digests: "OrderedDict[str, str]" = OrderedDict()
+_IMAGE_DIGEST_CACHE_SIZE = 64
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def image_digest(url: str) -> str:
+    """Content digest of an image URL (decoded bytes for data URIs, the URL otherwise)."""
+    digest = _image_digests.get(url)
+    if digest is not None:
+        _image_digests.move_to_end(url)
+        return digest
+    content = url.encode()
+    if url.startswith("data:") and "," in url:
+        try:
+            content = base64.b64decode(url.split(",", 1)[1])
+        except (binascii.Error, ValueError):
+            pass
+    digest = "sha256:" + hashlib.sha256(content).hexdigest()
+    _image_digests[url] = digest
+    if len(_image_digests) > _IMAGE_DIGEST_CACHE_SIZE:
+        _image_digests.popitem(last=False)
+    return digest
+
+
+def normalize_messages(messages) -> list:
+    """Messages with every image URL replaced by its content digest."""
+    normalized = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if part.get("type") == "image_url":
+                    image_url = part.get("image_url") or {}
+                    if not isinstance(image_url, dict):
+                        image_url = {"url": str(image_url)}
+                    part = {
+                        **part,
+                        "image_url": {**image_url, "url": image_digest(image_url.get("url", ""))},
+                    }
+                parts.append(part)
+            message = {**message, "content": parts}
+        normalized.append(message)
+    return normalized
+
+
+def request_cache_key(lm, request: dict) -> str:
+    """Stable key of an LM request: model, settings, and messages with hashed images."""
+    settings = {k: v for k, v in request.items() if k not in ("messages", "prompt")}
+    payload = {
+        "model": lm.model,
+        "settings": {**lm.kwargs, **settings},
+        "prompt": request.get("prompt"),
+        "messages": normalize_messages(request.get("messages")),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def response_cache_stats() -> dict:
+    """Hits and misses per role."""
+    return {role: dict(counts) for role, counts in _stats.items()}
+
+
+def _serialize(response) -> Optional[str]:
+    try:
+        return json.dumps(response.model_dump(), default=str)
+    except Exception:
+        return None
+
+
+def _deserialize(value: str):
+    response = ModelResponse(**json.loads(value))
+    response.cache_hit = True
+    return response
+
+
+def response_cache_layer(role: str, config: dict, ttl: float):
+    """LM layer that serves `role`'s calls from the shared response cache."""
+    backend = get_cache_backend({**config, "namespace": "responses"})
+    counts = _stats.setdefault(role, {"hits": 0, "misses": 0})
+
+    async def layer(call_next, lm, **request):
+        key = request_cache_key(lm, request)
+        call = current_module_call()
+        cached = None
+        # A retried call must reach the model: the cached response is what failed
+        if call is None or not call.attempt:
+            try:
+                cached = await backend.get(key)
+            except Exception as e:
+                print(f"[WARN] Response cache read failed: {e}")
+        if cached is not None:
+            counts["hits"] += 1
+            return _deserialize(cached)
+
+        counts["misses"] += 1
+        response = await call_next(**request)
+        value = _serialize(response) if getattr(response, "choices", None) else None
+        if value is not None:
+            try:
+                await backend.set(key, value, ttl)
+            except Exception as e:
+                print(f"[WARN] Response cache write failed: {e}")
+        return response
+
+    return layer
+
+
+def install_response_cache(lm, role: str, config: Optional[dict]):
+    """
+    Serve an LM's calls from the shared response cache.
+
+    Install last (outermost): hits skip routing, rate limiting and hedging.
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        role: Module role; selects the TTL (config["ttl"][role], 0 disables caching)
+        config: RESPONSE_CACHE_CONFIG (no-op when missing or disabled)
+    """
+    if lm is None or not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_RESPONSE_CACHE_CONFIG, **config}
+    ttl = config["ttl"].get(role, config["default_ttl"])
+    # This layer replaces DSPy's cache for the LM, whatever dspy.configure_cache says
+    lm.cache = False
+    if not ttl:
+        return
+    add_lm_layer(lm, response_cache_layer(role, config, ttl))
@@ -0,0 +1,231 @@
+"""
+Cost- and latency-aware model routing per module call.
+
+Each role has a preferred tier (e.g. a small fast model for the atomizer and verifier,
+the strong model for the executor). A call is escalated to the strong tier when it
+carries many images or a large prompt, and deep executor leaves (narrow subtasks) can
+be sent to the fast tier. A tier whose model is currently failing or slow (rolling
+error rate / p95 latency) is skipped for the next healthy one.
+
+Every decision, with the call's outcome, is appended as one JSON line to
+ROUTING_CONFIG["log_path"] for offline analysis. Lines are buffered and written from a
+worker thread, never on the event loop; flush_routing_logs() waits for the pending ones.
+"""
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+
+import dspy
+
+from .call_context import current_module_call
+from .lm_layers import add_lm_layer, count_images, estimate_prompt_tokens
+
+DEFAULT_ROUTING_CONFIG = {
+    "enabled": False,
+    "tiers": {"strong": None, "fast": None},
+    "roles": {
+        "atomizer": "fast",
+        "planner": "strong",
+        "executor": "strong",
+        "aggregator": "strong",
+        "verifier": "fast",
+    },
+    "escalate_images": 2,
+    "escalate_prompt_tokens": 8000,
+    "fast_executor_depth": None,
+    "max_error_rate": 0.25,
+    "max_p95_latency": 60.0,
+    "min_samples": 10,
+    "log_path": None,
+}
+
+
+class ModelHealth:
+    """Rolling latency and error window of one model."""
+
+    def __init__(self, window: int = 100):
+        self.outcomes: deque = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        self.outcomes.append((latency, ok))
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def p95_latency(self) -> float:
+        latencies = [latency for latency, ok in self.outcomes if ok]
+        if len(latencies) < 2:
+            return 0.0
+        return statistics.quantiles(latencies, n=100)[94]
+
+    def healthy(self, config: dict) -> bool:
+        if len(self.outcomes) < config["min_samples"]:
+            return True
+        return (
+            self.error_rate() <= config["max_error_rate"]
+            and self.p95_latency() <= config["max_p95_latency"]
+        )
+
+
+_model_health: dict[str, ModelHealth] = {}
+
+
+def model_health(model: str) -> ModelHealth:
+    return _model_health.setdefault(model, ModelHealth())
+
+
+def choose_tier(role: str, depth: int, images: int, prompt_tokens: int, config: dict) -> tuple[str, str]:
+    """
+    The preferred tier of a call, before health checks.
+
+    Returns:
+        (tier, reason)
+    """
+    tier = config["roles"].get(role, "strong")
+    if images >= config["escalate_images"]:
+        return "strong", f"{images} images"
+    if prompt_tokens >= config["escalate_prompt_tokens"]:
+        return "strong", f"~{prompt_tokens} prompt tokens"
+    fast_depth = config["fast_executor_depth"]
+    if role == "executor" and fast_depth is not None and depth >= fast_depth:
+        return "fast", f"executor at depth {depth}"
+    return tier, f"{role} default"
+
+
+class DecisionLog:
+    """Routing decisions of one log file, appended in batches from a worker thread."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._buffer: list[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._file_lock = threading.Lock()
+
+    def add(self, record: dict):
+        self._buffer.append(json.dumps(record) + "\n")
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        # Decisions made while a batch is being written go out with the next one
+        while self._buffer:
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write, lines)
+            except OSError as e:
+                print(f"[WARN] Could not write {len(lines)} routing decisions to {self.path}: {e}")
+
+    def _write(self, lines: list[str]):
+        with self._file_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.writelines(lines)
+
+    async def flush(self):
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+
+_decision_logs: dict[str, DecisionLog] = {}
+
+
+def _log_decision(path: Optional[str], record: dict):
+    if not path:
+        return
+    if path not in _decision_logs:
+        _decision_logs[path] = DecisionLog(path)
+    _decision_logs[path].add(record)
+
+
+async def flush_routing_logs():
+    """Wait until every buffered routing decision is written."""
+    for log in list(_decision_logs.values()):
+        await log.flush()
+
+
+def routing_layer(role: str, config: dict, tier_lms: dict):
+    """LM layer that sends each call of `role` to the model of the selected tier."""
+
+    async def layer(call_next, lm, **request):
+        call = current_module_call()
+        depth = call.depth if call is not None else 0
+        messages = request.get("messages")
+        images = count_images(messages)
+        prompt_tokens = estimate_prompt_tokens(messages, request.get("prompt"))
+
+        tier, reason = choose_tier(role, depth, images, prompt_tokens, config)
+        if tier not in tier_lms:
+            tier = next(iter(tier_lms))
+        candidates = [tier] + [t for t in tier_lms if t != tier]
+        healthy = [t for t in candidates if model_health(tier_lms[t].model).healthy(config)]
+        selected = healthy[0] if healthy else tier
+        if selected != tier:
+            reason += f"; {tier} unhealthy"
+        target = tier_lms[selected]
+
+        start = time.monotonic()
+        ok = False
+        try:
+            # The module's own LM keeps its inner layers; other tiers have their own
+            response = await (call_next(**request) if target is lm else target.aforward(**request))
+            ok = True
+            return response
+        finally:
+            latency = time.monotonic() - start
+            model_health(target.model).record(latency, ok)
+            _log_decision(
+                config["log_path"],
+                {
+                    "time": time.time(),
+                    "role": role,
+                    "depth": depth,
+                    "images": images,
+                    "prompt_tokens": prompt_tokens,
+                    "tier": selected,
+                    "model": target.model,
+                    "reason": reason,
+                    "latency": latency,
+                    "ok": ok,
+                },
+            )
+
+    return layer
+
+
+def install_model_router(
+    lm,
+    role: str,
+    config: Optional[dict],
+    prepare_lm: Optional[Callable] = None,
+):
+    """
+    Route an LM's calls to the model tier that fits each call.
+
+    Install last (outermost), so the chosen model's own rate limiting and hedging apply.
+
+    Args:
+        lm: The module's dspy.LM (no-op when None); serves tiers left unset
+        role: Module role
+        config: ROUTING_CONFIG (no-op when missing or disabled)
+        prepare_lm: Called with each extra tier LM to install its inner layers
+    """
+    if lm is None or not config or not config.get("enabled", False):
+        return
+    config = {**DEFAULT_ROUTING_CONFIG, **config}
+    tier_lms = {}
+    for tier, model in config["tiers"].items():
+        if not model or model == lm.model:
+            tier_lms[tier] = lm
+            continue
+        tier_lm = dspy.LM(model=model, model_type=lm.model_type, cache=lm.cache, **lm.kwargs)
+        if prepare_lm is not None:
+            prepare_lm(tier_lm)
+        tier_lms[tier] = tier_lm
+    add_lm_layer(lm, routing_layer(role, config, tier_lms))
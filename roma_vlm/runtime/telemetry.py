@@ -0,0 +1,276 @@
+"""
+Token and latency accounting.
+
+Every LM call made by a module is recorded with its role, node depth, model, prompt /
+completion / image tokens, latency, retries and whether it was a cache hit. Records go
+to two places:
+
+- the RequestTrace of the request in progress (started by the runner with
+  `start_trace`, carried to every task of the solve by a contextvar), which rolls them
+  up per role and is returned with the result;
+- process-wide counters and histograms, rendered in the Prometheus text format by
+  `render_prometheus()` for the API's /metrics endpoint.
+"""
+import contextvars
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from .call_context import current_module_call
+from .checkpoints import checkpoint_stats
+from .hedging import hedging_stats, on_hedge_loser
+from .lm_layers import (
+    IMAGE_TOKENS,
+    add_lm_layer,
+    count_images,
+    response_usage,
+)
+from .mlflow_export import mlflow_export_stats
+from .rate_limit import rate_limit_stats
+from .repair import retry_stats
+from .response_cache import response_cache_stats
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+
+
+class CallRecord(BaseModel):
+    role: str
+    depth: int = 0
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    image_tokens: int = 0
+    latency: float = 0.0
+    retries: int = 0
+    attempt: int = 0
+    cache_hit: bool = False
+    ok: bool = True
+    error: Optional[str] = None
+
+
+class RequestTrace(BaseModel):
+    request_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    agent: Optional[str] = None
+    started_at: float = Field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    calls: list[CallRecord] = []
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    def summary(self) -> dict:
+        """Totals for the request and per role."""
+        per_role: dict[str, dict] = defaultdict(
+            lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "image_tokens": 0,
+                     "latency": 0.0, "retries": 0, "cache_hits": 0, "errors": 0}
+        )
+        for call in self.calls:
+            row = per_role[call.role]
+            row["calls"] += 1
+            row["prompt_tokens"] += call.prompt_tokens
+            row["completion_tokens"] += call.completion_tokens
+            row["image_tokens"] += call.image_tokens
+            row["latency"] += call.latency
+            row["retries"] += call.retries
+            row["cache_hits"] += int(call.cache_hit)
+            row["errors"] += int(not call.ok)
+        end = self.finished_at or time.time()
+        return {
+            "request_id": self.request_id,
+            "agent": self.agent,
+            "wall_time": end - self.started_at,
+            "calls": len(self.calls),
+            "prompt_tokens": sum(c.prompt_tokens for c in self.calls),
+            "completion_tokens": sum(c.completion_tokens for c in self.calls),
+            "max_depth": max((c.depth for c in self.calls), default=0),
+            "per_role": dict(per_role),
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "roma_vlm_request_trace", default=None
+)
+
+
+def start_trace(agent: Optional[str] = None, request_id: Optional[str] = None) -> RequestTrace:
+    """Start collecting the LM calls of the current request (and the tasks it spawns)."""
+    trace = RequestTrace(agent=agent, request_id=request_id or uuid.uuid4().hex)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+class _Metrics:
+    """Process-wide counters and latency histograms, keyed by label tuples."""
+
+    def __init__(self):
+        self.counters: dict[str, dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: dict[str, dict[tuple, list]] = defaultdict(dict)
+
+    def inc(self, name: str, labels: dict, value: float = 1.0):
+        self.counters[name][tuple(sorted(labels.items()))] += value
+
+    def observe(self, name: str, labels: dict, value: float):
+        key = tuple(sorted(labels.items()))
+        histogram = self.histograms[name].setdefault(key, [[0] * len(LATENCY_BUCKETS), 0, 0.0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += 1
+        histogram[2] += value
+
+
+METRICS = _Metrics()
+
+
+def record_call(record: CallRecord, agent: Optional[str]):
+    trace = current_trace()
+    if trace is not None:
+        trace.calls.append(record)
+    labels = {"role": record.role, "model": record.model, "agent": agent or "unknown"}
+    METRICS.inc("roma_lm_calls_total", {**labels, "status": "ok" if record.ok else "error"})
+    METRICS.inc("roma_lm_prompt_tokens_total", labels, record.prompt_tokens)
+    METRICS.inc("roma_lm_completion_tokens_total", labels, record.completion_tokens)
+    METRICS.inc("roma_lm_image_tokens_total", labels, record.image_tokens)
+    if record.cache_hit:
+        METRICS.inc("roma_lm_cache_hits_total", labels)
+    if record.retries:
+        METRICS.inc("roma_lm_retries_total", labels, record.retries)
+    METRICS.observe("roma_lm_latency_seconds", labels, record.latency)
+
+
+def record_request(trace: RequestTrace, ok: bool):
+    """Count a finished request and its wall time."""
+    labels = {"agent": trace.agent or "unknown"}
+    METRICS.inc("roma_requests_total", {**labels, "status": "ok" if ok else "error"})
+    METRICS.observe("roma_request_latency_seconds", labels, trace.summary()["wall_time"])
+
+
+def accounting_layer(role: str):
+    """LM layer recording every call of `role` in the request trace and the metrics."""
+
+    async def layer(call_next, lm, **request):
+        call = current_module_call()
+        trace = current_trace()
+        retries = 0
+        if call is not None and call.attempt > call.retries_recorded:
+            # A module call makes several LM requests on its own (ReAct steps, adapter
+            # fallbacks); only a new install_retry attempt counts, on its first request
+            retries = call.attempt - call.retries_recorded
+            call.retries_recorded = call.attempt
+        images = count_images(request.get("messages"))
+        start = time.monotonic()
+        record = CallRecord(
+            role=call.role if call is not None else role,
+            depth=call.depth if call is not None else 0,
+            model=lm.model,
+            image_tokens=images * IMAGE_TOKENS,
+            retries=retries,
+            attempt=call.attempt if call is not None else 0,
+        )
+        try:
+            response = await call_next(**request)
+        except Exception as e:
+            record.ok = False
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            usage = response_usage(response)
+            record.model = getattr(response, "model", None) or lm.model
+            record.prompt_tokens = usage.get("prompt_tokens", 0) or 0
+            record.completion_tokens = usage.get("completion_tokens", 0) or 0
+            record.cache_hit = bool(getattr(response, "cache_hit", False))
+            return response
+        finally:
+            record.latency = time.monotonic() - start
+            record_call(record, trace.agent if trace is not None else None)
+
+    return layer
+
+
+def _record_hedge_loser(role: str, model: str, request: dict, response, latency: float):
+    """Account the discarded response of a hedged call (the returned one is recorded by its layer)."""
+    call = current_module_call()
+    trace = current_trace()
+    usage = response_usage(response)
+    record_call(
+        CallRecord(
+            role=call.role if call is not None else role,
+            depth=call.depth if call is not None else 0,
+            model=getattr(response, "model", None) or model,
+            prompt_tokens=usage.get("prompt_tokens", 0) or 0,
+            completion_tokens=usage.get("completion_tokens", 0) or 0,
+            image_tokens=count_images(request.get("messages")) * IMAGE_TOKENS,
+            latency=latency,
+        ),
+        trace.agent if trace is not None else None,
+    )
+
+
+on_hedge_loser(_record_hedge_loser)
+
+
+def install_accounting(lm, role: str):
+    """
+    Record an LM's calls. Install last (outermost), so cache hits are recorded too.
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        role: Role reported for calls made outside an instrumented module call
+    """
+    if lm is None:
+        return
+    add_lm_layer(lm, accounting_layer(role))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: Optional[dict] = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, series in sorted(METRICS.counters.items()):
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in series.items():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    for name, series in sorted(METRICS.histograms.items()):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, (buckets, count, total) in series.items():
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {count}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+
+    # Counters kept by the other runtime layers
+    mlflow_stats = mlflow_export_stats()
+    gauges = {
+        "roma_rate_limit": (rate_limit_stats(), "limiter"),
+        "roma_hedging": (hedging_stats(), "role"),
+        "roma_response_cache": (response_cache_stats(), "role"),
+        "roma_module_retry": (retry_stats(), "role"),
+        "roma_checkpoint": (checkpoint_stats(), "role"),
+        "roma_mlflow_export": ({"mlflow": mlflow_stats} if mlflow_stats else {}, "exporter"),
+    }
+    for prefix, (stats, label) in gauges.items():
+        fields = sorted({field for row in stats.values() for field in row})
+        for field in fields:
+            name = f"{prefix}_{field}"
+            lines.append(f"# TYPE {name} gauge")
+            for key, row in stats.items():
+                lines.append(f"{name}{_format_labels(((label, key),))} {row.get(field, 0)}")
+    return "\n".join(lines) + "\n"
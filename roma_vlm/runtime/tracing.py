@@ -0,0 +1,256 @@
+"""
+OpenTelemetry tracing of a request, from the API down to the provider calls.
+
+Spans nest as api.analyze → runner → multimodal_solve → module.<role> → lm.<role> /
+tool.<name>, with memory.embed, memory.search and memory.update for the memory layer.
+The OpenTelemetry context lives in contextvars, so the spans of subtasks solved
+concurrently still nest under the module call that spawned them.
+
+Spans are exported by a batch span processor on a background thread, so a slow or
+missing collector never delays a request. Tracing is optional: unless ROMA_TRACING is
+set and opentelemetry-sdk is installed, `span()` is a no-op and nothing is wrapped.
+
+Environment:
+    ROMA_TRACING                 "true" to record spans (default false)
+    OTEL_TRACES_EXPORTER         "otlp" (default) or "console"
+    OTEL_EXPORTER_OTLP_ENDPOINT  Collector endpoint, read by the OTLP exporter
+                                 (default http://localhost:4317)
+    OTEL_TRACES_SAMPLER_ARG      Fraction of requests traced, 0-1 (default 1.0)
+    OTEL_SERVICE_NAME            Service name of the spans (default "roma-vlm")
+"""
+import contextlib
+import functools
+import inspect
+import os
+from typing import Optional
+
+from pydantic import BaseModel
+
+from .call_context import current_module_call
+from .lm_layers import add_lm_layer, count_images, response_usage
+
+MAX_ATTRIBUTE_LENGTH = 500
+
+
+class TracingSettings(BaseModel):
+    enabled: bool = False
+    exporter: str = "otlp"
+    sample_ratio: float = 1.0
+    service_name: str = "roma-vlm"
+
+    @classmethod
+    def from_env(cls) -> "TracingSettings":
+        return cls(
+            enabled=os.getenv("ROMA_TRACING", "false").lower() == "true",
+            exporter=os.getenv("OTEL_TRACES_EXPORTER", "otlp").lower(),
+            sample_ratio=float(os.getenv("OTEL_TRACES_SAMPLER_ARG", "1.0")),
+            service_name=os.getenv("OTEL_SERVICE_NAME", "roma-vlm"),
+        )
+
+
+_configured = False
+_provider = None
+_tracer = None
+
+
+def configure_tracing(settings: Optional[TracingSettings] = None) -> bool:
+    """
+    Set up the tracer provider once per process (later calls are no-ops).
+
+    Args:
+        settings: Tracing settings (default: from the environment)
+
+    Returns:
+        True if spans are recorded
+
+    Raises:
+        ValueError: If the exporter is unknown
+    """
+    global _configured, _provider, _tracer
+    if _configured:
+        return _tracer is not None
+    _configured = True
+
+    settings = settings or TracingSettings.from_env()
+    if not settings.enabled:
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        print("[WARN] ROMA_TRACING is set but opentelemetry-sdk is not installed: "
+              "pip install opentelemetry-sdk opentelemetry-exporter-otlp")
+        return False
+
+    if settings.exporter == "console":
+        exporter = ConsoleSpanExporter()
+    elif settings.exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("[WARN] The otlp trace exporter needs opentelemetry-exporter-otlp; tracing disabled")
+            return False
+        exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown trace exporter: {settings.exporter}")
+
+    # Sample whole requests: child spans follow the decision of their root
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    _tracer = trace.get_tracer("roma_vlm")
+    print(f"✓ Tracing enabled ({settings.exporter} exporter, sample ratio {settings.sample_ratio})")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans and stop the exporter."""
+    global _provider, _tracer
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = None
+    _tracer = None
+
+
+def tracing_enabled() -> bool:
+    return configure_tracing()
+
+
+def _attribute(value):
+    if isinstance(value, (bool, int, float)):
+        return value
+    return str(value)[:MAX_ATTRIBUTE_LENGTH]
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Record a span around a block (a no-op when tracing is off).
+
+    Exceptions raised in the block are recorded on the span and re-raised.
+
+    Args:
+        name: Span name
+        **attributes: Span attributes; None values are skipped
+
+    Yields:
+        The span, or None when tracing is off
+    """
+    if not tracing_enabled():
+        yield None
+        return
+    with _tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, _attribute(value))
+        yield current
+
+
+def traced(name: str):
+    """Decorator recording a span around each call of an async function."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_tools(tools: Optional[dict]) -> Optional[dict]:
+    """
+    Tools wrapped to record a tool.<name> span per call (unchanged when tracing is off).
+
+    The wrappers keep each tool's name, docstring and signature, which DSPy reads to
+    describe the tool to the model.
+    """
+    if not tools or not tracing_enabled():
+        return tools
+
+    def wrap(name, tool):
+        if inspect.iscoroutinefunction(tool):
+            @functools.wraps(tool)
+            async def async_wrapper(*args, **kwargs):
+                with span(f"tool.{name}", **{"roma.tool": name}):
+                    return await tool(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(tool)
+        def wrapper(*args, **kwargs):
+            with span(f"tool.{name}", **{"roma.tool": name}):
+                return tool(*args, **kwargs)
+
+        return wrapper
+
+    return {name: wrap(name, tool) if callable(tool) else tool for name, tool in tools.items()}
+
+
+def tracing_layer(role: str):
+    """LM layer recording an lm.<role> span with the model, token counts and cache hits."""
+
+    async def layer(call_next, lm, **request):
+        with span(
+            f"lm.{role}",
+            **{"gen_ai.request.model": lm.model, "roma.images": count_images(request.get("messages"))},
+        ) as current:
+            response = await call_next(**request)
+            if current is not None:
+                usage = response_usage(response)
+                current.set_attribute("gen_ai.response.model", getattr(response, "model", None) or lm.model)
+                current.set_attribute("gen_ai.usage.input_tokens", usage.get("prompt_tokens", 0) or 0)
+                current.set_attribute("gen_ai.usage.output_tokens", usage.get("completion_tokens", 0) or 0)
+                current.set_attribute("roma.cache_hit", bool(getattr(response, "cache_hit", False)))
+            return response
+
+    return layer
+
+
+def install_tracing(lm, role: str):
+    """
+    Record a span per LM call (nothing is installed when tracing is off).
+
+    Args:
+        lm: dspy.LM instance (no-op when None)
+        role: Module role, used in the span name
+    """
+    if lm is None or not tracing_enabled():
+        return
+    add_lm_layer(lm, tracing_layer(role))
+
+
+def trace_module(module, role: str):
+    """
+    Record a module.<role> span per aforward call, tagged with the node's goal and depth.
+
+    Apply before instrument_module, so that the span sees the module call it sets.
+    Nothing is wrapped when tracing is off.
+    """
+    if not tracing_enabled():
+        return
+    original_aforward = module.aforward
+
+    @functools.wraps(original_aforward)
+    async def traced_aforward(*args, **kwargs):
+        call = current_module_call()
+        with span(
+            f"module.{role}",
+            **{
+                "roma.role": role,
+                "roma.depth": call.depth if call is not None else None,
+                "roma.goal": call.goal if call is not None else None,
+            },
+        ):
+            return await original_aforward(*args, **kwargs)
+
+    module.aforward = traced_aforward
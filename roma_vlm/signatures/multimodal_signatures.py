@@ -1,4 +1,10 @@
-"""Multimodal signatures that extend ROMA's base signatures with image support."""
+"""Multimodal signatures that extend ROMA's base signatures with image support.
+
+Input fields are ordered from most to least stable across the calls of one solve:
+images, then memories, then the node's goal and context. DSPy renders inputs in
+field order after the instructions and demos, so the long shared prefix can be
+served from the provider's prompt cache.
+"""
 
 import dspy
 from typing import Optional, Dict, List, Any, Union
@@ -23,9 +29,6 @@ class MultimodalAtomizerSignature(dspy.Signature):
     VLM can analyze images to determine if task is atomic or needs planning.
     """
     
-    goal: str = dspy.InputField(
-        description="Task to atomize. Can reference images provided."
-    )
     images: Optional[List[Union[str, DspyImage]]] = dspy.InputField(
         default=None,
         description="List of images (as dspy.Image objects or data URIs) for vision analysis"
@@ -34,6 +37,9 @@ class MultimodalAtomizerSignature(dspy.Signature):
         default=None,
         description="Relevant memories from previous interactions for context"
     )
+    goal: str = dspy.InputField(
+        description="Task to atomize. Can reference images provided."
+    )
     context: Optional[str] = dspy.InputField(
         default=None, 
         description="Execution context (XML format from ROMA)"
@@ -55,9 +61,6 @@ class MultimodalPlannerSignature(dspy.Signature):
     when decomposing tasks into subtasks.
     """
     
-    goal: str = dspy.InputField(
-        description="Complex task that needs decomposition into subtasks"
-    )
     images: Optional[List[Union[str, DspyImage]]] = dspy.InputField(
         default=None,
         description="Images (as dspy.Image objects or data URIs) for planning context"
@@ -66,6 +69,9 @@ class MultimodalPlannerSignature(dspy.Signature):
         default=None,
         description="Relevant memories from previous interactions for context"
     )
+    goal: str = dspy.InputField(
+        description="Complex task that needs decomposition into subtasks"
+    )
     context: Optional[str] = dspy.InputField(
         default=None,
         description="Execution context (XML format from ROMA)"
@@ -88,9 +94,6 @@ class MultimodalExecutorSignature(dspy.Signature):
     that can analyze, process, and reason about images.
     """
     
-    goal: str = dspy.InputField(
-        description="Atomic task to execute. Can involve image analysis, OCR, visual reasoning, etc."
-    )
     images: Optional[List[Union[str, DspyImage]]] = dspy.InputField(
         default=None,
         description="Images (as dspy.Image objects or data URIs) for task execution"
@@ -99,6 +102,9 @@ class MultimodalExecutorSignature(dspy.Signature):
         default=None,
         description="Relevant memories from previous interactions for context"
     )
+    goal: str = dspy.InputField(
+        description="Atomic task to execute. Can involve image analysis, OCR, visual reasoning, etc."
+    )
     context: Optional[str] = dspy.InputField(
         default=None,
         description="Execution context (XML format from ROMA)"
@@ -121,9 +127,6 @@ class MultimodalAggregatorSignature(dspy.Signature):
     involve visual information from parent images.
     """
     
-    original_goal: str = dspy.InputField(
-        description="Original goal that was decomposed into subtasks"
-    )
     original_images: Optional[List[Union[str, DspyImage]]] = dspy.InputField(
         default=None,
         description="Original images (as dspy.Image objects or data URIs) for synthesis context"
@@ -132,6 +135,9 @@ class MultimodalAggregatorSignature(dspy.Signature):
         default=None,
         description="Relevant memories from previous interactions for context"
     )
+    original_goal: str = dspy.InputField(
+        description="Original goal that was decomposed into subtasks"
+    )
     subtasks_results: List[SubTask] = dspy.InputField(
         description="List of subtask results to synthesize into final answer"
     )
@@ -153,9 +159,6 @@ class MultimodalVerifierSignature(dspy.Signature):
     visual information or image analysis.
     """
     
-    goal: str = dspy.InputField(
-        description="Original task goal to verify against"
-    )
     images: Optional[List[str]] = dspy.InputField(
         default=None,
         description="Original images for verification context. VLM can check if output matches image content."
@@ -164,6 +167,9 @@ class MultimodalVerifierSignature(dspy.Signature):
         default=None,
         description="Relevant memories from previous interactions for context"
     )
+    goal: str = dspy.InputField(
+        description="Original task goal to verify against"
+    )
     candidate_output: str = dspy.InputField(
         description="Output to verify against goal and images"
     )
@@ -1,11 +1,17 @@
 import asyncio
-import sys
-import os
-from pathlib import Path
-import dspy
 import importlib
 
 from roma_vlm import multimodal_solve
+from roma_vlm.runtime import (
+    RequestCheckpoint,
+    check_request_inputs,
+    export_request_trace,
+    flush_routing_logs,
+    get_checkpoint_store,
+    record_request,
+    span,
+    start_trace,
+)
 from roma_dspy.tools import (
     CalculatorToolkit,
     WebSearchToolkit,
@@ -14,8 +20,17 @@ from roma_dspy.tools import (
     DefiLlamaToolkit,
 )
 
-from memory.vectordb import init_qdrant, get_all_categories, search_memories, stringify_retrieved_point
+from configs import AGENT_CONFIG_MAP
+from memory.vectordb import (
+    DEFAULT_USER_ID,
+    record_memory_access,
+    register_collection_config,
+    search_memories,
+)
+from memory.category_router import routed_search_memories
+from memory.context_builder import build_memory_context
 from memory.generate_embeddings import generate_embeddings
+from memory.subtask_memories import SubtaskMemoryProvider
 from memory.update_memory import update_memories
 
 # ============================================================================
@@ -31,17 +46,8 @@ def load_agent_config(agent_name):
     Returns:
         Config module with all necessary configurations
     """
-    # Map agent names to config module names
-    agent_config_map = {
-        "general_agent": "configs.general_config",
-        "crypto_agent": "configs.crypto_agent_config",
-        "travel_agent": "configs.travel_agent_config",
-        "self_care_agent": "configs.self_care_agent_config",
-        "capital_one_agent": "configs.c1_agent_config",
-    }
-    
     # Get the config module name, default to general_config if not found
-    config_module_name = agent_config_map.get(agent_name, "configs.general_config")
+    config_module_name = AGENT_CONFIG_MAP.get(agent_name, "configs.general_config")
     
     try:
         # Dynamically import the config module
@@ -53,7 +59,15 @@ def load_agent_config(agent_name):
         # Fall back to general config if specific config not found
         return importlib.import_module("configs.general_config")
 
-async def runner(goal, image_path, model=None, agent="general_agent"):
+async def runner(
+    goal,
+    image_path,
+    model=None,
+    agent="general_agent",
+    user_id=DEFAULT_USER_ID,
+    request_id=None,
+    return_trace=False,
+):
     """
     Main runner function that processes requests with agent-specific configurations.
     
@@ -62,12 +76,90 @@ async def runner(goal, image_path, model=None, agent="general_agent"):
         image_path: Path(s) to image file(s) 
         model: Optional model override (if None, uses config default)
         agent: Agent type (e.g., "general_agent", "crypto_agent", "travel_agent")
+        user_id: Tenant whose memories are searched and updated
+        request_id: Optional id of the request (generated when missing). With
+                    checkpointing on, passing the id of an interrupted request resumes
+                    it: completed module calls are replayed instead of re-run
+        return_trace: Also return the request's RequestTrace (per-call tokens/latency)
     
     Returns:
-        Result from multimodal_solve
+        Result from multimodal_solve, or (result, trace) when return_trace is set
+    """
+    # Every LM call made while serving this request is recorded in the trace
+    trace = start_trace(agent=agent, request_id=request_id)
+    try:
+        with span("runner", **{"roma.agent": agent, "roma.request_id": trace.request_id}):
+            result = await _run(goal, image_path, model, agent, user_id, trace.request_id)
+    except Exception:
+        trace.finish()
+        record_request(trace, ok=False)
+        export_request_trace(trace, ok=False)
+        raise
+    trace.finish()
+    record_request(trace, ok=True)
+    # Queued for the background MLflow exporter; never waits on the tracking server
+    export_request_trace(trace, ok=True)
+    summary = trace.summary()
+    print(
+        f"✓ Request {trace.request_id}: {summary['calls']} LM calls, "
+        f"{summary['prompt_tokens']} prompt / {summary['completion_tokens']} completion tokens, "
+        f"{summary['wall_time']:.1f}s"
+    )
+    return (result, trace) if return_trace else result
+
+
+async def resume_request(request_id, user_id=DEFAULT_USER_ID, return_trace=False):
+    """
+    Resume a checkpointed request from its stored inputs.
+
+    Args:
+        request_id: Id of a request that ran with checkpointing on
+        user_id: User resuming it; only the user who started a request can resume it
+        return_trace: Also return the request's RequestTrace
+
+    Returns:
+        Same as runner()
+
+    Raises:
+        KeyError: If no checkpoint of this user exists for the request
     """
+    request = await get_checkpoint_store().get_request(request_id)
+    if request is None or request["user_id"] != user_id:
+        raise KeyError(f"No checkpoint for request {request_id}")
+    images = request["images"]
+    if isinstance(images, list) and len(images) == 1:
+        images = images[0]
+    return await runner(
+        request["goal"],
+        images,
+        request["model"],
+        request["agent"],
+        request["user_id"],
+        request_id=request_id,
+        return_trace=return_trace,
+    )
+
+
+async def _run(goal, image_path, model, agent, user_id, request_id):
+    """Solve one request: retrieve memories, run multimodal_solve, update memories."""
     # Load the appropriate config for the selected agent
     config = load_agent_config(agent)
+
+    checkpoint = None
+    if config.CHECKPOINT_CONFIG.get("enabled", False):
+        store = get_checkpoint_store()
+        previous = await store.get_request(request_id)
+        if previous is not None:
+            # The stored result and predictions only hold for the same inputs and user
+            check_request_inputs(previous, goal, agent, user_id)
+        skip_completed = config.CHECKPOINT_CONFIG.get("skip_completed", True)
+        if previous is not None and previous["status"] == "completed" and skip_completed:
+            print(f"✓ Request {request_id} already completed; returning its checkpointed result")
+            return previous["result"]
+        await store.start_request(
+            request_id, agent, model, user_id, goal, store.keep_images(request_id, image_path)
+        )
+        checkpoint = await RequestCheckpoint.open(store, request_id)
     
     # Use the model from parameter or fall back to config
     selected_model = model if model is not None else config.MODEL
@@ -91,63 +183,129 @@ async def runner(goal, image_path, model=None, agent="general_agent"):
         **web_search.get_enabled_tools(),
     }
     
-    # Initialize the memory database
-    # await init_qdrant()
+    # Collections are created/migrated once at startup (memory.schema.bootstrap_collections)
+    use_memory = bool(config.COLLECTION_NAME) and config.MEMORY_CONFIG.get("enabled", False)
+    if config.COLLECTION_NAME:
+        register_collection_config(config.COLLECTION_NAME, config.MEMORY_CONFIG)
 
     # Get related memories from memory database using input query and categories
-    # goal_embedding = (await generate_embeddings([goal]))[0]
-    # retrieved_memories = await search_memories(
-    #     search_vector=goal_embedding,
-    #     collection_name=config.COLLECTION_NAME,
-    #     categories=None,  # Search across all categories
-    #     score_threshold=config.MEMORY_CONFIG["score_threshold"],
-    #     limit=config.MEMORY_CONFIG["limit"]
-    # )
+    retrieved_memories = []
+    if use_memory:
+        goal_embedding = (await generate_embeddings([goal], dimensions=config.MEMORY_CONFIG["vector_size"]))[0]
+        if config.MEMORY_CONFIG.get("category_routing", False):
+            # Search only the categories the goal most likely belongs to
+            retrieved_memories = await routed_search_memories(
+                search_vector=goal_embedding,
+                collection_name=config.COLLECTION_NAME,
+                user_id=user_id,
+                memory_config=config.MEMORY_CONFIG,
+                query_text=goal,
+            )
+        else:
+            retrieved_memories = await search_memories(
+                search_vector=goal_embedding,
+                collection_name=config.COLLECTION_NAME,
+                user_id=user_id,
+                categories=None,  # Search across all categories
+                score_threshold=config.MEMORY_CONFIG["score_threshold"],
+                limit=config.MEMORY_CONFIG["limit"],
+                query_text=goal,
+            )
+        record_memory_access(retrieved_memories, config.COLLECTION_NAME)
     
-    # Format memories for injection into the prompt
-    memories_text = None
-    # if retrieved_memories:
-    #     memories_list = [stringify_retrieved_point(m) for m in retrieved_memories]
-    #     memories_text = "\n\n## Relevant Memories from Previous Interactions:\n" + "\n- ".join(memories_list)
+    # Optionally let each executor call retrieve memories for its own subtask
+    memory_provider = None
+    if use_memory and config.MEMORY_CONFIG.get("subtask_retrieval", False):
+        memory_provider = SubtaskMemoryProvider(config.COLLECTION_NAME, user_id, config.MEMORY_CONFIG)
+        memory_provider.seed(goal, retrieved_memories)
+
+    # Deduplicate, cluster and trim memories to the prompt budget
+    memories_text = build_memory_context(
+        retrieved_memories,
+        token_budget=config.MEMORY_CONFIG.get("context_token_budget", 400),
+    )
     
-    result = await multimodal_solve(
-        goal=goal,
-        images=image_path,
-        memories=memories_text,        
-        atomizer_model=selected_model, 
-        planner_model=selected_model,   
-        executor_model=selected_model,  
-        aggregator_model=selected_model,
-        verifier_model=selected_model,
-        atomizer_config=config.MODEL_CONFIGS["atomizer"],
-        planner_config=config.MODEL_CONFIGS["planner"],
-        executor_config=config.MODEL_CONFIGS["executor"],
-        aggregator_config=config.MODEL_CONFIGS["aggregator"],
-        verifier_config=config.MODEL_CONFIGS["verifier"],
-        atomizer_strategy=config.STRATEGIES["atomizer"],
-        planner_strategy=config.STRATEGIES["planner"],
-        executor_strategy=config.STRATEGIES["executor"],
-        aggregator_strategy=config.STRATEGIES["aggregator"],
-        verifier_strategy=config.STRATEGIES["verifier"],
-        executor_tools=all_tools,
-        max_depth=config.MAX_DEPTH,
-        verify=config.USE_VERIFIER,
-        atomizer_signature_instructions=config.ATOMIZER_INSTRUCTIONS,
-        executor_signature_instructions=config.EXECUTOR_INSTRUCTIONS,
-        verifier_signature_instructions=config.VERIFIER_INSTRUCTIONS,
-        planner_signature_instructions=config.PLANNER_INSTRUCTIONS,
-        aggregator_signature_instructions=config.AGGREGATOR_INSTRUCTIONS,
-        atomizer_demos=config.ATOMIZER_DEMOS,
+    inject_into = config.MEMORY_CONFIG.get("inject_into")
+    executor_sees_memories = (inject_into is None or "executor" in inject_into) and (
+        bool(memories_text) or memory_provider is not None
     )
+    try:
+        result = await multimodal_solve(
+            goal=goal,
+            images=image_path,
+            memories=memories_text,        
+            atomizer_model=selected_model, 
+            planner_model=selected_model,   
+            executor_model=selected_model,  
+            aggregator_model=selected_model,
+            verifier_model=selected_model,
+            atomizer_config=config.MODEL_CONFIGS["atomizer"],
+            planner_config=config.MODEL_CONFIGS["planner"],
+            executor_config=config.MODEL_CONFIGS["executor"],
+            aggregator_config=config.MODEL_CONFIGS["aggregator"],
+            verifier_config=config.MODEL_CONFIGS["verifier"],
+            atomizer_strategy=config.STRATEGIES["atomizer"],
+            planner_strategy=config.STRATEGIES["planner"],
+            executor_strategy=config.STRATEGIES["executor"],
+            aggregator_strategy=config.STRATEGIES["aggregator"],
+            verifier_strategy=config.STRATEGIES["verifier"],
+            executor_tools=all_tools,
+            max_depth=config.MAX_DEPTH,
+            verify=config.USE_VERIFIER,
+            atomizer_signature_instructions=config.ATOMIZER_INSTRUCTIONS,
+            executor_signature_instructions=config.EXECUTOR_INSTRUCTIONS,
+            verifier_signature_instructions=config.VERIFIER_INSTRUCTIONS,
+            planner_signature_instructions=config.PLANNER_INSTRUCTIONS,
+            aggregator_signature_instructions=config.AGGREGATOR_INSTRUCTIONS,
+            atomizer_demos=config.ATOMIZER_DEMOS,
+            memory_roles=config.MEMORY_CONFIG.get("inject_into"),
+            memory_provider=memory_provider,
+            rate_limit_config=config.RATE_LIMIT_CONFIG,
+            hedging_config=config.HEDGING_CONFIG,
+            routing_config=config.ROUTING_CONFIG,
+            response_cache_config=config.RESPONSE_CACHE_CONFIG,
+            prompt_cache_config=config.PROMPT_CACHE_CONFIG,
+            retry_config=config.RETRY_CONFIG,
+            checkpoint=checkpoint,
+            executor_memo_config=config.EXECUTOR_MEMO_CONFIG,
+            agent=agent,
+            # Answers informed by a user's memories are only reused for that user
+            executor_memo_scope=str(user_id) if executor_sees_memories else None,
+        )
+    except Exception:
+        if checkpoint is not None:
+            # Completed module calls stay checkpointed; resuming replays them
+            await checkpoint.store.finish_request(request_id, "failed")
+        raise
+    if checkpoint is not None:
+        await checkpoint.store.finish_request(request_id, "completed", result)
     
     
+    if memory_provider is not None:
+        # Subtask memories are candidates for updates too
+        seen = {m.point_id for m in retrieved_memories}
+        subtask_memories = [m for m in memory_provider.retrieved if m.point_id not in seen]
+        record_memory_access(subtask_memories, config.COLLECTION_NAME)
+        retrieved_memories = retrieved_memories + subtask_memories
+
     # Update memories based on the interaction
-    # await update_memories(existing_memories=retrieved_memories, messages=[
-    #     {"role": "user", "content": goal},
-    #     {"role": "assistant", "content": result}], model = config.MEMORY_MODEL)
+    if use_memory:
+        await update_memories(existing_memories=retrieved_memories, messages=[
+            {"role": "user", "content": goal},
+            {"role": "assistant", "content": result}], model = config.MEMORY_MODEL,
+            user_id=user_id, collection_name=config.COLLECTION_NAME,
+            memory_config=config.MEMORY_CONFIG, rate_limit_config=config.RATE_LIMIT_CONFIG)
         
     return result
 
+async def _run_once():
+    try:
+        return await runner()
+    finally:
+        # The event loop closes right after; write out the buffered routing decisions
+        await flush_routing_logs()
+
+
 if __name__ == "__main__":
-    result = asyncio.run(runner())
+    result = asyncio.run(_run_once())
     print(result)
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""Runtime cache backends and their namespaces."""
+import pytest
+
+from roma_vlm.runtime.cache_backends import RedisCacheBackend, get_cache_backend
+
+
+async def test_sqlite_namespaces_sharing_a_file_are_separate(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    responses = get_cache_backend({"backend": "sqlite", "path": path, "namespace": "responses"})
+    memo = get_cache_backend({"backend": "sqlite", "path": path, "namespace": "executor_memo"})
+
+    await responses.set("key", "response", 60)
+    await memo.set("key", "answer", 60)
+
+    assert responses is not memo
+    assert await responses.get("key") == "response"
+    assert await memo.get("key") == "answer"
+
+
+async def test_sqlite_entries_expire(tmp_path):
+    backend = get_cache_backend({"backend": "sqlite", "path": str(tmp_path / "cache.sqlite")})
+    await backend.set("key", "value", -1)
+
+    assert await backend.get("key") is None
+
+
+def test_backends_are_shared_per_location_and_namespace():
+    config = {"backend": "memory", "namespace": "shared_test"}
+
+    assert get_cache_backend(config) is get_cache_backend(dict(config))
+    assert get_cache_backend(config) is not get_cache_backend({**config, "namespace": "other_test"})
+
+
+def test_namespaces_are_checked(tmp_path):
+    with pytest.raises(ValueError):
+        get_cache_backend({"backend": "sqlite", "path": str(tmp_path / "c.sqlite"), "namespace": "a;b"})
+
+
+def test_redis_keys_are_prefixed_with_the_namespace():
+    pytest.importorskip("redis")
+
+    assert RedisCacheBackend("redis://localhost:6379", "executor_memo").prefix == "roma_vlm:executor_memo:"
+    assert RedisCacheBackend("redis://localhost:6379").prefix == "roma_vlm:"
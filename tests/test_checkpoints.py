@@ -0,0 +1,87 @@
+"""Checkpoint call keys and the replay of a resumed request."""
+import asyncio
+
+import dspy
+import pytest
+
+from roma_vlm.engine.solve import _install_module_wrappers, _wrap_forward_with_images
+from roma_vlm.runtime import (
+    CheckpointStore,
+    RequestCheckpoint,
+    RequestMismatchError,
+    TaskDepthTracker,
+    check_request_inputs,
+)
+from roma_vlm.signatures import MultimodalExecutorSignature
+
+
+class FakeExecutor:
+    """Answers each goal after a delay, so that parallel calls interleave."""
+
+    signature = MultimodalExecutorSignature
+
+    def __init__(self, delays: dict):
+        self.delays = delays
+        self.calls = []
+
+    def forward(self, **kwargs):
+        raise NotImplementedError
+
+    async def aforward(self, goal, **kwargs):
+        self.calls.append(goal)
+        await asyncio.sleep(self.delays.get(goal, 0))
+        return dspy.Prediction(output=f"answer to {goal}", sources=[])
+
+
+def build_executor(checkpoint: RequestCheckpoint, delays: dict) -> FakeExecutor:
+    executor = FakeExecutor(delays)
+    _wrap_forward_with_images(executor, [], None, param_name="images")
+    _install_module_wrappers(executor, "executor", TaskDepthTracker("root"), checkpoint=checkpoint)
+    return executor
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints.db"))
+
+
+def test_call_key_counts_repeated_goals(store):
+    checkpoint = RequestCheckpoint(store, "req", {})
+    first = checkpoint.call_key("executor", "Convert 1 BTC to USD")
+    second = checkpoint.call_key("executor", "  convert 1 btc   to usd ")
+    other_role = checkpoint.call_key("planner", "Convert 1 BTC to USD")
+
+    assert first.endswith(":0") and second.endswith(":1")
+    assert first.rsplit(":", 1)[0] == second.rsplit(":", 1)[0]
+    assert other_role.startswith("planner:")
+
+
+async def test_resumed_parallel_subtasks_replay_their_own_predictions(store):
+    # The first subtask finishes last, so saves happen in the opposite order of the calls
+    delays = {"price of BTC": 0.05, "price of ETH": 0}
+    checkpoint = await RequestCheckpoint.open(store, "req")
+    executor = build_executor(checkpoint, delays)
+    first = await asyncio.gather(
+        executor.aforward(input_task="price of BTC", context_payload=""),
+        executor.aforward(input_task="price of ETH", context_payload=""),
+    )
+
+    resumed = build_executor(await RequestCheckpoint.open(store, "req"), delays)
+    replayed = await asyncio.gather(
+        resumed.aforward(input_task="price of ETH", context_payload=""),
+        resumed.aforward(input_task="price of BTC", context_payload=""),
+    )
+
+    assert [p.output for p in first] == ["answer to price of BTC", "answer to price of ETH"]
+    assert [p.output for p in replayed] == ["answer to price of ETH", "answer to price of BTC"]
+    assert resumed.calls == []
+
+
+def test_check_request_inputs_rejects_other_goal_or_user():
+    request = {"request_id": "req", "goal": "Price of BTC", "agent": "crypto", "user_id": 1}
+    check_request_inputs(request, " price of  btc", "crypto", 1)
+
+    with pytest.raises(RequestMismatchError):
+        check_request_inputs(request, "price of ETH", "crypto", 1)
+    with pytest.raises(RequestMismatchError):
+        check_request_inputs(request, "Price of BTC", "crypto", 2)
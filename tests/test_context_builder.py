@@ -0,0 +1,55 @@
+"""Memory context compression under a token budget."""
+from memory.context_builder import MEMORY_CONTEXT_HEADER, build_memory_context, estimate_tokens
+from memory.vectordb import RetrievedMemory
+
+
+def memory(point_id: str, text: str, score: float, categories=None) -> RetrievedMemory:
+    return RetrievedMemory(
+        point_id=point_id,
+        user_id=1,
+        memory_text=text,
+        categories=categories or [],
+        date="2025-01-01",
+        score=score,
+        similarity=score,
+    )
+
+
+def test_nothing_to_inject():
+    assert build_memory_context([]) is None
+
+
+def test_duplicates_are_dropped_and_near_duplicates_share_a_line():
+    memories = [
+        memory("1", "User is allergic to peanuts", 0.9, ["health"]),
+        memory("2", "user is allergic to  peanuts", 0.8, ["health"]),
+        memory("3", "User is allergic to peanuts!", 0.7, ["food"]),
+        memory("4", "User lives in Boston", 0.6, ["home"]),
+    ]
+
+    context = build_memory_context(memories, token_budget=400)
+    lines = context.removeprefix(MEMORY_CONTEXT_HEADER).splitlines()
+
+    assert len(lines) == 2
+    assert lines[0].count("allergic") == 2
+    assert "'health', 'food'" in lines[0]
+    assert "Boston" in lines[1]
+
+
+def test_lines_are_added_best_first_within_the_budget():
+    memories = [memory(str(i), f"Fact number {i} about the user's travel plans", 1 - i / 10) for i in range(8)]
+
+    context = build_memory_context(memories, token_budget=60)
+
+    assert estimate_tokens(context) <= 60
+    assert "Fact number 0" in context
+    assert "Fact number 7" not in context
+
+
+def test_the_best_memory_is_truncated_rather_than_dropped():
+    memories = [memory("1", "User plans a long trip " * 20, 0.9)]
+
+    context = build_memory_context(memories, token_budget=30)
+
+    assert context is not None and context.endswith("…")
+    assert estimate_tokens(context) <= 31
@@ -0,0 +1,105 @@
+"""Executor memo keys, TTLs, and memo lookups through the solve wrapper chain."""
+import dspy
+
+from roma_vlm.engine.solve import _install_module_wrappers, _wrap_forward_with_images
+from roma_vlm.runtime import TaskDepthTracker
+from roma_vlm.runtime.executor_memo import (
+    DEFAULT_EXECUTOR_MEMO_CONFIG,
+    _toolkit_of,
+    answer_ttl,
+    memo_key,
+    normalize_context,
+    tools_used,
+)
+from roma_vlm.signatures import MultimodalExecutorSignature
+
+
+class CalculatorToolkit:
+    def add(self, a, b):
+        return a + b
+
+
+class CoinGeckoToolkit:
+    def price(self, coin):
+        return 0
+
+
+class FakeExecutor:
+    signature = MultimodalExecutorSignature
+
+    def __init__(self):
+        self.calls = []
+
+    def forward(self, **kwargs):
+        raise NotImplementedError
+
+    async def aforward(self, goal, context_payload=None, **kwargs):
+        self.calls.append((goal, context_payload))
+        return dspy.Prediction(output=f"answer to {goal} given {context_payload}", sources=[])
+
+
+def build_executor(agent: str) -> FakeExecutor:
+    executor = FakeExecutor()
+    _wrap_forward_with_images(executor, ["data:image/png;base64,AAAA"], None, param_name="images")
+    _install_module_wrappers(
+        executor,
+        "executor",
+        TaskDepthTracker("root"),
+        executor_memo=dict(
+            config={"enabled": True, "max_entries": 64},
+            agent=agent,
+            images=["data:image/png;base64,AAAA"],
+        ),
+    )
+    return executor
+
+
+async def test_memo_serves_repeated_subtasks_from_roma_kwargs():
+    first = build_executor("memo-test-roma-kwargs")
+    answer = await first.aforward(input_task="Convert 1 BTC to USD", context_payload="rate: 60000")
+
+    second = build_executor("memo-test-roma-kwargs")
+    again = await second.aforward(input_task="convert 1 btc to usd", context_payload="rate: 60000")
+    other_context = await second.aforward(input_task="Convert 1 BTC to USD", context_payload="rate: 61000")
+
+    assert again.output == answer.output
+    assert second.calls == [("Convert 1 BTC to USD", "rate: 61000")]
+    assert other_context.output.endswith("rate: 61000")
+
+
+def test_memo_key_ignores_volatile_context_and_separates_scopes():
+    context_a = normalize_context("task 3f2b9c1e-0a4d-4b7e-9c1f-2a3b4c5d6e7f done at 2025-01-02T03:04:05Z")
+    context_b = normalize_context("task 0e1d2c3b-4a59-6877-8695-a4b3c2d1e0f9 done at 2025-02-03T04:05:06Z")
+    key = memo_key("crypto", "gpt", "Price of BTC", ["img"], context_a, None)
+
+    assert key == memo_key("crypto", "gpt", " price of btc ", ["img"], context_b, None)
+    assert key != memo_key("crypto", "gpt", "Price of BTC", ["img"], context_a, "user:1")
+    assert key != memo_key("crypto", "other", "Price of BTC", ["img"], context_a, None)
+
+
+def test_answer_ttl_takes_the_shortest_tool_ttl():
+    config = {**DEFAULT_EXECUTOR_MEMO_CONFIG, "ttl": {"no_tools": 3600, "tools": 60}}
+    toolkits = {"add": "calculator", "price": "coingecko"}
+    tool_ttl = {"calculator": 86400, "coingecko": 5}
+
+    assert answer_ttl(config, [], toolkits, True, tool_ttl) == 3600
+    assert answer_ttl(config, ["add"], toolkits, True, tool_ttl) == 86400
+    assert answer_ttl(config, ["add", "price"], toolkits, True, tool_ttl) == 5
+    assert answer_ttl(config, ["unknown_tool"], toolkits, True, tool_ttl) == 60
+    # A tool-using executor whose trajectory can't be read is treated as using tools
+    assert answer_ttl(config, None, toolkits, True, tool_ttl) == 60
+
+
+def test_tools_map_to_their_toolkit_ttl_keys():
+    assert _toolkit_of(CalculatorToolkit().add) == "calculator"
+    assert _toolkit_of(CoinGeckoToolkit().price) == "coingecko"
+    assert _toolkit_of(lambda: None) is None
+
+
+def test_tools_used_reads_the_react_trajectory():
+    prediction = dspy.Prediction(
+        trajectory={"tool_name_0": "price", "tool_args_0": {}, "tool_name_1": "finish"}
+    )
+
+    assert tools_used(prediction) == ["price"]
+    assert tools_used(dspy.Prediction(output="x")) is None
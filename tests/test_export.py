@@ -0,0 +1,58 @@
+"""Reading exported memory files back for import."""
+import json
+
+import pytest
+
+from memory.export import _read_batches
+
+
+def write_ndjson(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+
+async def read_all(path, batch_size=2):
+    return [batch async for batch in _read_batches(path, batch_size)]
+
+
+async def test_ndjson_rows_become_points_in_batches(tmp_path):
+    path = tmp_path / "backup.ndjson"
+    write_ndjson(
+        path,
+        [
+            {"id": "1", "vector": [0.1, 0.2], "payload": {"memory_text": "a"}},
+            {"id": "2", "vector": [0.3, 0.4], "payload": {"memory_text": "b"}},
+            {"id": "3f2b9c1e-0a4d-4b7e-9c1f-2a3b4c5d6e7f", "vector": [0.5, 0.6], "payload": {}},
+        ],
+    )
+
+    batches = await read_all(path)
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][0].id == 1 and batches[0][0].vector == [0.1, 0.2]
+    assert batches[1][0].id == "3f2b9c1e-0a4d-4b7e-9c1f-2a3b4c5d6e7f"
+
+
+async def test_payload_only_ndjson_export_is_rejected(tmp_path):
+    path = tmp_path / "backup.ndjson"
+    write_ndjson(path, [{"id": "1", "vector": None, "payload": {"memory_text": "a"}}])
+
+    with pytest.raises(ValueError, match="without vectors"):
+        await read_all(path)
+
+
+async def test_payload_only_parquet_export_is_rejected(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "backup.parquet"
+    table = pa.table(
+        {
+            "id": ["1"],
+            "payload": [json.dumps({"memory_text": "a"})],
+            "vector": pa.array([None], type=pa.list_(pa.float32())),
+            "named_vectors": pa.array([None], type=pa.string()),
+        }
+    )
+    pq.write_table(table, path)
+
+    with pytest.raises(ValueError, match="without vectors"):
+        await read_all(path)
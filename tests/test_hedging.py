@@ -0,0 +1,85 @@
+"""Hedged LM requests and failover."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from roma_vlm.runtime.hedging import DEFAULT_HEDGING_CONFIG, hedging_layer, on_hedge_loser
+from roma_vlm.runtime.lm_layers import add_lm_layer
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeLM:
+    def __init__(self, model: str, delay: float = 0, error: Exception = None):
+        self.model = model
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(choices=[self.model])
+
+
+def hedged(role: str, primary: FakeLM, fallback: FakeLM, **config) -> FakeLM:
+    config = {**DEFAULT_HEDGING_CONFIG, "enabled": True, "initial_delay": 0.05, **config}
+    add_lm_layer(primary, hedging_layer(role, config, fallback))
+    return primary
+
+
+async def test_fast_valid_primary_is_returned():
+    fallback = FakeLM("fallback")
+    lm = hedged("hedge-fast", FakeLM("primary"), fallback)
+
+    assert (await lm.aforward(messages=[])).choices == ["primary"]
+    assert fallback.calls == 0
+
+
+async def test_failed_primary_fails_over_to_another_model():
+    fallback = FakeLM("fallback")
+    lm = hedged("hedge-failover", FakeLM("primary", error=RuntimeError("boom")), fallback)
+
+    assert (await lm.aforward(messages=[])).choices == ["fallback"]
+    assert fallback.calls == 1
+
+
+async def test_rate_limited_primary_is_raised_to_the_rate_limiter():
+    fallback = FakeLM("fallback")
+    lm = hedged("hedge-429", FakeLM("primary", error=RateLimitError()), fallback)
+
+    with pytest.raises(RateLimitError):
+        await lm.aforward(messages=[])
+    assert fallback.calls == 0
+
+
+async def test_no_failover_to_the_same_model():
+    fallback = FakeLM("primary")
+    lm = hedged("hedge-same-model", FakeLM("primary", error=RuntimeError("boom")), fallback)
+
+    with pytest.raises(RuntimeError):
+        await lm.aforward(messages=[])
+    assert fallback.calls == 0
+
+
+async def test_slow_primary_is_hedged_and_the_loser_reported():
+    losers = []
+    on_hedge_loser(lambda role, model, request, response, latency: losers.append((role, model)))
+    lm = hedged("hedge-slow", FakeLM("primary", delay=0.3), FakeLM("fallback"), max_hedge_ratio=1.0)
+
+    assert (await lm.aforward(messages=[])).choices == ["fallback"]
+    await asyncio.sleep(0.4)
+    assert ("hedge-slow", "primary") in losers
+
+
+async def test_hedges_are_capped_per_role():
+    fallback = FakeLM("fallback")
+    lm = hedged("hedge-capped", FakeLM("primary", delay=0.1), fallback, max_hedge_ratio=0.0)
+
+    assert (await lm.aforward(messages=[])).choices == ["primary"]
+    assert fallback.calls == 0
@@ -0,0 +1,61 @@
+"""Dense and hybrid (BM25 + dense, RRF-fused) memory search against embedded Qdrant."""
+import pytest
+
+import memory.clients as clients
+from memory.clients import ClientSettings
+from memory.schema import ensure_collection
+from memory.vectordb import EmbeddedMemory, insert_memories, register_collection_config, search_memories
+
+MEMORIES = [
+    (1, "User likes hiking in the Alps", [1.0, 0.0, 0.0, 0.0]),
+    (1, "User holds 2 BTC in a cold wallet", [0.0, 1.0, 0.0, 0.0]),
+    (1, "User checks the BTC price every morning before hiking", [0.9, 0.1, 0.0, 0.0]),
+    (2, "Another user holds BTC", [1.0, 0.0, 0.0, 0.0]),
+]
+
+
+@pytest.fixture
+async def embedded_qdrant(monkeypatch):
+    monkeypatch.setattr(clients, "_settings", ClientSettings(qdrant_url=":memory:"))
+    monkeypatch.setattr(clients, "_qdrant", None)
+    yield clients.get_qdrant_client()
+    await clients.get_qdrant_client().close()
+
+
+async def seeded_collection(name: str, hybrid: bool) -> str:
+    config = register_collection_config(name, {"vector_size": 4, "hybrid": hybrid, "multitenant": False})
+    await ensure_collection(name, config)
+    await insert_memories(
+        [
+            EmbeddedMemory(user_id=user_id, memory_text=text, categories=[], date="2025-01-01T00:00:00Z", embedding=vector)
+            for user_id, text, vector in MEMORIES
+        ],
+        name,
+    )
+    return name
+
+
+async def test_dense_search_returns_cosine_similarities(embedded_qdrant):
+    name = await seeded_collection("search_dense", hybrid=False)
+
+    results = await search_memories([1.0, 0.05, 0.0, 0.0], name, 1, score_threshold=0.5, limit=5, query_text="BTC")
+
+    assert {m.memory_text for m in results} == {MEMORIES[0][1], MEMORIES[2][1]}
+    assert all(m.similarity == m.score for m in results)
+
+
+async def test_hybrid_search_fuses_keyword_matches_by_rrf(embedded_qdrant):
+    name = await seeded_collection("search_hybrid", hybrid=True)
+
+    results = await search_memories(
+        [1.0, 0.05, 0.0, 0.0], name, 1, score_threshold=0.5, limit=5, query_text="how much BTC do I hold"
+    )
+    texts = [m.memory_text for m in results]
+
+    # The cold-wallet memory is far in embedding space and only found by its terms
+    assert MEMORIES[1][1] in texts
+    # Found by both retrievers, so fused ahead of either single-retriever hit
+    assert texts[0] == MEMORIES[2][1]
+    assert MEMORIES[3][1] not in texts
+    # Fused scores are rank-based, not similarities
+    assert all(m.similarity is None for m in results)
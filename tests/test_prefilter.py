@@ -0,0 +1,63 @@
+"""Pre-filter rules of the memory updater."""
+import pytest
+
+from memory.prefilter import hamming_distance, prefilter_reason, simhash
+from memory.vectordb import RetrievedMemory
+
+
+def turn(text: str) -> list[dict]:
+    return [{"role": "user", "content": text}, {"role": "assistant", "content": "Noted."}]
+
+
+def memory(text: str, similarity=None) -> RetrievedMemory:
+    return RetrievedMemory(
+        point_id="p", user_id=1, memory_text=text, categories=[], date="2025-01-01", similarity=similarity
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["My name is Sam", "I am vegan", "I live in Boston", "My budget is $2000", "I moved to Denver"],
+)
+def test_short_personal_facts_reach_the_updater(text):
+    assert prefilter_reason(turn(text), []) is None
+
+
+@pytest.mark.parametrize("text", ["thanks!", "ok", "Good morning", "hi there"])
+def test_small_talk_is_skipped(text):
+    assert prefilter_reason(turn(text), []) == "small_talk"
+
+
+def test_turns_without_personal_signal_are_skipped_unless_disabled():
+    text = "What is shown in this picture of the harbour?"
+
+    assert prefilter_reason(turn(text), []) == "not_personal"
+    assert prefilter_reason(turn(text), [], {"prefilter_require_personal": False}) is None
+
+
+def test_stored_facts_are_duplicates():
+    existing = [memory("I live in Boston")]
+
+    assert prefilter_reason(turn("i live in  boston"), existing) == "duplicate"
+    assert prefilter_reason(turn("I live in Denver now"), existing) is None
+
+
+def test_close_retrieval_similarity_is_a_restatement():
+    existing = [memory("User follows a vegan diet", similarity=0.95)]
+
+    assert prefilter_reason(turn("I am vegan"), existing) == "restatement"
+    # Fused/reranked scores carry no similarity and never count as a restatement
+    assert prefilter_reason(turn("I am vegan"), [memory("User follows a vegan diet")]) is None
+
+
+def test_prefilter_can_be_disabled():
+    assert prefilter_reason(turn("ok"), [], {"prefilter": False}) is None
+
+
+def test_simhash_is_close_for_near_duplicates():
+    a = simhash("I hold 2 BTC and 10 ETH in my cold wallet")
+    b = simhash("I hold 2 BTC and 10 ETH in my cold wallet!")
+    c = simhash("My favourite food is ramen from the place downtown")
+
+    assert hamming_distance(a, b) == 0
+    assert hamming_distance(a, c) > 3
@@ -0,0 +1,102 @@
+"""Token buckets and the priority queue of the provider rate limiter."""
+import asyncio
+
+import pytest
+
+import roma_vlm.runtime.rate_limit as rate_limit
+from roma_vlm.runtime.rate_limit import ROLE_PRIORITY, ProviderRateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_bucket_refills_continuously(clock):
+    bucket = TokenBucket(60)
+    bucket.consume(60)
+
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 30
+    assert bucket.wait_time(30) == 0.0
+    assert bucket.wait_time(31) == pytest.approx(1.0)
+
+
+def test_oversized_requests_wait_for_a_full_bucket_and_are_repaid(clock):
+    bucket = TokenBucket(600)
+    bucket.consume(100)
+
+    assert bucket.wait_time(10_000) == pytest.approx(10.0)
+    bucket.consume(1000)
+    assert bucket.level == pytest.approx(-500)
+
+
+def test_provider_headers_lower_the_limits(clock):
+    limiter = ProviderRateLimiter("test/model", 60, 100_000, 10)
+    limiter.adapt({"x-ratelimit-limit-requests": "30", "x-ratelimit-remaining-tokens": "500"})
+
+    assert limiter.requests.capacity == 30
+    assert limiter.tokens.level == 500
+
+
+def test_waiters_age_towards_the_front(clock):
+    aging = ProviderRateLimiter("test/model", 60, 100_000, 10, priority_aging=10)
+    strict = ProviderRateLimiter("test/model", 60, 100_000, 10, priority_aging=0)
+
+    memory_rank = aging._rank(ROLE_PRIORITY["memory"])
+    clock.now += 15
+    assert memory_rank < aging._rank(ROLE_PRIORITY["executor"])
+    assert strict._rank(ROLE_PRIORITY["memory"]) > strict._rank(ROLE_PRIORITY["executor"])
+
+
+async def grant_order(limiter: ProviderRateLimiter, roles: list[str], spacing: float = 0) -> list[str]:
+    """Queue one call per role, `spacing` seconds apart, and return the order they're granted."""
+    granted = []
+
+    async def call(role: str):
+        await limiter.acquire(ROLE_PRIORITY[role], 10)
+        granted.append(role)
+
+    tasks = []
+    for role in roles:
+        tasks.append(asyncio.create_task(call(role)))
+        await asyncio.sleep(spacing)
+    await asyncio.gather(*tasks)
+    return granted
+
+
+async def test_queued_calls_are_granted_by_priority():
+    limiter = ProviderRateLimiter("test/priority", 1200, 100_000, 10, priority_aging=0)
+    limiter.requests.level = 0
+
+    order = await grant_order(limiter, ["memory", "executor", "aggregator"])
+
+    assert order == ["aggregator", "executor", "memory"]
+
+
+async def test_a_long_queued_call_overtakes_newer_higher_priority_ones():
+    # One grant every 50ms; the memory call ages two levels in the 20ms before the executor's
+    limiter = ProviderRateLimiter("test/aging", 1200, 100_000, 10, priority_aging=0.01)
+    limiter.requests.level = 0
+
+    order = await grant_order(limiter, ["memory", "executor"], spacing=0.02)
+
+    assert order == ["memory", "executor"]
+
+
+async def test_calls_time_out_in_the_queue():
+    limiter = ProviderRateLimiter("test/timeout", 60, 100_000, 0.05)
+    limiter.pause(retry_after=10)
+
+    with pytest.raises(TimeoutError):
+        await limiter.acquire(ROLE_PRIORITY["executor"], 10)
@@ -0,0 +1,97 @@
+"""Local repair of unparseable module outputs, and retry accounting."""
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import dspy
+import pytest
+
+from roma_dspy.types import NodeType
+from roma_vlm.runtime import TaskDepthTracker, install_accounting, install_retry, instrument_module, start_trace
+from roma_vlm.runtime.repair import coerce_value, extract_fields, is_retryable, repair_prediction
+from roma_vlm.signatures import MultimodalAtomizerSignature, MultimodalPlannerSignature
+
+
+@pytest.mark.parametrize(
+    "annotation, raw, expected",
+    [
+        (bool, "yes", True),
+        (bool, '"False"', False),
+        (NodeType, "execute", NodeType.EXECUTE),
+        (Optional[List[str]], "None", None),
+        (Optional[List[str]], "['a', 'b',]", ["a", "b"]),
+        (str, "  kept as is ", "  kept as is "),
+    ],
+)
+def test_values_are_coerced_to_the_annotation(annotation, raw, expected):
+    assert coerce_value("field", annotation, raw) == expected
+
+
+def test_dependency_graphs_are_normalized():
+    annotation = Optional[Dict[str, List[str]]]
+
+    assert coerce_value("dependencies_graph", annotation, "{1: [0], 2: 1}") == {"1": ["0"], "2": ["1"]}
+    assert coerce_value("dependencies_graph", annotation, [[], ["0"]]) == {"0": [], "1": ["0"]}
+
+
+def test_fields_are_extracted_from_sections_or_fenced_json():
+    sections = "[[ ## is_atomic ## ]]\nyes\n\n[[ ## node_type ## ]]\nEXECUTE\n\n[[ ## completed ## ]]"
+    fenced = '```json\n{"is_atomic": "no", "node_type": "plan",}\n```'
+
+    assert extract_fields(sections) == {"is_atomic": "yes", "node_type": "EXECUTE"}
+    assert extract_fields(fenced) == {"is_atomic": "no", "node_type": "plan"}
+
+
+def test_repair_builds_a_typed_prediction_or_gives_up():
+    repaired = repair_prediction(MultimodalAtomizerSignature, '{"is_atomic": "yes", "node_type": "execute"}')
+
+    assert repaired.is_atomic is True and repaired.node_type == NodeType.EXECUTE
+    assert repair_prediction(MultimodalAtomizerSignature, '{"is_atomic": "yes"}') is None
+    assert repair_prediction(MultimodalPlannerSignature, "no fields here") is None
+
+
+def test_only_transient_errors_are_retried():
+    assert is_retryable(TimeoutError())
+    assert is_retryable(SimpleNamespace(status_code=503))
+    assert not is_retryable(SimpleNamespace(status_code=400))
+    assert not is_retryable(ValueError("bad request"))
+
+
+class FakeLM:
+    model = "test/model"
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        return SimpleNamespace(choices=["ok"], usage={"prompt_tokens": 10, "completion_tokens": 2})
+
+
+class FlakyAtomizer:
+    """Makes two LM calls per attempt (like a ReAct step) and fails its first attempt."""
+
+    signature = MultimodalAtomizerSignature
+
+    def __init__(self):
+        self.lm = FakeLM()
+        install_accounting(self.lm, "atomizer")
+        self.attempts = 0
+
+    async def aforward(self, goal, **kwargs):
+        self.attempts += 1
+        await self.lm.aforward(messages=[])
+        await self.lm.aforward(messages=[])
+        if self.attempts == 1:
+            raise TimeoutError("provider timed out")
+        return dspy.Prediction(is_atomic=True, node_type=NodeType.EXECUTE)
+
+
+async def test_a_retried_module_call_counts_one_retry():
+    module = FlakyAtomizer()
+    install_retry(module, "atomizer", {"enabled": True, "base_delay": 0, "max_delay": 0})
+    instrument_module(module, "atomizer", TaskDepthTracker("root"))
+    trace = start_trace("test")
+
+    prediction = await module.aforward(goal="Is this atomic?")
+
+    summary = trace.summary()["per_role"]["atomizer"]
+    assert prediction.is_atomic is True and module.attempts == 2
+    assert summary["calls"] == 4
+    assert summary["retries"] == 1
+    assert [call.attempt for call in trace.calls] == [0, 0, 1, 1]
@@ -0,0 +1,53 @@
+"""Model routing decisions and their log."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from roma_vlm.runtime.lm_layers import add_lm_layer
+from roma_vlm.runtime.router import (
+    DEFAULT_ROUTING_CONFIG,
+    choose_tier,
+    flush_routing_logs,
+    model_health,
+    routing_layer,
+)
+
+
+class FakeLM:
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return SimpleNamespace(choices=[self.model])
+
+
+def test_choose_tier_escalates_heavy_calls():
+    config = {**DEFAULT_ROUTING_CONFIG, "fast_executor_depth": 2}
+
+    assert choose_tier("atomizer", 0, 0, 100, config)[0] == "fast"
+    assert choose_tier("atomizer", 0, 3, 100, config)[0] == "strong"
+    assert choose_tier("verifier", 0, 0, 9000, config)[0] == "strong"
+    assert choose_tier("executor", 1, 0, 100, config)[0] == "strong"
+    assert choose_tier("executor", 2, 0, 100, config)[0] == "fast"
+
+
+async def test_calls_go_to_the_healthy_tier_and_are_logged(tmp_path):
+    log_path = tmp_path / "logs" / "routing.jsonl"
+    config = {**DEFAULT_ROUTING_CONFIG, "enabled": True, "min_samples": 1, "log_path": str(log_path)}
+    strong, fast = FakeLM("router-test-strong"), FakeLM("router-test-fast")
+    add_lm_layer(strong, routing_layer("atomizer", config, {"strong": strong, "fast": fast}))
+
+    await asyncio.gather(*(strong.aforward(messages=[{"role": "user", "content": "hi"}]) for _ in range(5)))
+    for _ in range(5):
+        model_health("router-test-fast").record(1.0, False)
+    await strong.aforward(messages=[{"role": "user", "content": "hi"}])
+    await flush_routing_logs()
+
+    decisions = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert fast.calls == 5 and strong.calls == 1
+    assert len(decisions) == 6
+    assert decisions[-1]["model"] == "router-test-strong"
+    assert decisions[-1]["reason"].endswith("fast unhealthy")